@@ -1,12 +1,15 @@
 import os
+import httpx
 from dotenv import load_dotenv
 from google import genai
+from app.config import PNCP_TIMEOUT, PNCP_MAX_CONEXOES
 
 load_dotenv()
 
 GENAI_API_KEY = os.getenv("GENAI_API_KEY")
 
 client = None
+pncp_http_client = None
 
 def get_genai_client():
     global client
@@ -18,4 +21,24 @@ def get_genai_client():
         except Exception as e:
             print(f"Erro ao criar cliente GenAI: {e}")
             raise
-    return client
\ No newline at end of file
+    return client
+
+def get_pncp_http_client() -> httpx.AsyncClient:
+    """Cliente HTTP assíncrono compartilhado (pool keep-alive) para a API do PNCP"""
+    global pncp_http_client
+    if pncp_http_client is None or pncp_http_client.is_closed:
+        pncp_http_client = httpx.AsyncClient(
+            timeout=PNCP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=PNCP_MAX_CONEXOES,
+                max_keepalive_connections=PNCP_MAX_CONEXOES,
+            ),
+            follow_redirects=True,
+        )
+    return pncp_http_client
+
+async def close_pncp_http_client():
+    global pncp_http_client
+    if pncp_http_client is not None and not pncp_http_client.is_closed:
+        await pncp_http_client.aclose()
+    pncp_http_client = None
@@ -1,3 +1,167 @@
+import os
 import pytz
+from dotenv import load_dotenv
 
-acre_tz = pytz.timezone("America/Rio_Branco")
\ No newline at end of file
+load_dotenv()
+
+acre_tz = pytz.timezone("America/Rio_Branco")
+
+# Pesquisa no PNCP
+PNCP_TIMEOUT = float(os.getenv("PNCP_TIMEOUT", "30"))
+PNCP_MAX_CONEXOES = int(os.getenv("PNCP_MAX_CONEXOES", "20"))
+PNCP_MAX_CONCORRENCIA = int(os.getenv("PNCP_MAX_CONCORRENCIA", "8"))
+
+# Modelo de embedding (tentados em ordem; o primeiro que carregar é usado)
+EMBEDDING_MODELS = [
+    m.strip() for m in os.getenv(
+        "EMBEDDING_MODELS",
+        "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2,"
+        "sentence-transformers/distiluse-base-multilingual-cased,"
+        "all-MiniLM-L6-v2"
+    ).split(",") if m.strip()
+]
+EMBEDDING_PRELOAD = os.getenv("EMBEDDING_PRELOAD", "true").lower() == "true"  # só o worker carrega o modelo
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # 'torch' ou 'onnx' (int8, CPU)
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "app/data/onnx")
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))  # 0 = padrão do onnxruntime
+
+# Cache de embeddings dos objetos do PNCP
+EMBEDDING_CACHE_MEMORIA = int(os.getenv("EMBEDDING_CACHE_MEMORIA", "20000"))
+EMBEDDING_CACHE_MAX_LINHAS = int(os.getenv("EMBEDDING_CACHE_MAX_LINHAS", "500000"))
+
+# Espelho local do PNCP
+PNCP_MODO_BUSCA = os.getenv("PNCP_MODO_BUSCA", "live")  # 'live' ou 'local'
+PNCP_LOCAL_MIN_RESULTADOS = int(os.getenv("PNCP_LOCAL_MIN_RESULTADOS", "50"))
+PNCP_ESPELHAR_BUSCAS = os.getenv("PNCP_ESPELHAR_BUSCAS", "true").lower() == "true"
+PNCP_COLETA_ATIVA = os.getenv("PNCP_COLETA_ATIVA", "false").lower() == "true"
+PNCP_COLETA_TERMOS = [t.strip() for t in os.getenv("PNCP_COLETA_TERMOS", "").split(",") if t.strip()]
+PNCP_COLETA_INTERVALO = int(os.getenv("PNCP_COLETA_INTERVALO", "3600"))
+PNCP_COLETA_MAX_PAGINAS = int(os.getenv("PNCP_COLETA_MAX_PAGINAS", "200"))
+PNCP_COLETA_CONCORRENCIA = int(os.getenv("PNCP_COLETA_CONCORRENCIA", "4"))
+
+# Índice vetorial em disco (memory-mapped) sobre o espelho do PNCP
+RANKING_BACKEND = os.getenv("RANKING_BACKEND", "embeddings")  # 'embeddings' ou 'indice'
+INDICE_VETORIAL_DIR = os.getenv("INDICE_VETORIAL_DIR", "app/data/indice_vetorial")
+INDICE_VETORIAL_DTYPE = os.getenv("INDICE_VETORIAL_DTYPE", "float16")  # 'float16' ou 'int8'
+INDICE_VETORIAL_NLIST = int(os.getenv("INDICE_VETORIAL_NLIST", "0"))  # 0 = sem quantizador IVF
+INDICE_VETORIAL_NPROBE = int(os.getenv("INDICE_VETORIAL_NPROBE", "8"))
+
+# Armazenamento de documentos baixados do PNCP (endereçado por conteúdo)
+DOCUMENTOS_DIR = os.getenv("DOCUMENTOS_DIR", "app/data/documentos")
+DOCUMENTOS_QUOTA_MB = int(os.getenv("DOCUMENTOS_QUOTA_MB", "2048"))
+DOCUMENTOS_REVALIDAR_APOS = int(os.getenv("DOCUMENTOS_REVALIDAR_APOS", "86400"))
+DOCUMENTOS_QUOTA_INTERVALO = int(os.getenv("DOCUMENTOS_QUOTA_INTERVALO", "300"))  # recalcula o total no banco a cada (s)
+DOCUMENTOS_GRACA_REMOCAO = int(os.getenv("DOCUMENTOS_GRACA_REMOCAO", "3600"))  # blobs acessados há menos que isso não saem pela quota (s)
+
+# Diretórios de trabalho isolados por geração de PDP
+WORKSPACES_DIR = os.getenv("WORKSPACES_DIR", "app/temp/jobs")
+WORKSPACES_MAX_IDADE = int(os.getenv("WORKSPACES_MAX_IDADE", "21600"))
+
+# Trabalho bloqueante fora do event loop
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", "2"))
+LOOP_LAG_INTERVALO = float(os.getenv("LOOP_LAG_INTERVALO", "0.1"))
+LOOP_LAG_ALERTA = float(os.getenv("LOOP_LAG_ALERTA", "0.5"))
+
+# Ranking incremental durante a busca no PNCP: encerra a busca quando os candidatos param de mudar.
+# Com RANKING_HIBRIDO, acompanha o BM25 página a página e o passo denso + RRF roda no fim sobre o
+# que foi buscado; sem ele, mantém o top-k por embeddings (embeda todos os objetos de cada página)
+RANKING_STREAMING = os.getenv("RANKING_STREAMING", "true").lower() == "true"
+RANKING_PACIENCIA_PAGINAS = int(os.getenv("RANKING_PACIENCIA_PAGINAS", "5"))
+
+# Ranking híbrido (BM25 sobre o objeto + embeddings só da shortlist, fundidos por RRF)
+RANKING_HIBRIDO = os.getenv("RANKING_HIBRIDO", "true").lower() == "true"
+RANKING_HIBRIDO_SHORTLIST = int(os.getenv("RANKING_HIBRIDO_SHORTLIST", "100"))
+RANKING_RRF_K = int(os.getenv("RANKING_RRF_K", "60"))
+
+# Seleção diversa (MMR) dos documentos baixados e enviados ao Gemini
+SELECAO_MMR = os.getenv("SELECAO_MMR", "true").lower() == "true"
+SELECAO_MMR_LAMBDA = float(os.getenv("SELECAO_MMR_LAMBDA", "0.7"))
+SELECAO_POOL_FATOR = int(os.getenv("SELECAO_POOL_FATOR", "3"))
+SELECAO_LIMIAR_REDUNDANCIA = float(os.getenv("SELECAO_LIMIAR_REDUNDANCIA", "0.95"))
+PDP_ORCAMENTO_DOCUMENTOS = int(os.getenv("PDP_ORCAMENTO_DOCUMENTOS", "5"))
+
+# Cliente da API do PNCP: limite de taxa, concorrência adaptativa (AIMD), retentativas e circuit breaker
+PNCP_TAXA_REQUISICOES = float(os.getenv("PNCP_TAXA_REQUISICOES", "10"))  # requisições/s
+PNCP_RAJADA = int(os.getenv("PNCP_RAJADA", "20"))
+PNCP_AIMD_MIN = int(os.getenv("PNCP_AIMD_MIN", "1"))
+PNCP_AIMD_MAX = int(os.getenv("PNCP_AIMD_MAX", "16"))
+PNCP_RETENTATIVAS = int(os.getenv("PNCP_RETENTATIVAS", "4"))
+PNCP_RETRY_BASE = float(os.getenv("PNCP_RETRY_BASE", "0.5"))
+PNCP_RETRY_MAX = float(os.getenv("PNCP_RETRY_MAX", "10"))
+PNCP_CIRCUITO_FALHAS = int(os.getenv("PNCP_CIRCUITO_FALHAS", "5"))
+PNCP_CIRCUITO_TEMPO_ABERTO = float(os.getenv("PNCP_CIRCUITO_TEMPO_ABERTO", "60"))
+PNCP_ULTIMOS_RESULTADOS = int(os.getenv("PNCP_ULTIMOS_RESULTADOS", "2000"))
+
+# Cache compartilhado (Postgres) das páginas de busca do PNCP
+PNCP_CACHE_PAGINAS = os.getenv("PNCP_CACHE_PAGINAS", "true").lower() == "true"
+PNCP_CACHE_TTL = int(os.getenv("PNCP_CACHE_TTL", "21600"))  # segundos em que a página é servida como fresca
+PNCP_CACHE_STALE = int(os.getenv("PNCP_CACHE_STALE", "86400"))  # janela extra servida enquanto revalida
+
+# Pipeline download -> upload ao Gemini da PDP
+PDP_DOWNLOADS_SIMULTANEOS = int(os.getenv("PDP_DOWNLOADS_SIMULTANEOS", "3"))
+PDP_UPLOADS_SIMULTANEOS = int(os.getenv("PDP_UPLOADS_SIMULTANEOS", "3"))
+PDP_DOCUMENTOS_MINIMOS_IA = int(os.getenv("PDP_DOCUMENTOS_MINIMOS_IA", "3"))  # uploads prontos para iniciar a geração
+PDP_TOLERANCIA_UPLOAD = float(os.getenv("PDP_TOLERANCIA_UPLOAD", "2.0"))  # espera extra pelos demais uploads (s)
+
+# Reuso de uploads na API de arquivos do Gemini
+GEMINI_ARQUIVOS_MARGEM = int(os.getenv("GEMINI_ARQUIVOS_MARGEM", "3600"))  # reusa só se faltar mais que isso para expirar (s)
+GEMINI_VARREDURA_ATIVA = os.getenv("GEMINI_VARREDURA_ATIVA", "true").lower() == "true"
+GEMINI_VARREDURA_INTERVALO = int(os.getenv("GEMINI_VARREDURA_INTERVALO", "3600"))
+
+# Recorte das páginas com tabelas de preços antes do envio ao Gemini
+PDP_RECORTE_PAGINAS = os.getenv("PDP_RECORTE_PAGINAS", "true").lower() == "true"
+PDP_TOKENS_POR_DOCUMENTO = int(os.getenv("PDP_TOKENS_POR_DOCUMENTO", "8000"))
+
+# Cache dos itens extraídos de cada documento do PNCP
+PDP_MODELO_EXTRACAO = os.getenv("PDP_MODELO_EXTRACAO", "gemini-2.0-flash")
+PDP_EXTRACAO_TTL = int(os.getenv("PDP_EXTRACAO_TTL", "7776000"))  # extrações sem uso há mais que isso são removidas (s)
+
+# Gateway assíncrono de chamadas ao Gemini (compartilhado por todos os artefatos)
+GEMINI_MAX_CONCORRENCIA = int(os.getenv("GEMINI_MAX_CONCORRENCIA", "8"))
+GEMINI_CONCORRENCIA_MODELO = int(os.getenv("GEMINI_CONCORRENCIA_MODELO", "4"))  # padrão para modelos sem limite próprio
+GEMINI_LIMITES_MODELO = {
+    nome.strip(): int(limite)
+    for nome, _, limite in (
+        item.partition(":") for item in os.getenv("GEMINI_LIMITES_MODELO", "gemini-2.5-flash:2").split(",")
+    ) if nome.strip() and limite.strip()
+}
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "180"))  # por tentativa (s)
+GEMINI_RETENTATIVAS = int(os.getenv("GEMINI_RETENTATIVAS", "3"))
+GEMINI_RETRY_BASE = float(os.getenv("GEMINI_RETRY_BASE", "1.0"))
+GEMINI_RETRY_MAX = float(os.getenv("GEMINI_RETRY_MAX", "20"))
+
+# Cache exato das respostas do Gemini (mesmo modelo, prompt, arquivos e schema)
+LLM_CACHE_ATIVO = os.getenv("LLM_CACHE_ATIVO", "true").lower() == "true"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "604800"))  # segundos
+
+# Context caching do Gemini para os prefixos estáticos dos prompts (instrução de sistema)
+GEMINI_CONTEXTO_CACHE = os.getenv("GEMINI_CONTEXTO_CACHE", "true").lower() == "true"
+GEMINI_CONTEXTO_TTL = int(os.getenv("GEMINI_CONTEXTO_TTL", "3600"))  # segundos
+GEMINI_CONTEXTO_MARGEM = int(os.getenv("GEMINI_CONTEXTO_MARGEM", "300"))  # renova o TTL quando faltar menos que isso (s)
+GEMINI_CONTEXTO_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXTO_MIN_TOKENS", "1024"))  # prefixos menores vão inline
+
+# Fila de gerações de artefatos (worker separado: python -m app.worker)
+JOBS_CONCORRENCIA = int(os.getenv("JOBS_CONCORRENCIA", "2"))  # jobs simultâneos por worker
+JOBS_INTERVALO_POLL = float(os.getenv("JOBS_INTERVALO_POLL", "1.0"))  # segundos entre consultas à fila ociosa
+JOBS_HEARTBEAT = int(os.getenv("JOBS_HEARTBEAT", "15"))
+JOBS_TIMEOUT_HEARTBEAT = int(os.getenv("JOBS_TIMEOUT_HEARTBEAT", "120"))  # job sem heartbeat volta para a fila
+JOBS_MAX_TENTATIVAS = int(os.getenv("JOBS_MAX_TENTATIVAS", "2"))
+# Pedido com a mesma Idempotency-Key de uma geração concluída há menos de JOBS_JANELA_IDEMPOTENCIA segundos recebe o mesmo job
+JOBS_JANELA_IDEMPOTENCIA = int(os.getenv("JOBS_JANELA_IDEMPOTENCIA", "600"))
+# Retrato das métricas de cada worker gravado no Postgres para os /metrics/* da API; some após 3 intervalos sem atualização
+METRICAS_WORKER_INTERVALO = float(os.getenv("METRICAS_WORKER_INTERVALO", "15"))  # segundos
+
+# Eventos de progresso das gerações (NOTIFY/LISTEN -> SSE) e histogramas por etapa
+PROGRESSO_CANAL = os.getenv("PROGRESSO_CANAL", "lia_progresso")
+PROGRESSO_EVENTOS_POR_JOB = int(os.getenv("PROGRESSO_EVENTOS_POR_JOB", "200"))  # reenviados a quem assina no meio
+PROGRESSO_JOBS_RECENTES = int(os.getenv("PROGRESSO_JOBS_RECENTES", "500"))
+PROGRESSO_KEEPALIVE = float(os.getenv("PROGRESSO_KEEPALIVE", "15"))  # comentário SSE para manter a conexão (s)
+PROGRESSO_BUCKETS = [
+    float(b) for b in os.getenv("PROGRESSO_BUCKETS", "0.5,1,2,5,10,30,60,120,300,600").split(",") if b.strip()
+]
+
+# Telemetria do pool de conexões (tempo entre checkout e checkin, por origem)
+POOL_ALERTA_RETENCAO = float(os.getenv("POOL_ALERTA_RETENCAO", "5"))  # segundos com a conexão emprestada
+POOL_BUCKETS = [
+    float(b) for b in os.getenv("POOL_BUCKETS", "0.005,0.01,0.05,0.1,0.5,1,5,30,120").split(",") if b.strip()
+]
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import text
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
 
@@ -27,6 +28,23 @@ class Base(DeclarativeBase):
     pass
 
 
+@asynccontextmanager
+async def lock_exclusivo(chave: int):
+    """
+    Advisory lock de sessão numa conexão dedicada em autocommit, mantida até o
+    fim do bloco (sem transação aberta). Produz False se outro processo já
+    tem o lock; o trabalho do bloco deve usar outras sessões.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        obteve = (await conn.execute(text("SELECT pg_try_advisory_lock(:chave)"), {"chave": chave})).scalar()
+        try:
+            yield bool(obteve)
+        finally:
+            if obteve:
+                await conn.execute(text("SELECT pg_advisory_unlock(:chave)"), {"chave": chave})
+
+
 async def init_async_db():
     async with engine.begin() as conn:
         await conn.execute(text("CREATE SCHEMA IF NOT EXISTS core AUTHORIZATION lia_admin;"))
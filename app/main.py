@@ -1,15 +1,45 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import demo_data_routes, projects_routes, home_routes, dfd_routes, pdp_routes, pgr_routes, etp_routes
+from app.routes import demo_data_routes, projects_routes, home_routes, dfd_routes, pdp_routes, pgr_routes, etp_routes, metrics_routes, jobs_routes
 from app.database import init_async_db
+from app.client import close_pncp_http_client
+from app.config import PNCP_COLETA_ATIVA, GEMINI_VARREDURA_ATIVA
+from app.services.pncp_harvester import harvester
+from app.services.workspace import limpar_workspaces_orfaos
+from app.services.executor import cpu_executor, monitor_loop
+from app.services.gemini_files import gemini_arquivos
+from app.services.gemini_context_cache import caches_contexto
+from app.services.progresso import ouvinte_progresso
 from contextlib import asynccontextmanager
 
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_async_db()
+    monitor = asyncio.create_task(monitor_loop.loop())
+    limpar_workspaces_orfaos()
+    # O modelo de embedding só é carregado no worker (python -m app.worker), onde rodam as buscas
+    coleta_pncp = None
+    if PNCP_COLETA_ATIVA and harvester.termos:
+        coleta_pncp = asyncio.create_task(harvester.loop())
+    varredura_gemini = asyncio.create_task(gemini_arquivos.loop()) if GEMINI_VARREDURA_ATIVA else None
+    progresso = asyncio.create_task(ouvinte_progresso.loop())
     yield
+    progresso.cancel()
+    if varredura_gemini:
+        varredura_gemini.cancel()
+    if coleta_pncp:
+        coleta_pncp.cancel()
+    monitor.cancel()
+    await caches_contexto.encerrar()
+    await close_pncp_http_client()
+    cpu_executor.shutdown(wait=False, cancel_futures=True)
 
 
 app = FastAPI(
@@ -35,4 +65,6 @@ app.include_router(projects_routes.router)
 app.include_router(dfd_routes.router)
 app.include_router(pdp_routes.router)
 app.include_router(pgr_routes.router)
-app.include_router(etp_routes.router)
\ No newline at end of file
+app.include_router(etp_routes.router)
+app.include_router(metrics_routes.router)
+app.include_router(jobs_routes.router)
\ No newline at end of file
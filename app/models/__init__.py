@@ -19,6 +19,14 @@ from app.models.pdp_models import PDP
 from app.models.pgr_models import PGR
 from app.models.solucao_models import SolucaoIdentificada
 
+# Caches e dados auxiliares da pesquisa de mercado
+from app.models.embedding_models import EmbeddingCache
+from app.models.pncp_models import DocumentoPNCP, WatermarkColetaPNCP, ArquivoPNCP, PaginaPNCPCache, ExtracaoDocumentoPNCP
+from app.models.gemini_models import ArquivoGemini, RespostaLLMCache
+
+# Fila de gerações executadas pelo worker
+from app.models.job_models import JobGeracao
+
 # Lista de todas as classes de modelo (útil para debugging)
 __all__ = [
     "Base",
@@ -27,7 +35,16 @@ __all__ = [
     "ETP", 
     "PDP",
     "PGR",
-    "SolucaoIdentificada"
+    "SolucaoIdentificada",
+    "EmbeddingCache",
+    "DocumentoPNCP",
+    "WatermarkColetaPNCP",
+    "ArquivoPNCP",
+    "PaginaPNCPCache",
+    "ExtracaoDocumentoPNCP",
+    "ArquivoGemini",
+    "RespostaLLMCache",
+    "JobGeracao"
 ]
 
 # Verificação opcional - garante que todas as classes foram registradas
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from app.database import Base
+
+class EmbeddingCache(Base):
+    """
+    Cache persistente de embeddings dos textos 'objeto' do PNCP.
+    Chave: SHA-256 do texto normalizado + nome do modelo. Vetor em float16 (bytea).
+    """
+    __tablename__ = "embedding_cache"
+    __table_args__ = {"schema": "core"}
+
+    hash_texto = Column(String(64), primary_key=True)
+    modelo = Column(String(255), primary_key=True)
+
+    dimensao = Column(Integer, nullable=False)
+    vetor = Column(LargeBinary, nullable=False)
+
+    data_criacao = Column(DateTime(timezone=True), server_default=func.now())
+    ultimo_acesso = Column(DateTime(timezone=True), server_default=func.now(), index=True)
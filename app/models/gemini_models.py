@@ -0,0 +1,42 @@
+from sqlalchemy import Column, String, Text, DateTime, BigInteger, Integer, Float, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ArquivoGemini(Base):
+    """
+    Registro dos arquivos enviados à API de arquivos do Gemini, por SHA-256 do
+    conteúdo. Permite reusar o upload enquanto ele não expira.
+    """
+    __tablename__ = "gemini_arquivo"
+    __table_args__ = {"schema": "core"}
+
+    sha256 = Column(String(64), primary_key=True)
+    nome = Column(String(255), nullable=False, unique=True, comment="files/<id> no Gemini")
+    uri = Column(Text, nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    tamanho = Column(BigInteger, nullable=True)
+
+    enviado_em = Column(DateTime(timezone=True), server_default=func.now())
+    expira_em = Column(DateTime(timezone=True), nullable=False, index=True)
+    ultimo_uso = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RespostaLLMCache(Base):
+    """
+    Respostas do Gemini reaproveitadas quando a mesma geração é pedida de
+    novo: a chave é o hash canônico de modelo, instrução de sistema, conteúdo
+    e response_schema.
+    """
+    __tablename__ = "llm_resposta_cache"
+    __table_args__ = {"schema": "core"}
+
+    chave = Column(String(64), primary_key=True)
+    artefato = Column(String(30), nullable=False, index=True)
+    modelo = Column(String(100), nullable=False)
+    resposta = Column(JSON, nullable=False)
+    latencia = Column(Float, nullable=True, comment="segundos gastos na geração original")
+    hits = Column(Integer, nullable=False, default=0)
+
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+    expira_em = Column(DateTime(timezone=True), nullable=False, index=True)
+    ultimo_uso = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,51 @@
+from sqlalchemy import Column, String, Text, DateTime, Integer, JSON, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class JobGeracao(Base):
+    """
+    Fila durável das gerações de artefatos (DFD, PDP, PGR, ETP). A API grava o
+    pedido e responde 202; o worker (python -m app.worker) executa o
+    create_*_service e grava o resultado ou o erro.
+    """
+    __tablename__ = "job_geracao"
+    __table_args__ = (
+        Index("ix_job_geracao_fila", "status", "criado_em"),
+        Index("ix_job_geracao_projeto_tipo", "id_projeto", "tipo", "status"),
+        {"schema": "core"},
+    )
+
+    id = Column(String(36), primary_key=True)
+    tipo = Column(String(10), nullable=False, comment="dfd, pdp, pgr ou etp")
+    id_projeto = Column(Integer, nullable=False, index=True)
+    payload = Column(JSON, nullable=False)
+    usuario = Column(String(255), nullable=False)
+    grupo = Column(String(255), nullable=False)
+    chave_idempotencia = Column(String(64), nullable=True, index=True,
+                                comment="sha256 do pedido (ou do cabeçalho Idempotency-Key); pedidos iguais reaproveitam o job")
+
+    status = Column(String(20), nullable=False, default="pendente", comment="pendente, executando, concluido ou erro")
+    resultado = Column(JSON, nullable=True)
+    erro = Column(Text, nullable=True)
+    codigo_erro = Column(Integer, nullable=True, comment="status HTTP equivalente ao erro")
+    tentativas = Column(Integer, nullable=False, default=0)
+    worker = Column(String(100), nullable=True)
+
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+    iniciado_em = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_em = Column(DateTime(timezone=True), nullable=True)
+    concluido_em = Column(DateTime(timezone=True), nullable=True)
+
+
+class MetricaWorker(Base):
+    """
+    Último retrato das métricas em memória de cada worker (python -m app.worker),
+    gravado periodicamente para que os /metrics/* da API mostrem o trabalho das
+    gerações, que não roda no processo da API.
+    """
+    __tablename__ = "metrica_worker"
+    __table_args__ = {"schema": "core"}
+
+    worker = Column(String(100), primary_key=True, comment="host:pid do worker")
+    dados = Column(Text, nullable=False, comment="JSON com as métricas por fonte (/metrics/<fonte>)")
+    atualizado_em = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
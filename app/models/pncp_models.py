@@ -0,0 +1,106 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, JSON, text
+from sqlalchemy.sql import func
+from app.database import Base
+
+class DocumentoPNCP(Base):
+    """
+    Espelho local dos metadados de atas e contratos do PNCP.
+    Guarda os mesmos campos extraídos em PNCPSearcher._parse_document,
+    mais os filtros (UF, esfera, modalidade) e a data de publicação.
+    """
+    __tablename__ = "pncp_documento"
+    __table_args__ = (
+        Index("ix_pncp_documento_objeto_fts", text("to_tsvector('portuguese', objeto)"), postgresql_using="gin"),
+        {"schema": "core"},
+    )
+
+    id = Column("id_documento", Integer, primary_key=True, index=True)
+    chave = Column(String, unique=True, nullable=False, comment="item_url do PNCP (ou URL de download)")
+    tipo_busca = Column(String(20), nullable=False, index=True, comment="'ata' ou 'contrato'")
+
+    orgao = Column(Text, nullable=False)
+    objeto = Column(Text, nullable=False)
+    tipo = Column(String, nullable=False, comment="document_type retornado pela API")
+    url_visualizacao = Column(Text, nullable=False)
+    url_download = Column(Text, nullable=True)
+
+    uf = Column(String(2), nullable=True, index=True)
+    esfera = Column(String(1), nullable=True)
+    modalidade = Column(String(4), nullable=True)
+    data_publicacao = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    data_coleta = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class WatermarkColetaPNCP(Base):
+    """
+    Marca d'água da coleta incremental: data de publicação mais recente já
+    espelhada para cada tipo de documento e termo de busca.
+    """
+    __tablename__ = "pncp_coleta_watermark"
+    __table_args__ = {"schema": "core"}
+
+    tipo = Column(String(20), primary_key=True)
+    termo = Column(String(255), primary_key=True)
+
+    data_publicacao = Column(DateTime(timezone=True), nullable=True)
+    total_coletado = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ArquivoPNCP(Base):
+    """
+    Índice do armazenamento de documentos baixados do PNCP, endereçado por
+    conteúdo: cada URL de download aponta para um blob identificado pelo
+    SHA-256 (várias URLs podem compartilhar o mesmo blob).
+    """
+    __tablename__ = "pncp_arquivo"
+    __table_args__ = {"schema": "core"}
+
+    url = Column(Text, primary_key=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    tamanho = Column(Integer, nullable=False)
+    content_type = Column(String(255), nullable=True)
+    nome_arquivo = Column(String(255), nullable=False)
+
+    # Validadores HTTP para revalidação condicional
+    etag = Column(String(255), nullable=True)
+    last_modified = Column(String(64), nullable=True)
+
+    baixado_em = Column(DateTime(timezone=True), server_default=func.now())
+    validado_em = Column(DateTime(timezone=True), server_default=func.now())
+    ultimo_acesso = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class PaginaPNCPCache(Base):
+    """
+    Cache compartilhado das páginas de resultado da API de busca do PNCP,
+    indexado pelo hash dos parâmetros normalizados da consulta.
+    """
+    __tablename__ = "pncp_pagina_cache"
+    __table_args__ = {"schema": "core"}
+
+    chave = Column(String(64), primary_key=True, comment="SHA-256 dos parâmetros normalizados")
+    params = Column(JSON, nullable=False)
+    resposta = Column(JSON, nullable=False)
+    buscado_em = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+
+class ExtracaoDocumentoPNCP(Base):
+    """
+    Itens e preços extraídos pelo LLM de um documento do PNCP (formato PpModel),
+    indexados pelo SHA-256 do conteúdo do documento, pelo modelo e pela versão
+    do prompt de extração (mudar qualquer um gera uma extração nova).
+    """
+    __tablename__ = "pncp_extracao"
+    __table_args__ = (
+        Index("ix_pncp_extracao_ultimo_uso", "ultimo_uso"),
+        {"schema": "core"},
+    )
+
+    sha256 = Column(String(64), primary_key=True)
+    modelo = Column(String(100), primary_key=True)
+    versao_prompt = Column(String(16), primary_key=True, comment="hash do prompt de extração e do schema PpModel")
+    extracao = Column(JSON, nullable=False)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+    ultimo_uso = Column(DateTime(timezone=True), server_default=func.now())
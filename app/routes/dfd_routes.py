@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from app.database import get_db
 from app.dependencies import get_current_remote_user, RemoteUser
-from app.services.dfd_services import fetch_dfd_pca_data, create_dfd_service, create_dfd_for_project, update_dfd_for_project, delete_dfd_for_project
+from app.services.dfd_services import fetch_dfd_pca_data, create_dfd_for_project, update_dfd_for_project, delete_dfd_for_project
 from app.schemas.dfd_schemas import DFDCreate, DFDRead, DFDProjectRead, DFDCreator, DFDUpdate
+from app.schemas.job_schemas import JobAceito
+from app.routes.jobs_routes import aceitar_job
 from app.models.projects_models import Projeto
 from app.models.dfd_models import DFD
 from fastapi.templating import Jinja2Templates
@@ -29,20 +31,18 @@ async def get_dfd_pca(db: AsyncSession = Depends(get_db)):
 
 
 # CREATE - Criar novo DFD
-@router.post("/projetos/{project_id}/create_dfd", response_model=DFDProjectRead, status_code=201)
+@router.post("/projetos/{project_id}/create_dfd", response_model=JobAceito, status_code=202)
 async def create_dfd(
     project_id: int,
     dfd_in: DFDCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: RemoteUser = Depends(get_current_remote_user)
+    current_user: RemoteUser = Depends(get_current_remote_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
-    try:
-        dfd = await create_dfd_service(dfd_in, db, current_user, project_id)
-        return dfd
-    except ValueError as ve:
-        raise HTTPException(status_code=404, detail=str(ve))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao criar DFD: {str(e)}")
+    """
+    Enfileira a geração do DFD; o resultado sai em GET /jobs/{job_id}.
+    """
+    return await aceitar_job(db, "dfd", project_id, dfd_in, current_user, idempotency_key)
 
 
 @router.get("/projetos/{projeto_id}/criar_dfd")
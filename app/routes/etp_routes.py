@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import delete
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 from app.database import get_db
 from app.dependencies import get_current_remote_user, RemoteUser
-from app.services.etp_services import create_etp_service, inicializar_analise_etp_projeto
+from app.services.etp_services import inicializar_analise_etp_projeto
 from app.schemas.etp_schemas import ETPCreate, ETPRead, ETPUpdate
+from app.schemas.job_schemas import JobAceito
+from app.routes.jobs_routes import aceitar_job
 from app.models.projects_models import Projeto
 from app.models.etp_models import ETP
 from fastapi.templating import Jinja2Templates
@@ -61,28 +63,20 @@ async def test_etp():
     return {"message": "ETV Router funcionando!", "status": "ok"}
 
 
-@router.post("/projetos/{project_id}/create_etp", response_model=List[ETPRead], status_code=201)
+@router.post("/projetos/{project_id}/create_etp", response_model=JobAceito, status_code=202)
 async def create_etp(
     project_id: int,
     etp_in: ETPCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: RemoteUser = Depends(get_current_remote_user)
+    current_user: RemoteUser = Depends(get_current_remote_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
-    Cria ETP baseado na síntese dos artefatos anteriores (DFD, PDP, PGR).
+    Enfileira a criação do ETP (síntese dos artefatos anteriores: DFD, PDP, PGR);
+    o resultado sai em GET /jobs/{job_id}.
     """
-    logger.info(f"🚀 Criando ETP para projeto {project_id}")
-    try:
-        etp_list = await create_etp_service(etp_in, db, current_user, project_id)
-        logger.info(f"✅ ETP criado com sucesso para projeto {project_id}")
-        return etp_list
-    
-    except ValueError as ve:
-        logger.error(f"❌ Erro de validação ao criar ETP: {ve}")
-        raise HTTPException(status_code=404, detail=str(ve))
-    except Exception as e:
-        logger.error(f"❌ Erro geral ao criar ETP: {e}")
-        raise HTTPException(status_code=500, detail=f"Erro ao criar ETP: {str(e)}")
+    logger.info(f"🚀 Enfileirando ETP para projeto {project_id}")
+    return await aceitar_job(db, "etp", project_id, etp_in, current_user, idempotency_key)
 
 
 @router.get("/projetos/{projeto_id}/criar_etp")
@@ -0,0 +1,141 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from pydantic import BaseModel
+from typing import AsyncIterator, List, Optional
+
+import json
+import asyncio
+
+from app.database import get_db, SessionLocal
+from app.dependencies import get_current_remote_user, RemoteUser
+from app.models.job_models import JobGeracao
+from app.schemas.job_schemas import JobAceito, JobRead
+from app.services.jobs import enfileirar, obter_job
+from app.services.progresso import ouvinte_progresso
+from app.config import PROGRESSO_KEEPALIVE
+
+router = APIRouter(tags=["Jobs"])
+
+
+async def aceitar_job(db: AsyncSession, tipo: str, project_id: int, dados: BaseModel, current_user: RemoteUser,
+                      idempotency_key: Optional[str] = None) -> JobAceito:
+    """
+    Enfileira a geração e monta a resposta 202 dos endpoints create_*.
+    Pedidos repetidos recebem o job já existente; conflitantes, 409.
+    """
+    try:
+        job, reaproveitado = await enfileirar(db, tipo, project_id, dados, current_user, idempotency_key)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao enfileirar a geração: {str(e)}")
+    return JobAceito(
+        job_id=job.id,
+        tipo=tipo,
+        id_projeto=project_id,
+        status=job.status,
+        url_status=f"/jobs/{job.id}",
+        url_eventos=f"/jobs/{job.id}/eventos",
+        reaproveitado=reaproveitado,
+    )
+
+
+def _sse(evento: dict, nome: str = "progresso") -> str:
+    return f"event: {nome}\ndata: {json.dumps(evento, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _transmitir(request: Request, fila: asyncio.Queue, job_id: Optional[str] = None) -> AsyncIterator[str]:
+    """Repassa os eventos da fila como SSE; no stream de um job, encerra no evento terminal"""
+    while True:
+        if await request.is_disconnected():
+            return
+        try:
+            evento = await asyncio.wait_for(fila.get(), timeout=PROGRESSO_KEEPALIVE)
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+        yield _sse(evento)
+        if job_id and evento.get("status") in ("concluido", "erro"):
+            yield _sse({"job_id": job_id, "status": evento["status"]}, nome="fim")
+            return
+
+
+@router.get("/jobs/{job_id}", response_model=JobRead)
+async def get_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: RemoteUser = Depends(get_current_remote_user)
+):
+    """
+    Estado de uma geração: pendente, executando, concluido (com o resultado) ou erro.
+    """
+    job = await obter_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
+@router.get("/jobs/{job_id}/eventos")
+async def get_job_eventos(
+    job_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: RemoteUser = Depends(get_current_remote_user)
+):
+    """
+    Progresso da geração em tempo real (text/event-stream): etapas, páginas do
+    PNCP, PDFs baixados e enviados, chamadas à IA. Termina com o evento 'fim'.
+    """
+    job = await obter_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+
+    async def eventos():
+        # Assina antes de conferir o status para não perder o evento terminal
+        async with ouvinte_progresso.assinar(job_id=job_id) as fila:
+            async with SessionLocal() as session:
+                status = (await obter_job(session, job_id)).status
+            if status in ("concluido", "erro"):
+                yield _sse({"job_id": job_id, "status": status}, nome="fim")
+                return
+            async for mensagem in _transmitir(request, fila, job_id=job_id):
+                yield mensagem
+
+    return StreamingResponse(eventos(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/projetos/{project_id}/progresso")
+async def get_progresso_projeto(
+    project_id: int,
+    request: Request,
+    current_user: RemoteUser = Depends(get_current_remote_user)
+):
+    """
+    Eventos de progresso de todas as gerações do projeto (text/event-stream).
+    """
+    async def eventos():
+        async with ouvinte_progresso.assinar(id_projeto=project_id) as fila:
+            async for mensagem in _transmitir(request, fila):
+                yield mensagem
+
+    return StreamingResponse(eventos(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/projetos/{project_id}/jobs", response_model=List[JobRead])
+async def get_jobs_projeto(
+    project_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: RemoteUser = Depends(get_current_remote_user)
+):
+    """
+    Últimas gerações do projeto (mais recentes primeiro).
+    """
+    result = await db.execute(
+        select(JobGeracao)
+        .where(JobGeracao.id_projeto == project_id)
+        .order_by(JobGeracao.criado_em.desc())
+        .limit(20)
+    )
+    return result.scalars().all()
@@ -0,0 +1,140 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.database import SessionLocal
+
+from app.services.embedding_registry import model_registry
+from app.services.metricas_worker import por_processo
+from app.services.jobs import resumo_fila
+from app.services.progresso import ouvinte_progresso
+
+router = APIRouter(tags=["Métricas"])
+
+# As métricas em memória voltam por processo: "api" (este processo) e "workers" (último
+# retrato publicado por cada python -m app.worker, onde rodam as gerações)
+
+
+@router.get("/health")
+async def health():
+    """Prontidão da API: depende só do banco (as buscas e o modelo de embedding ficam no worker)"""
+    try:
+        async with SessionLocal() as session:
+            await session.execute(text("SELECT 1"))
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"pronto": False, "erro": str(e)})
+    return {"pronto": True}
+
+
+@router.get("/health/embeddings")
+async def embeddings_health():
+    """Estado do modelo de embedding neste processo (informativo: na API ele não é carregado)"""
+    return {"pronto": model_registry.pronto, "modelo": model_registry.model_name}
+
+
+@router.get("/metrics/embeddings")
+async def embeddings_metrics():
+    """Métricas de carga do modelo de embedding (na API ele não é carregado; ver "workers")"""
+    return await por_processo("embeddings")
+
+
+@router.get("/metrics/embedding_cache")
+async def embedding_cache_metrics():
+    """Acertos/erros do cache de embeddings dos objetos do PNCP"""
+    return await por_processo("embedding_cache")
+
+
+@router.get("/metrics/pncp_coleta")
+async def pncp_coleta_metrics():
+    """Situação da coleta incremental do espelho local do PNCP"""
+    return await por_processo("pncp_coleta")
+
+
+@router.get("/metrics/indice_vetorial")
+async def indice_vetorial_metrics():
+    """Situação do índice vetorial em disco compartilhado pelos workers"""
+    return await por_processo("indice_vetorial")
+
+
+@router.get("/metrics/documentos")
+async def documentos_metrics():
+    """Reuso e downloads do armazenamento de documentos do PNCP"""
+    return await por_processo("documentos")
+
+
+@router.get("/metrics/event_loop")
+async def event_loop_metrics():
+    """Atraso do event loop da API e de cada worker (trabalho bloqueante aparece aqui)"""
+    return await por_processo("event_loop")
+
+
+@router.get("/metrics/ranking_incremental")
+async def ranking_incremental_metrics():
+    """Páginas do PNCP buscadas e economizadas pelo ranking incremental"""
+    return await por_processo("ranking_incremental")
+
+
+@router.get("/metrics/pncp_cliente")
+async def pncp_cliente_metrics():
+    """Taxa, concorrência adaptativa, retentativas e circuit breaker das chamadas ao PNCP"""
+    return await por_processo("pncp_cliente")
+
+
+@router.get("/metrics/pncp_cache_paginas")
+async def pncp_cache_paginas_metrics():
+    """Taxa de acerto do cache compartilhado de páginas de busca do PNCP"""
+    return await por_processo("pncp_cache_paginas")
+
+
+@router.get("/metrics/gemini_arquivos")
+async def gemini_arquivos_metrics():
+    """Reuso e limpeza dos uploads na API de arquivos do Gemini"""
+    return await por_processo("gemini_arquivos")
+
+
+@router.get("/metrics/recorte_pdf")
+async def recorte_pdf_metrics():
+    """Páginas e tokens estimados poupados pelo recorte dos PDFs enviados ao Gemini"""
+    return await por_processo("recorte_pdf")
+
+
+@router.get("/metrics/extracoes")
+async def extracoes_metrics():
+    """Reuso dos itens extraídos de cada documento do PNCP"""
+    return await por_processo("extracoes")
+
+
+@router.get("/metrics/llm")
+async def llm_metrics():
+    """Chamadas ao Gemini pelo gateway: concorrência, latência, erros e retentativas por modelo"""
+    return await por_processo("llm")
+
+
+@router.get("/metrics/llm_cache")
+async def llm_cache_metrics():
+    """Cache exato das respostas do Gemini: taxa de acerto e latência economizada por artefato"""
+    return await por_processo("llm_cache")
+
+
+@router.get("/metrics/gemini_contexto")
+async def gemini_contexto_metrics():
+    """Caches de contexto dos prompts estáticos (tokens cacheados por modelo em /metrics/llm)"""
+    return await por_processo("gemini_contexto")
+
+
+@router.get("/metrics/jobs")
+async def jobs_metrics():
+    """Fila de gerações: jobs por status e tempos médios de espera e execução"""
+    return await resumo_fila()
+
+
+@router.get("/metrics/etapas")
+async def etapas_metrics():
+    """Histogramas de latência por etapa das gerações (download, upload, extração, geração, gravação)"""
+    return ouvinte_progresso.metrics()
+
+
+@router.get("/metrics/pool_db")
+async def pool_db_metrics():
+    """Pool de conexões da API e de cada worker: estado atual e tempo de retenção por origem (web ou job_<tipo>)"""
+    return await por_processo("pool_db")
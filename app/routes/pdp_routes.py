@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import delete
 from sqlalchemy.orm import selectinload
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, date
 
 from app.database import get_db
 from app.dependencies import get_current_remote_user, RemoteUser
-from app.services.pdp_services import create_pdp_service, inicializar_analise_projeto, update_pdp_for_project
+from app.services.pdp_services import inicializar_analise_projeto, update_pdp_for_project
 from app.schemas.pdp_schemas import PDPCreate, PDPRead, PDPUpdate
+from app.schemas.job_schemas import JobAceito
+from app.routes.jobs_routes import aceitar_job
 from app.models.projects_models import Projeto
 from app.models.pdp_models import PDP
 from app.models.solucao_models import SolucaoIdentificada
@@ -28,25 +30,19 @@ templates_pdp = Jinja2Templates(directory="frontend/templates/pdp")
 logger = logging.getLogger(__name__)
 
 
-@router.post("/projetos/{project_id}/create_pdp", response_model=List[PDPRead], status_code=201)
+@router.post("/projetos/{project_id}/create_pdp", response_model=JobAceito, status_code=202)
 async def create_pdp(
     project_id: int,
     pdp_in: PDPCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: RemoteUser = Depends(get_current_remote_user)
+    current_user: RemoteUser = Depends(get_current_remote_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
-    Cria PDP baseado nos dados da IA e pesquisa de mercado.
-    Agora o service é responsável por criar o PDP com dados reais.
+    Enfileira a criação do PDP (pesquisa de mercado + IA); o worker executa
+    create_pdp_service e o resultado sai em GET /jobs/{job_id}.
     """
-    try:
-        pdp_list = await create_pdp_service(pdp_in, db, current_user, project_id)
-        return pdp_list
-    
-    except ValueError as ve:
-        raise HTTPException(status_code=404, detail=str(ve))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao criar PDP: {str(e)}")
+    return await aceitar_job(db, "pdp", project_id, pdp_in, current_user, idempotency_key)
 
 
 @router.get("/projetos/{projeto_id}/criar_pdp")
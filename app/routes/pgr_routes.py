@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import delete
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 from app.database import get_db
 from app.dependencies import get_current_remote_user, RemoteUser
-from app.services.pgr_services import create_pgr_service, inicializar_analise_riscos_projeto
+from app.services.pgr_services import inicializar_analise_riscos_projeto
+from app.schemas.job_schemas import JobAceito
+from app.routes.jobs_routes import aceitar_job
 from app.schemas.pgr_schemas import PGRCreate, PGRRead
 from app.models.projects_models import Projeto
 from app.models.pgr_models import PGR
@@ -41,28 +43,20 @@ async def test_pgr():
     return {"message": "PGR Router funcionando!", "status": "ok"}
 
 
-@router.post("/projetos/{project_id}/create_pgr", response_model=List[PGRRead], status_code=201)
+@router.post("/projetos/{project_id}/create_pgr", response_model=JobAceito, status_code=202)
 async def create_pgr(
     project_id: int,
     pgr_in: PGRCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: RemoteUser = Depends(get_current_remote_user)
+    current_user: RemoteUser = Depends(get_current_remote_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
-    Cria PGR baseado na análise de riscos das soluções identificadas.
+    Enfileira a criação do PGR (análise de riscos das soluções identificadas);
+    o resultado sai em GET /jobs/{job_id}.
     """
-    logger.info(f"🚀 Criando PGR para projeto {project_id}")
-    try:
-        pgr_list = await create_pgr_service(pgr_in, db, current_user, project_id)
-        logger.info(f"✅ PGR criado com sucesso para projeto {project_id}")
-        return pgr_list
-    
-    except ValueError as ve:
-        logger.error(f"❌ Erro de validação ao criar PGR: {ve}")
-        raise HTTPException(status_code=404, detail=str(ve))
-    except Exception as e:
-        logger.error(f"❌ Erro geral ao criar PGR: {e}")
-        raise HTTPException(status_code=500, detail=f"Erro ao criar PGR: {str(e)}")
+    logger.info(f"🚀 Enfileirando PGR para projeto {project_id}")
+    return await aceitar_job(db, "pgr", project_id, pgr_in, current_user, idempotency_key)
 
 
 @router.get("/projetos/{projeto_id}/criar_pgr")
@@ -5,6 +5,7 @@ from datetime import datetime
 class DFDCreate(BaseModel):
     descricao: str
     item: int
+    forcar_regeneracao: bool = False
 
 
 class QuantidadeJustifica(BaseModel):
@@ -9,6 +9,7 @@ class ETPCreate(BaseModel):
     """
     prompt_usuario: str = Field(..., description="Prompt do usuário para guiar a geração do ETP")
     parametros_etp: Optional[Dict[str, Any]] = Field(default=None, description="Parâmetros adicionais para geração")
+    forcar_regeneracao: bool = Field(default=False, description="Ignora a resposta da IA em cache e gera novamente")
 
 
 class LevantamentoMercado(BaseModel):
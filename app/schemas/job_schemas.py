@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from typing import Optional, Any
+from datetime import datetime
+
+
+class JobAceito(BaseModel):
+    """Resposta 202 dos endpoints create_*: a geração foi enfileirada"""
+    job_id: str
+    tipo: str
+    id_projeto: int
+    status: str
+    url_status: str
+    url_eventos: str
+    reaproveitado: bool = False  # True quando o pedido foi anexado a uma geração já existente
+
+
+class JobRead(BaseModel):
+    """Estado de um job de geração (para polling)"""
+    id: str
+    tipo: str
+    id_projeto: int
+    status: str
+    resultado: Optional[Any] = None
+    erro: Optional[str] = None
+    codigo_erro: Optional[int] = None
+    tentativas: int
+    criado_em: Optional[datetime] = None
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -91,6 +91,7 @@ class PDPCreate(BaseModel):
     ufs: Optional[List[str]] = Field(default_factory=list, description="UFs para filtrar busca")
     esferas: Optional[List[str]] = Field(default_factory=list, description="Esferas para filtrar busca")
     modalidades: Optional[List[str]] = Field(default_factory=list, description="Modalidades para filtrar busca")
+    forcar_regeneracao: bool = Field(default=False, description="Ignora a resposta da IA em cache e gera novamente")
 
 class PDPRead(BaseModel):
     """Schema para leitura de PDP"""
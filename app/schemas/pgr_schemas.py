@@ -10,6 +10,7 @@ class PGRCreate(BaseModel):
     prompt_usuario: str = Field(..., description="Prompt do usuário para guiar a análise de riscos")
     solucoes_selecionadas: Optional[List[int]] = Field(default=None, description="IDs das soluções para análise (opcional)")
     parametros_analise: Optional[Dict[str, Any]] = Field(default=None, description="Parâmetros adicionais para análise")
+    forcar_regeneracao: bool = Field(default=False, description="Ignora a resposta da IA em cache e gera novamente")
 
 
 class PGRRead(BaseModel):
@@ -1,8 +1,8 @@
 from app.services.prompts.dfd_prompts import prompt_sistema
 from app.schemas.dfd_schemas import dfdModel
 from fastapi import HTTPException
-from app.client import get_genai_client
-from google.genai import types
+from app.services.llm_gateway import llm_gateway
+from app.services.progresso import emitir
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
@@ -64,9 +64,6 @@ async def create_dfd_service(dfd_in: DFDCreate, db: AsyncSession, current_user:
     contexto_db = await buscar_item_por_id(db, item_id)
 
     prompt_final_completo = f"""
-    {prompt_sistema}
-
-    ---
     Contexto do Banco de Dados (JSON):
     {json.dumps(contexto_db, indent=2, ensure_ascii=False)}
 
@@ -78,8 +75,10 @@ async def create_dfd_service(dfd_in: DFDCreate, db: AsyncSession, current_user:
     print(prompt_final_completo)
     print("******************************")
 
-    # Chama a IA
-    resposta_ia = await consulta_ia(prompt_final_completo)
+    # Chama a IA (sem transação aberta: a conexão volta ao pool durante a chamada)
+    await db.commit()
+    emitir("contexto", "Contexto do item do PCA carregado")
+    resposta_ia = await consulta_ia(prompt_final_completo, dfd_in.forcar_regeneracao)
     print(resposta_ia)
 
     resposta = resposta_ia[0]  # Extrai o dicionário de dentro da lista
@@ -164,6 +163,7 @@ async def create_dfd_service(dfd_in: DFDCreate, db: AsyncSession, current_user:
     )
 
     # Persiste no banco
+    emitir("gravacao", "Gravando o DFD")
     db.add(novo_dfd)
     try:
         await db.commit()
@@ -240,41 +240,19 @@ async def buscar_item_por_id(db: AsyncSession, item_id):
 
 
 
-async def consulta_ia(prompt_final_completo):
+async def consulta_ia(prompt_final_completo, forcar_regeneracao: bool = False):
     
     try:
-        client = get_genai_client()
         model = "gemini-2.0-flash"
         
-        contents = [
-            types.Content(
-                role="user",
-                parts=[types.Part.from_text(text=prompt_final_completo)],
-            ),
-        ]
-        
-        generate_content_config = types.GenerateContentConfig(
-            response_mime_type="application/json",
-            response_schema=list[dfdModel],
-        )
-        
         print("--- Aguardando resposta da API Gemini... ---")
         
-        response_chunks = []
-        # O bloco 'for' começa aqui. Todo o conteúdo dele deve estar indentado.
-        for chunk in client.models.generate_content_stream(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        ):
-            response_chunks.append(chunk.text)
-        # Fim da indentação do bloco 'for'.
-
-        full_response_json = "".join(response_chunks)
-
-        # ETAPA 4: Exibir a saída. Este código está fora do loop 'for', mas dentro do 'try'.
+        dados_formatados = await llm_gateway.gerar_json(
+            model, prompt_final_completo, schema=list[dfdModel], system_instruction=prompt_sistema,
+            artefato="dfd", forcar_regeneracao=forcar_regeneracao,
+        )
+
         print("\n--- Resposta da API Gemini (JSON Estruturado) ---")
-        dados_formatados = json.loads(full_response_json)
         result = json.dumps(dados_formatados, indent=4, ensure_ascii=False)
         #print(result)
 
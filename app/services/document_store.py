@@ -0,0 +1,314 @@
+import os
+import time
+import asyncio
+import fcntl
+import shutil
+import hashlib
+import logging
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Dict, Any
+
+import httpx
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.services.pncp_client import pncp_client, CircuitoAbertoError, ErroTransitorioPNCP
+from app.database import SessionLocal
+from app.models.pncp_models import ArquivoPNCP
+from app.config import (
+    DOCUMENTOS_DIR, DOCUMENTOS_QUOTA_MB, DOCUMENTOS_REVALIDAR_APOS, DOCUMENTOS_QUOTA_INTERVALO, DOCUMENTOS_GRACA_REMOCAO
+)
+
+logger = logging.getLogger(__name__)
+
+# ioctl FICLONE do Linux (reflink em btrfs/xfs)
+FICLONE = 0x40049409
+
+
+@dataclass
+class ArquivoArmazenado:
+    """Documento disponível no armazenamento local"""
+    url: str
+    sha256: str
+    caminho: str
+    nome_arquivo: str
+    content_type: Optional[str]
+    tamanho: int
+
+
+class DocumentStore:
+    """
+    Armazenamento persistente de documentos do PNCP endereçado por conteúdo.
+
+    Os blobs ficam em objetos/<sha[:2]>/<sha256> e a tabela core.pncp_arquivo
+    mapeia cada URL de download para o seu blob. Uma URL já baixada é servida
+    localmente; passado DOCUMENTOS_REVALIDAR_APOS, é revalidada com
+    If-None-Match/If-Modified-Since. As cópias de trabalho são materializadas
+    por hardlink (ou reflink), sem duplicar bytes, e o total é limitado a
+    DOCUMENTOS_QUOTA_MB removendo os documentos acessados há mais tempo.
+
+    O total é mantido em memória (somando os blobs novos deste processo) e
+    recalculado no banco a cada DOCUMENTOS_QUOTA_INTERVALO segundos, já que
+    outros processos também gravam; a remoção só roda com o total acima da
+    quota e poupa os blobs acessados nos últimos DOCUMENTOS_GRACA_REMOCAO
+    segundos, que podem estar sendo materializados por outro job.
+    """
+
+    def __init__(self, diretorio: str, quota_bytes: int, revalidar_apos: int,
+                 intervalo_quota: int = DOCUMENTOS_QUOTA_INTERVALO, graca_remocao: int = DOCUMENTOS_GRACA_REMOCAO):
+        self.diretorio = diretorio
+        self.dir_objetos = os.path.join(diretorio, "objetos")
+        self.dir_temp = os.path.join(diretorio, "tmp")
+        self.quota_bytes = quota_bytes
+        self.revalidar_apos = timedelta(seconds=revalidar_apos)
+        self.intervalo_quota = intervalo_quota
+        self.graca_remocao = timedelta(seconds=graca_remocao)
+        self._total: Optional[int] = None
+        self._total_em = 0.0
+        self._sem_candidatos = False
+        self.hits = 0
+        self.revalidados = 0
+        self.downloads = 0
+        self.bytes_baixados = 0
+        self.removidos = 0
+        for directory in [self.dir_objetos, self.dir_temp]:
+            os.makedirs(directory, exist_ok=True)
+
+    def caminho_blob(self, sha256: str) -> str:
+        return os.path.join(self.dir_objetos, sha256[:2], sha256)
+
+    def _armazenado(self, linha: ArquivoPNCP) -> ArquivoArmazenado:
+        return ArquivoArmazenado(
+            url=linha.url,
+            sha256=linha.sha256,
+            caminho=self.caminho_blob(linha.sha256),
+            nome_arquivo=linha.nome_arquivo,
+            content_type=linha.content_type,
+            tamanho=linha.tamanho,
+        )
+
+    async def obter(self, url: str, nomear: Callable[[httpx.Response], str]) -> Optional[ArquivoArmazenado]:
+        """
+        Retorna o documento da URL, baixando ou revalidando apenas quando
+        necessário. 'nomear' gera o nome do arquivo a partir da resposta HTTP.
+        """
+        async with SessionLocal() as session:
+            linha = await session.get(ArquivoPNCP, url)
+
+        if linha and not os.path.exists(self.caminho_blob(linha.sha256)):
+            linha = None
+
+        if linha and datetime.now(timezone.utc) - linha.validado_em < self.revalidar_apos:
+            self.hits += 1
+            await self._registrar_acesso(url, revalidado=False)
+            return self._armazenado(linha)
+
+        headers = {}
+        if linha and linha.etag:
+            headers["If-None-Match"] = linha.etag
+        if linha and linha.last_modified:
+            headers["If-Modified-Since"] = linha.last_modified
+
+        try:
+            async with pncp_client.stream(url, headers=headers) as response:
+                if response.status_code == 304 and linha:
+                    self.revalidados += 1
+                    await self._registrar_acesso(url, revalidado=True)
+                    return self._armazenado(linha)
+
+                response.raise_for_status()
+                sha256, tamanho, novo = await self._gravar_blob(response)
+                nome_arquivo = nomear(response)
+                valores = {
+                    "url": url,
+                    "sha256": sha256,
+                    "tamanho": tamanho,
+                    "content_type": response.headers.get("content-type"),
+                    "nome_arquivo": nome_arquivo,
+                    "etag": response.headers.get("etag"),
+                    "last_modified": response.headers.get("last-modified"),
+                }
+        except (CircuitoAbertoError, ErroTransitorioPNCP, httpx.TransportError) as e:
+            if not linha:
+                raise
+            # PNCP fora do ar: serve a versão armazenada mesmo sem revalidar
+            logger.warning(f"🗃️ PNCP indisponível ({e}); servindo documento armazenado sem revalidação: {url}")
+            await self._registrar_acesso(url, revalidado=False)
+            return self._armazenado(linha)
+
+        stmt = insert(ArquivoPNCP).values(**valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ArquivoPNCP.url],
+            set_={k: stmt.excluded[k] for k in valores if k != "url"} | {
+                "baixado_em": func.now(), "validado_em": func.now(), "ultimo_acesso": func.now()
+            },
+        )
+        sha_anterior = linha.sha256 if linha and linha.sha256 != sha256 else None
+        async with SessionLocal() as session:
+            await session.execute(stmt)
+            await session.commit()
+            # Conteúdo mudou na revalidação: o blob anterior sai se nenhuma outra URL o usa
+            if sha_anterior:
+                em_uso = (await session.execute(
+                    select(func.count()).select_from(ArquivoPNCP).where(ArquivoPNCP.sha256 == sha_anterior)
+                )).scalar()
+                if not em_uso:
+                    await asyncio.to_thread(self._remover_blobs, [sha_anterior])
+                    if self._total is not None:
+                        self._total -= linha.tamanho
+                    logger.info(f"🧹 Conteúdo de {url} mudou; blob anterior {sha_anterior[:12]} removido")
+
+        if novo and self._total is not None:
+            self._total += tamanho
+        await self.aplicar_quota()
+        return ArquivoArmazenado(
+            url=url, sha256=sha256, caminho=self.caminho_blob(sha256), nome_arquivo=nome_arquivo,
+            content_type=valores["content_type"], tamanho=tamanho,
+        )
+
+    async def _gravar_blob(self, response: httpx.Response):
+        """Grava o corpo da resposta num temporário calculando o SHA-256 e o move para o blob"""
+        digest = hashlib.sha256()
+        tamanho = 0
+        fd, temporario = tempfile.mkstemp(dir=self.dir_temp)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in response.aiter_bytes(chunk_size=65536):
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+                    tamanho += len(chunk)
+            sha256 = digest.hexdigest()
+            novo = await asyncio.to_thread(self._publicar_blob, temporario, sha256)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+        self.downloads += 1
+        self.bytes_baixados += tamanho
+        return sha256, tamanho, novo
+
+    def _publicar_blob(self, temporario: str, sha256: str) -> bool:
+        """Move o temporário para o caminho do blob (ou descarta, se o conteúdo já existe); True se o blob é novo"""
+        destino = self.caminho_blob(sha256)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        if os.path.exists(destino):
+            os.remove(temporario)
+            return False
+        os.replace(temporario, destino)
+        return True
+
+    async def _registrar_acesso(self, url: str, revalidado: bool):
+        valores = {"ultimo_acesso": func.now()}
+        if revalidado:
+            valores["validado_em"] = func.now()
+        async with SessionLocal() as session:
+            await session.execute(update(ArquivoPNCP).where(ArquivoPNCP.url == url).values(**valores))
+            await session.commit()
+
+    def materializar(self, origem: str, destino: str):
+        """
+        Disponibiliza o blob em 'destino' sem copiar bytes: hardlink, reflink
+        ou, em último caso, cópia.
+        """
+        if os.path.exists(destino):
+            os.remove(destino)
+        try:
+            os.link(origem, destino)
+            return
+        except OSError:
+            pass
+        try:
+            with open(origem, "rb") as src, open(destino, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return
+        except OSError:
+            pass
+        shutil.copyfile(origem, destino)
+
+    async def _total_no_banco(self, session) -> int:
+        por_blob = (
+            select(func.max(ArquivoPNCP.tamanho).label("tamanho"))
+            .group_by(ArquivoPNCP.sha256)
+            .subquery()
+        )
+        return int((await session.execute(select(func.coalesce(func.sum(por_blob.c.tamanho), 0)))).scalar())
+
+    async def aplicar_quota(self):
+        """
+        Remove os documentos acessados há mais tempo até o total caber na quota.
+        Com o total em memória recente e dentro da quota (ou sem nada removível
+        na última verificação), não consulta o banco.
+        """
+        recente = time.monotonic() - self._total_em < self.intervalo_quota
+        if self._total is not None and recente and (self._total <= self.quota_bytes or self._sem_candidatos):
+            return
+
+        async with SessionLocal() as session:
+            total = await self._total_no_banco(session)
+            self._total, self._total_em = total, time.monotonic()
+            if total <= self.quota_bytes:
+                self._sem_candidatos = False
+                return
+
+            # Blobs acessados há pouco podem estar sendo materializados por outro job
+            limite = datetime.now(timezone.utc) - self.graca_remocao
+            result = await session.execute(
+                select(ArquivoPNCP.sha256, func.max(ArquivoPNCP.tamanho))
+                .group_by(ArquivoPNCP.sha256)
+                .having(func.max(ArquivoPNCP.ultimo_acesso) < limite)
+                .order_by(func.max(ArquivoPNCP.ultimo_acesso).asc())
+            )
+            remover = []
+            for sha256, tamanho in result:
+                if total <= self.quota_bytes:
+                    break
+                remover.append(sha256)
+                total -= tamanho
+
+            if remover:
+                # Uma URL do blob acessada entre a consulta e a remoção mantém a linha e o blob
+                await session.execute(
+                    delete(ArquivoPNCP).where(ArquivoPNCP.sha256.in_(remover), ArquivoPNCP.ultimo_acesso < limite)
+                )
+                mantidos = set((await session.execute(
+                    select(ArquivoPNCP.sha256).where(ArquivoPNCP.sha256.in_(remover)).distinct()
+                )).scalars())
+                await session.commit()
+                remover = [sha256 for sha256 in remover if sha256 not in mantidos]
+            self._total = total
+
+        self._sem_candidatos = total > self.quota_bytes
+        if self._sem_candidatos:
+            logger.warning(
+                f"🗃️ Armazenamento de documentos acima da quota: os demais blobs foram acessados "
+                f"há menos de {int(self.graca_remocao.total_seconds())}s"
+            )
+        if not remover:
+            return
+        await asyncio.to_thread(self._remover_blobs, remover)
+        self.removidos += len(remover)
+        logger.info(f"🧹 Armazenamento de documentos: {len(remover)} documentos removidos pela quota")
+
+    def _remover_blobs(self, hashes):
+        for sha256 in hashes:
+            try:
+                os.remove(self.caminho_blob(sha256))
+            except FileNotFoundError:
+                pass
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "revalidados_304": self.revalidados,
+            "downloads": self.downloads,
+            "bytes_baixados": self.bytes_baixados,
+            "removidos_quota": self.removidos,
+            "quota_bytes": self.quota_bytes,
+            "total_estimado_bytes": self._total,
+        }
+
+
+document_store = DocumentStore(DOCUMENTOS_DIR, DOCUMENTOS_QUOTA_MB * 1024 * 1024, DOCUMENTOS_REVALIDAR_APOS)
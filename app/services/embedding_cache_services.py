@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Any
+
+import numpy as np
+from cachetools import LRUCache
+from sqlalchemy import select, update, delete, func, tuple_, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import SessionLocal
+from app.models.embedding_models import EmbeddingCache
+from app.services.executor import executar_cpu
+from app.config import EMBEDDING_CACHE_MEMORIA, EMBEDDING_CACHE_MAX_LINHAS
+
+logger = logging.getLogger(__name__)
+
+
+def hash_texto(texto: str) -> str:
+    """
+    Chave de conteúdo do texto: SHA-256 com os espaços normalizados. Maiúsculas
+    e minúsculas são preservadas, pois os modelos configurados são cased.
+    """
+    return hashlib.sha256(" ".join(texto.split()).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCacheService:
+    """
+    Cache de embeddings em dois níveis: LRU em memória na frente de uma tabela
+    no Postgres (float16/bytea) compartilhada por todos os workers. Apenas os
+    textos nunca vistos chegam ao model.encode.
+
+    A tabela é limitada a EMBEDDING_CACHE_MAX_LINHAS (pela estimativa de linhas
+    do pg_class, sem count(*)); quando excede, as linhas com acesso mais
+    antigo são removidas.
+    """
+
+    def __init__(self, max_memoria: int, max_linhas: int):
+        self.max_linhas = max_linhas
+        self._lru = LRUCache(maxsize=max_memoria)
+        self._lock = threading.Lock()
+        self.hits_memoria = 0
+        self.hits_banco = 0
+        self.misses = 0
+        self.erros_banco = 0
+        self.removidos = 0
+
+    def _lru_get(self, chave):
+        with self._lock:
+            return self._lru.get(chave)
+
+    def _lru_set(self, chave, vetor: np.ndarray):
+        with self._lock:
+            self._lru[chave] = vetor
+
+    async def encode(self, model, model_name: str, textos: List[str]) -> np.ndarray:
+        """
+        Retorna os embeddings dos textos (float32, na ordem de entrada),
+        calculando apenas os que não estão no cache.
+        """
+        hashes = [hash_texto(t) for t in textos]
+        vetores: Dict[str, np.ndarray] = {}
+
+        # 1. LRU em memória
+        for h in set(hashes):
+            vetor = self._lru_get((model_name, h))
+            if vetor is not None:
+                vetores[h] = vetor
+        self.hits_memoria += sum(1 for h in hashes if h in vetores)
+
+        # 2. Tabela no Postgres
+        faltantes = list({h for h in hashes if h not in vetores})
+        if faltantes:
+            encontrados = await self._buscar_banco(model_name, faltantes)
+            for h, vetor in encontrados.items():
+                vetores[h] = vetor
+                self._lru_set((model_name, h), vetor)
+            self.hits_banco += sum(1 for h in hashes if h in encontrados)
+
+        # 3. Encode apenas dos textos inéditos (deduplicados)
+        texto_por_hash = {}
+        for h, t in zip(hashes, textos):
+            if h not in vetores:
+                texto_por_hash.setdefault(h, t)
+        if texto_por_hash:
+            novos_hashes = list(texto_por_hash.keys())
+            self.misses += sum(1 for h in hashes if h in texto_por_hash)
+            novos = np.asarray(await executar_cpu(model.encode, [texto_por_hash[h] for h in novos_hashes]), dtype=np.float32)
+            for h, vetor in zip(novos_hashes, novos):
+                vetores[h] = vetor
+                self._lru_set((model_name, h), vetor)
+            await self._salvar_banco(model_name, dict(zip(novos_hashes, novos)))
+
+        logger.info(f"🧠 Embeddings: {len(textos)} textos | {len(texto_por_hash)} calculados | {len(textos) - sum(1 for h in hashes if h in texto_por_hash)} do cache")
+        return np.stack([vetores[h] for h in hashes]) if hashes else np.zeros((0, 0), dtype=np.float32)
+
+    async def _buscar_banco(self, model_name: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        try:
+            async with SessionLocal() as session:
+                result = await session.execute(
+                    select(EmbeddingCache.hash_texto, EmbeddingCache.vetor)
+                    .where(EmbeddingCache.modelo == model_name, EmbeddingCache.hash_texto.in_(hashes))
+                )
+                encontrados = {
+                    row.hash_texto: np.frombuffer(row.vetor, dtype=np.float16).astype(np.float32)
+                    for row in result
+                }
+                if encontrados:
+                    await session.execute(
+                        update(EmbeddingCache)
+                        .where(EmbeddingCache.modelo == model_name, EmbeddingCache.hash_texto.in_(list(encontrados)))
+                        .values(ultimo_acesso=func.now())
+                    )
+                    await session.commit()
+                return encontrados
+        except Exception as e:
+            self.erros_banco += 1
+            logger.warning(f"Cache de embeddings indisponível para leitura: {e}")
+            return {}
+
+    async def _salvar_banco(self, model_name: str, novos: Dict[str, np.ndarray]):
+        try:
+            async with SessionLocal() as session:
+                stmt = insert(EmbeddingCache).values([
+                    {
+                        "hash_texto": h,
+                        "modelo": model_name,
+                        "dimensao": int(vetor.shape[0]),
+                        "vetor": vetor.astype(np.float16).tobytes(),
+                    }
+                    for h, vetor in novos.items()
+                ]).on_conflict_do_nothing()
+                await session.execute(stmt)
+                await self._aplicar_limite(session)
+                await session.commit()
+        except Exception as e:
+            self.erros_banco += 1
+            logger.warning(f"Cache de embeddings indisponível para escrita: {e}")
+
+    async def _aplicar_limite(self, session):
+        """Remove as linhas acessadas há mais tempo quando a tabela excede o limite"""
+        # Estimativa mantida pelo autovacuum/ANALYZE: evita um count(*) a cada gravação
+        total = (await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:tabela)"),
+            {"tabela": EmbeddingCache.__table__.fullname},
+        )).scalar() or 0
+        excesso = total - self.max_linhas
+        if excesso <= 0:
+            return
+        mais_antigos = (
+            select(EmbeddingCache.hash_texto, EmbeddingCache.modelo)
+            .order_by(EmbeddingCache.ultimo_acesso.asc())
+            .limit(excesso)
+        )
+        result = await session.execute(
+            delete(EmbeddingCache).where(
+                tuple_(EmbeddingCache.hash_texto, EmbeddingCache.modelo).in_(mais_antigos)
+            )
+        )
+        self.removidos += result.rowcount or 0
+        logger.info(f"🧹 Cache de embeddings: {result.rowcount} entradas antigas removidas")
+
+    def metrics(self) -> Dict[str, Any]:
+        consultas = self.hits_memoria + self.hits_banco + self.misses
+        return {
+            "hits_memoria": self.hits_memoria,
+            "hits_banco": self.hits_banco,
+            "misses": self.misses,
+            "taxa_acerto": (self.hits_memoria + self.hits_banco) / consultas if consultas else None,
+            "entradas_memoria": len(self._lru),
+            "max_memoria": self._lru.maxsize,
+            "max_linhas": self.max_linhas,
+            "removidos": self.removidos,
+            "erros_banco": self.erros_banco,
+        }
+
+
+embedding_cache = EmbeddingCacheService(EMBEDDING_CACHE_MEMORIA, EMBEDDING_CACHE_MAX_LINHAS)
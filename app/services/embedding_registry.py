@@ -0,0 +1,135 @@
+import time
+import threading
+import logging
+from typing import List, Optional, Dict, Any, Tuple
+
+import numpy as np
+
+from app.config import EMBEDDING_MODELS, EMBEDDING_BACKEND
+from app.services.onnx_embedding import OnnxEmbeddingModel, diretorio_modelo, modelo_exportado
+
+logger = logging.getLogger(__name__)
+
+
+def similaridade_cosseno(consulta, vetores) -> np.ndarray:
+    """Cosseno entre o embedding da consulta (1 x d) e cada linha de 'vetores' (n x d), em NumPy"""
+    consulta = np.asarray(consulta, dtype=np.float32).reshape(-1)
+    vetores = np.asarray(vetores, dtype=np.float32)
+    if vetores.size == 0:
+        return np.zeros(0, dtype=np.float32)
+    normas = np.linalg.norm(vetores, axis=1) * np.linalg.norm(consulta)
+    return vetores @ consulta / np.clip(normas, 1e-12, None)
+
+
+class EmbeddingModelRegistry:
+    """
+    Registro do modelo de embedding do processo.
+
+    O modelo é carregado uma única vez por worker (no lifespan da aplicação),
+    aquecido com um encode de teste e compartilhado por todos os PNCPSearcher.
+    A lista de modelos é tentada em ordem, o primeiro que carregar é usado.
+
+    Com backend 'onnx', usa o export int8 do modelo (python -m
+    app.services.onnx_embedding exportar) quando existir; sem export, cai no
+    SentenceTransformer com torch.
+    """
+
+    def __init__(self, modelos: List[str], backend: str = EMBEDDING_BACKEND):
+        self.modelos = modelos
+        self.backend = backend
+        self.backend_ativo: Optional[str] = None
+        self.model: Optional[Any] = None
+        self.model_name: Optional[str] = None
+        self.dimensao: Optional[int] = None
+        self.tempo_carga: Optional[float] = None
+        self.tempo_aquecimento: Optional[float] = None
+        self.carregado_em: Optional[float] = None
+        self.erro: Optional[str] = None
+        self.tentativas: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pronto(self) -> bool:
+        return self.model is not None
+
+    def _carregar(self, model_name: str) -> Tuple[Any, str, str]:
+        """Instancia o modelo no backend configurado: (modelo, nome para o cache, backend)"""
+        if self.backend == "onnx":
+            if modelo_exportado(model_name):
+                return OnnxEmbeddingModel(diretorio_modelo(model_name)), f"{model_name}@onnx-int8", "onnx"
+            logger.warning(f"⚠️ {model_name} sem export ONNX, usando torch")
+
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name), model_name, "torch"
+
+    def load(self) -> Any:
+        """Carrega e aquece o modelo (idempotente e seguro entre threads)"""
+        with self._lock:
+            if self.model is not None:
+                return self.model
+
+            logger.info("Carregando modelo Sentence Transformer...")
+            inicio = time.perf_counter()
+            for model_name in self.modelos:
+                try:
+                    model, nome_cache, backend = self._carregar(model_name)
+                except Exception as e:
+                    logger.warning(f"⚠️ Erro ao carregar {model_name}: {e}")
+                    self.tentativas[model_name] = str(e)
+                    continue
+
+                self.tempo_carga = time.perf_counter() - inicio
+                logger.info(f"✅ Modelo carregado com sucesso: {model_name} [{backend}] ({self.tempo_carga:.2f}s)")
+
+                inicio_aquecimento = time.perf_counter()
+                aquecimento = model.encode(["aquecimento do modelo de embedding"])
+                self.tempo_aquecimento = time.perf_counter() - inicio_aquecimento
+                logger.info(f"🔥 Modelo aquecido em {self.tempo_aquecimento:.2f}s")
+
+                self.model = model
+                self.model_name = nome_cache
+                self.dimensao = int(len(aquecimento[0]))
+                self.backend_ativo = backend
+                self.carregado_em = time.time()
+                self.erro = None
+                return model
+
+            self.erro = "Não foi possível carregar nenhum modelo de embedding"
+            raise Exception(self.erro)
+
+    def carregar_em_segundo_plano(self):
+        """Dispara o carregamento numa thread, sem esperar (usado quando o modelo está frio)"""
+        if self.pronto or self._lock.locked():
+            return
+
+        def carregar():
+            try:
+                self.load()
+            except Exception as e:
+                logger.error(f"Modelo de embedding não carregado em segundo plano: {e}")
+
+        threading.Thread(target=carregar, name="carga-embedding", daemon=True).start()
+
+    def get_model(self) -> Any:
+        """Retorna o modelo compartilhado, carregando-o se o lifespan ainda não o fez"""
+        if self.model is None:
+            return self.load()
+        return self.model
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "pronto": self.pronto,
+            "modelo": self.model_name,
+            "dimensao": self.dimensao,
+            "modelos_configurados": self.modelos,
+            "backend": self.backend,
+            "backend_ativo": self.backend_ativo,
+            "tempo_carga_s": self.tempo_carga,
+            "tempo_aquecimento_s": self.tempo_aquecimento,
+            "carregado_em": self.carregado_em,
+            "erro": self.erro,
+            "falhas": self.tentativas,
+        }
+
+
+model_registry = EmbeddingModelRegistry(EMBEDDING_MODELS)
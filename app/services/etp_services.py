@@ -1,10 +1,12 @@
-from app.services.prompts.etp_prompts import prompt_sistema, prompt_integracao_artefatos, prompt_aspectos_tecnicos, prompt_sustentabilidade
-from app.client import get_genai_client
+from app.services.prompts.etp_prompts import (
+    prompt_sistema, prompt_integracao_artefatos, prompt_aspectos_tecnicos, prompt_sustentabilidade, prompt_estrutura_geracao
+)
+from app.services.llm_gateway import llm_gateway
+from app.services.progresso import emitir
 from app.dependencies import RemoteUser
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text, delete, update
 from typing import Optional, Dict, List
-from google.genai import types
 from datetime import datetime
 from app.models.projects_models import Projeto
 from app.models.etp_models import ETP
@@ -19,13 +21,21 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Prefixo estático do prompt do ETP (igual em todas as gerações)
+instrucao_sistema_etp = "\n\n".join([
+    prompt_sistema, prompt_integracao_artefatos, prompt_aspectos_tecnicos, prompt_sustentabilidade, prompt_estrutura_geracao
+])
+
 
 async def create_etp_service(etp_in: ETPCreate, db: AsyncSession, current_user: RemoteUser, project_id: int) -> List[ETPRead]:
     """
-    Cria ETP baseado na síntese dos artefatos anteriores (DFD, PDP, PGR)
+    Cria ETP baseado na síntese dos artefatos anteriores (DFD, PDP, PGR).
+
+    A geração pela IA roda sem conexão com o banco: a leitura dos artefatos
+    e a troca do ETP antigo pelo novo ficam em transações curtas.
     """
     try:
-        # Verifica se o projeto existe
+        # 1. Leitura: verifica se o projeto existe
         result = await db.execute(
             select(Projeto).where(Projeto.id_projeto == project_id)
         )
@@ -38,15 +48,20 @@ async def create_etp_service(etp_in: ETPCreate, db: AsyncSession, current_user:
         if not artefatos.get("tem_artefatos"):
             raise ValueError("É necessário ter pelo menos DFD e PDP criados antes de gerar o ETP.")
         
-        # Limpar ETPs antigos
+        # Encerra a transação de leitura: a conexão volta ao pool durante a geração pela IA
+        await db.commit()
+
+        # 2. Gera ETP usando IA
+        emitir("contexto", "Artefatos do projeto (DFD, PDP, PGR) carregados")
+        etp_gerado = await gerar_etp_ia(etp_in.prompt_usuario, artefatos, project_id, etp_in.forcar_regeneracao)
+        print("ETP gerado pela IA:", json.dumps(etp_gerado, indent=2, ensure_ascii=False))
+
+        # 3. Gravação: o ETP antigo sai e o novo entra na mesma transação
+        emitir("gravacao", "Gravando o ETP")
         print(f"Limpando ETPs antigos para o projeto ID: {project_id}")
         await db.execute(delete(ETP).where(ETP.id_projeto == project_id))
         await db.flush()
 
-        # Gera ETP usando IA
-        etp_gerado = await gerar_etp_ia(etp_in.prompt_usuario, artefatos, project_id)
-        print("ETP gerado pela IA:", json.dumps(etp_gerado, indent=2, ensure_ascii=False))
-
         etps_criados = []
         
         # Cria o ETP no banco
@@ -102,13 +117,11 @@ async def create_etp_service(etp_in: ETPCreate, db: AsyncSession, current_user:
             print(f"Nenhum ETP foi criado. Atualizando 'exist_etp' para False no projeto ID: {project_id}")
             projeto.exist_etp = False
 
-        await db.commit()
-        
-        etps_response = []
         for etp in etps_criados:
             await db.refresh(etp)
-            etp_read = ETPRead.from_orm(etp)
-            etps_response.append(etp_read)
+        await db.commit()
+        
+        etps_response = [ETPRead.from_orm(etp) for etp in etps_criados]
         
         return etps_response
         
@@ -208,23 +221,17 @@ async def buscar_artefatos_projeto(project_id: int, db: AsyncSession) -> Dict[st
         return {"tem_artefatos": False, "erro": str(e)}
 
 
-async def gerar_etp_ia(prompt_usuario: str, artefatos: Dict, project_id: int) -> Dict:
+async def gerar_etp_ia(prompt_usuario: str, artefatos: Dict, project_id: int, forcar_regeneracao: bool = False) -> Dict:
     """
     Gera ETP usando IA com base nos artefatos anteriores
     """
     try:
-        client = get_genai_client()
         model = "gemini-2.0-flash"
         
-        # Monta o prompt completo usando os prompts modulares
+        # Só a parte específica do projeto; as diretrizes e a estrutura de
+        # resposta vão como instrução de sistema (cacheada no Gemini)
         prompt_completo = f"""
-        {prompt_sistema}
-
-        {prompt_integracao_artefatos}
-
-        {prompt_aspectos_tecnicos}
-
-        {prompt_sustentabilidade}
+        DATA DE REFERÊNCIA: {datetime.now().strftime('%Y-%m-%d')}
 
         ---
         DADOS DOS ARTEFATOS ANTERIORES (JSON):
@@ -234,135 +241,18 @@ async def gerar_etp_ia(prompt_usuario: str, artefatos: Dict, project_id: int) ->
         SOLICITAÇÃO ESPECÍFICA DO USUÁRIO:
         "{prompt_usuario}"
 
-        ---
-        ESTRUTURA JSON DE RESPOSTA OBRIGATÓRIA:
-
-        Com base nos dados fornecidos e nas diretrizes acima, gere um ETP completo seguindo exatamente esta estrutura JSON:
-
-        {{
-            "unidade_demandante": "Unidade responsável pela demanda (extrair do DFD)",
-            "objeto_contratacao": "Descrição detalhada do objeto (baseado no DFD)",
-            "sist_reg_preco": false,
-            "justificativa_necessidade": "Justificativa detalhada da necessidade (baseado no DFD)",
-            "alinhamento_estrategico": [
-                "Alinhamento estratégico extraído do DFD",
-                "Objetivos institucionais relacionados"
-            ],
-            "informacoes_contratacao": "Informações técnicas detalhadas sobre a contratação",
-            "previsto_pca": true,
-            "item_pca": 1,
-            "requisitos_contratacao": [
-                "Requisito técnico específico 1",
-                "Requisito habilitatório 2",
-                "Experiência comprovada na área",
-                "Certificações necessárias"
-            ],
-            "levantamento_mercado": {{
-                "pesquisa_mercado": "Descrição da pesquisa realizada baseada nos dados do PDP",
-                "preco_medio": 0.0,
-                "variacao_percentual": 15.0,
-                "fontes": ["PDP - Análise de contratos similares", "Consulta ao mercado", "Dados históricos"],
-                "data_pesquisa": "{datetime.now().strftime('%Y-%m-%d')}",
-                "observacoes": "Observações específicas sobre a pesquisa de mercado realizada"
-            }},
-            "solucao_proposta": "Descrição detalhada da solução técnica proposta (integrar dados das soluções identificadas)",
-            "quantidade_estimada": {{
-                "item_principal": {{
-                    "descricao": "Descrição do item principal",
-                    "quantidade": 1,
-                    "unidade": "unidade apropriada",
-                    "valor_unitario": 0.0,
-                    "valor_total": 0.0
-                }},
-                "itens_adicionais": [],
-                "total_estimado": 0.0,
-                "criterios_dimensionamento": "Critérios técnicos utilizados para dimensionamento"
-            }},
-            "justificativa_nao_parcelamento": "Justificativa técnica fundamentada para não parcelamento da contratação",
-            "valor_total_estimado": "R$ 0,00 (baseado nos dados do PDP)",
-            "demonstracao_resultados": {{
-                "resultados_quantitativos": {{
-                    "eficiencia_operacional": "Percentual de melhoria esperado",
-                    "redução_custos": "Economia estimada",
-                    "tempo_execucao": "Prazo de implementação"
-                }},
-                "resultados_qualitativos": {{
-                    "melhoria_servicos": "Descrição da melhoria na qualidade",
-                    "satisfacao_usuarios": "Impacto na satisfação dos usuários finais",
-                    "conformidade_legal": "Atendimento às normas e regulamentações"
-                }},
-                "indicadores_desempenho": ["Indicador específico 1", "Indicador específico 2"],
-                "prazo_resultados": "Prazo realista para obtenção dos resultados"
-            }},
-            "servico_continuo": false,
-            "justificativa_servico_continuo": "Justificativa se for serviço de natureza continuada (ou null se não for)",
-            "providencias_necessarias": {{
-                "pre_contratacao": [
-                    "Elaboração detalhada do Termo de Referência/Projeto Básico",
-                    "Aprovação pela autoridade competente",
-                    "Processo licitatório conforme modalidade adequada",
-                    "Dotação orçamentária específica"
-                ],
-                "durante_execucao": [
-                    "Fiscalização técnica especializada",
-                    "Acompanhamento sistemático da execução",
-                    "Controle rigoroso de qualidade",
-                    "Gestão de riscos identificados no PGR"
-                ],
-                "pos_contratacao": [
-                    "Avaliação final dos resultados obtidos",
-                    "Documentação completa do processo",
-                    "Lições aprendidas para futuras contratações"
-                ],
-                "responsaveis": {{
-                    "gestor_contrato": "Perfil do gestor responsável",
-                    "fiscal_tecnico": "Competências técnicas necessárias",
-                    "equipe_apoio": "Equipe de apoio necessária"
-                }}
-            }},
-            "impactos_ambientais": "Análise detalhada dos impactos ambientais considerando todo o ciclo de vida",
-            "alinhamento_pls": [
-                "Critério específico de sustentabilidade 1",
-                "Critério específico de sustentabilidade 2",
-                "Conformidade com PLS da Administração Pública"
-            ],
-            "posicao_conclusiva": true,
-            "justificativa_posicao": "Justificativa técnica fundamentada da posição conclusiva",
-            "equipe_planejamento": "Identificação completa da equipe responsável pelo planejamento"
-        }}
-
-        INSTRUÇÕES CRÍTICAS PARA GERAÇÃO:
-        1. INTEGRE OBRIGATORIAMENTE os dados reais dos artefatos fornecidos (DFD, PDP, PGR, Soluções)
-        2. INCORPORE os riscos identificados no PGR nas seções apropriadas
-        3. USE os dados de preços e fornecedores do PDP no levantamento de mercado
-        4. MANTENHA absoluta coerência com o objeto e justificativas definidos no DFD
-        5. FUNDAMENTE a solução proposta nas soluções identificadas previamente
-        6. SEJA específico, detalhado e tecnicamente preciso em todas as seções
-        7. CONSIDERE obrigatoriamente aspectos de sustentabilidade conforme PLS
-        8. GARANTA que a posição conclusiva seja baseada em análise técnica sólida
-        9. ATENDA às exigências da Lei 14.133/2021 e normas correlatas
-        10. APRESENTE conteúdo profissional compatível com padrões da Administração Pública
-
-        Gere um ETP de excelência técnica que justifique adequadamente a contratação proposta.
+        Gere o ETP seguindo exatamente a estrutura JSON obrigatória das instruções.
         """
 
         print("--- Enviando prompt para Gemini ---")
         print(f"Tamanho do prompt: {len(prompt_completo)} caracteres")
 
-        generate_content_config = types.GenerateContentConfig(
-            response_mime_type="application/json"
-        )
-        contents = [types.Content(role="user", parts=[types.Part.from_text(text=prompt_completo)])]
-        
         print("--- Aguardando resposta da API Gemini para ETP... ---")
         
-        response = client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=generate_content_config
+        resposta_json = await llm_gateway.gerar_json(
+            model, prompt_completo, system_instruction=instrucao_sistema_etp,
+            artefato="etp", forcar_regeneracao=forcar_regeneracao,
         )
-        
-        resposta_json = json.loads(response.text)
         print("\n--- Resposta da API Gemini para ETP (JSON Estruturado) ---")
         print(json.dumps(resposta_json, indent=2, ensure_ascii=False)[:1000] + "..." if len(str(resposta_json)) > 1000 else json.dumps(resposta_json, indent=2, ensure_ascii=False))
         
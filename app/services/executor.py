@@ -0,0 +1,68 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+from app.config import CPU_EXECUTOR_WORKERS, LOOP_LAG_INTERVALO, LOOP_LAG_ALERTA
+
+logger = logging.getLogger(__name__)
+
+# Executor dedicado às etapas de CPU do pipeline (encode, similaridade, busca no índice).
+# Separado do executor padrão do loop, usado por asyncio.to_thread nas etapas de I/O,
+# para que downloads e uploads não disputem threads com o modelo de embedding.
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_EXECUTOR_WORKERS, thread_name_prefix="lia-cpu")
+
+
+async def executar_cpu(func: Callable, *args, **kwargs) -> Any:
+    """Executa uma função de CPU no executor dedicado sem bloquear o event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, partial(func, *args, **kwargs))
+
+
+class MonitorLatenciaLoop:
+    """
+    Mede o atraso do event loop: agenda um sleep de 'intervalo' segundos e
+    registra quanto a retomada atrasou. Atrasos altos indicam trabalho
+    bloqueante rodando no loop.
+    """
+
+    def __init__(self, intervalo: float = LOOP_LAG_INTERVALO, alerta: float = LOOP_LAG_ALERTA,
+                 janela: int = 3000):
+        self.intervalo = intervalo
+        self.alerta = alerta
+        self.amostras = deque(maxlen=janela)
+        self.maximo = 0.0
+        self.alertas = 0
+
+    async def loop(self):
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(self.intervalo)
+            atraso = max(0.0, time.perf_counter() - inicio - self.intervalo)
+            self.amostras.append(atraso)
+            self.maximo = max(self.maximo, atraso)
+            if atraso > self.alerta:
+                self.alertas += 1
+                logger.warning(f"⚠️ Event loop bloqueado por {atraso:.3f}s")
+
+    def metrics(self) -> Dict[str, Any]:
+        if not self.amostras:
+            return {"amostras": 0, "intervalo": self.intervalo}
+        atrasos = np.fromiter(self.amostras, dtype=np.float64)
+        return {
+            "amostras": len(atrasos),
+            "intervalo": self.intervalo,
+            "atraso_p50": round(float(np.percentile(atrasos, 50)), 4),
+            "atraso_p99": round(float(np.percentile(atrasos, 99)), 4),
+            "atraso_max_janela": round(float(atrasos.max()), 4),
+            "atraso_max": round(self.maximo, 4),
+            "alertas": self.alertas,
+        }
+
+
+monitor_loop = MonitorLatenciaLoop()
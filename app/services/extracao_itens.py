@@ -0,0 +1,137 @@
+import json
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from google.genai import types
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import PDP_MODELO_EXTRACAO, PDP_EXTRACAO_TTL
+from app.database import SessionLocal
+from app.models.pncp_models import ExtracaoDocumentoPNCP
+from app.schemas.pdp_schemas import PpModel
+from app.services.llm_gateway import llm_gateway
+from app.services.prompts.pdp_prompts import prompt_extracao_itens
+
+logger = logging.getLogger(__name__)
+
+LIMPEZA_A_CADA = 100
+
+
+def versao_prompt() -> str:
+    """Hash do prompt de extração e do schema PpModel: mudar qualquer um invalida as extrações"""
+    canonico = {"prompt": prompt_extracao_itens, "schema": PpModel.model_json_schema()}
+    return hashlib.sha256(json.dumps(canonico, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class CacheExtracoes:
+    """
+    Itens e preços extraídos de cada documento do PNCP, por SHA-256 do conteúdo,
+    modelo de extração e versão do prompt.
+
+    A primeira vez que um documento é escolhido como similar, o Gemini extrai
+    os seus dados e itens (formato PpModel) numa chamada só com aquele
+    documento; nas gerações seguintes a extração vem do banco e o documento nem
+    precisa ser enviado ao Gemini. Extrações sem uso há mais de
+    PDP_EXTRACAO_TTL segundos são removidas.
+    """
+
+    def __init__(self, modelo: str = PDP_MODELO_EXTRACAO, ttl: int = PDP_EXTRACAO_TTL):
+        self.modelo = modelo
+        self.versao = versao_prompt()
+        self.ttl = timedelta(seconds=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.forcados = 0
+        self.removidos = 0
+        self.erros = 0
+        self._gravacoes = 0
+
+    def _filtro(self, sha256: str):
+        return (
+            (ExtracaoDocumentoPNCP.sha256 == sha256)
+            & (ExtracaoDocumentoPNCP.modelo == self.modelo)
+            & (ExtracaoDocumentoPNCP.versao_prompt == self.versao)
+        )
+
+    def ignorar(self):
+        """Conta uma extração refeita a pedido (forcar_regeneracao)"""
+        self.forcados += 1
+
+    async def ler(self, sha256: str) -> Optional[Dict[str, Any]]:
+        try:
+            async with SessionLocal() as session:
+                linha = await session.get(ExtracaoDocumentoPNCP, (sha256, self.modelo, self.versao))
+                if linha is None:
+                    return None
+                await session.execute(
+                    update(ExtracaoDocumentoPNCP)
+                    .where(self._filtro(sha256))
+                    .values(ultimo_uso=datetime.now(timezone.utc))
+                )
+                await session.commit()
+        except Exception as e:
+            self.erros += 1
+            logger.warning(f"Cache de extrações indisponível: {e}")
+            return None
+        self.hits += 1
+        return linha.extracao
+
+    async def extrair(self, arquivo: types.File, sha256: Optional[str]) -> Dict[str, Any]:
+        """Extrai os itens do documento já enviado ao Gemini e grava no cache"""
+        self.misses += 1
+        dados = await llm_gateway.gerar_json(
+            self.modelo,
+            [types.Content(role="user", parts=[
+                types.Part.from_uri(file_uri=arquivo.uri, mime_type=arquivo.mime_type),
+                types.Part.from_text(text=prompt_extracao_itens),
+            ])],
+            schema=PpModel,
+        )
+        extracao = PpModel(**dados).dict()
+
+        if sha256:
+            await self._gravar(sha256, extracao)
+        return extracao
+
+    async def _gravar(self, sha256: str, extracao: Dict[str, Any]):
+        agora = datetime.now(timezone.utc)
+        stmt = insert(ExtracaoDocumentoPNCP).values(
+            sha256=sha256, modelo=self.modelo, versao_prompt=self.versao, extracao=extracao, ultimo_uso=agora
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ExtracaoDocumentoPNCP.sha256, ExtracaoDocumentoPNCP.modelo, ExtracaoDocumentoPNCP.versao_prompt],
+            set_={"extracao": stmt.excluded.extracao, "ultimo_uso": stmt.excluded.ultimo_uso},
+        )
+        try:
+            async with SessionLocal() as session:
+                await session.execute(stmt)
+                self._gravacoes += 1
+                if self._gravacoes % LIMPEZA_A_CADA == 0:
+                    removidas = await session.execute(
+                        delete(ExtracaoDocumentoPNCP).where(ExtracaoDocumentoPNCP.ultimo_uso < agora - self.ttl)
+                    )
+                    self.removidos += removidas.rowcount or 0
+                await session.commit()
+        except Exception as e:
+            self.erros += 1
+            logger.warning(f"Não foi possível gravar a extração no cache: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / total, 4) if total else None,
+            "forcados": self.forcados,
+            "removidos": self.removidos,
+            "erros": self.erros,
+            "modelo": self.modelo,
+            "versao_prompt": self.versao,
+            "ttl_s": int(self.ttl.total_seconds()),
+        }
+
+
+extracoes_itens = CacheExtracoes()
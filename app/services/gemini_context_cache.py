@@ -0,0 +1,146 @@
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from google.genai import types
+
+from app.client import get_genai_client
+from app.config import GEMINI_CONTEXTO_TTL, GEMINI_CONTEXTO_MARGEM, GEMINI_CONTEXTO_MIN_TOKENS
+
+logger = logging.getLogger(__name__)
+
+
+def estimar_tokens(texto: str) -> int:
+    return len(texto) // 4
+
+
+@dataclass
+class HandleContexto:
+    """Cached content criado no Gemini para um prefixo estático"""
+    nome: str
+    expira_em: datetime
+    tokens: Optional[int]
+    usos: int = 0
+
+
+class CachesContexto:
+    """
+    Handles de context caching do Gemini para as instruções de sistema
+    estáticas de cada artefato, por (modelo, SHA-256 do texto).
+
+    O handle é criado na primeira chamada e reaproveitado; quando falta menos
+    de 'margem' para expirar, o TTL é renovado na própria chamada que o usa.
+    Prefixos abaixo do mínimo de tokens do Gemini (ou cuja criação falhou)
+    seguem inline por um TTL antes de uma nova tentativa. Os handles são do
+    processo e são removidos no shutdown.
+    """
+
+    def __init__(self, ttl: int = GEMINI_CONTEXTO_TTL, margem: int = GEMINI_CONTEXTO_MARGEM,
+                 min_tokens: int = GEMINI_CONTEXTO_MIN_TOKENS):
+        self.ttl = ttl
+        self.margem = timedelta(seconds=margem)
+        self.min_tokens = min_tokens
+        self._handles: Dict[Tuple[str, str], HandleContexto] = {}
+        self._inviaveis: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.criados = 0
+        self.renovados = 0
+        self.reusos = 0
+        self.falhas = 0
+
+    def _chave(self, model: str, texto: str) -> Tuple[str, str]:
+        return model, hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    async def obter(self, model: str, texto: str) -> Optional[str]:
+        """Nome do cached content com 'texto' como instrução de sistema, ou None para enviar inline"""
+        if estimar_tokens(texto) < self.min_tokens:
+            return None
+        chave = self._chave(model, texto)
+        if self._inviaveis.get(chave, 0.0) > time.monotonic():
+            return None
+
+        async with self._locks.setdefault(chave, asyncio.Lock()):
+            handle = self._handles.get(chave)
+            agora = datetime.now(timezone.utc)
+            if handle and handle.expira_em - agora > self.margem:
+                handle.usos += 1
+                self.reusos += 1
+                return handle.nome
+            if handle and handle.expira_em > agora and await self._renovar(handle):
+                handle.usos += 1
+                return handle.nome
+            return await self._criar(chave, model, texto)
+
+    async def _renovar(self, handle: HandleContexto) -> bool:
+        try:
+            atualizado = await get_genai_client().aio.caches.update(
+                name=handle.nome, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s")
+            )
+        except Exception as e:
+            logger.warning(f"Não foi possível renovar o cache de contexto {handle.nome}: {e}")
+            return False
+        handle.expira_em = atualizado.expire_time or datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        self.renovados += 1
+        return True
+
+    async def _criar(self, chave: Tuple[str, str], model: str, texto: str) -> Optional[str]:
+        try:
+            cache = await get_genai_client().aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=texto,
+                    ttl=f"{self.ttl}s",
+                    display_name=f"lia-{chave[1][:16]}",
+                ),
+            )
+        except Exception as e:
+            self.falhas += 1
+            self._inviaveis[chave] = time.monotonic() + self.ttl
+            self._handles.pop(chave, None)
+            logger.warning(f"Cache de contexto não criado para {model}; instrução segue inline: {e}")
+            return None
+
+        tokens = cache.usage_metadata.total_token_count if cache.usage_metadata else None
+        self._handles[chave] = HandleContexto(
+            nome=cache.name,
+            expira_em=cache.expire_time or datetime.now(timezone.utc) + timedelta(seconds=self.ttl),
+            tokens=tokens,
+            usos=1,
+        )
+        self.criados += 1
+        logger.info(f"🧊 Cache de contexto criado para {model}: {cache.name} ({tokens} tokens)")
+        return cache.name
+
+    def invalidar(self, model: str, texto: str):
+        """Descarta o handle (ex.: expirado ou removido no Gemini antes do previsto)"""
+        self._handles.pop(self._chave(model, texto), None)
+
+    async def encerrar(self):
+        """Remove do Gemini os caches criados por este processo"""
+        handles, self._handles = list(self._handles.values()), {}
+        for handle in handles:
+            try:
+                await get_genai_client().aio.caches.delete(name=handle.nome)
+            except Exception as e:
+                logger.warning(f"Não foi possível remover o cache de contexto {handle.nome}: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "criados": self.criados,
+            "renovados": self.renovados,
+            "reusos": self.reusos,
+            "falhas": self.falhas,
+            "ttl_s": self.ttl,
+            "handles": [
+                {"modelo": modelo, "prefixo": sha[:16], "nome": h.nome, "tokens": h.tokens,
+                 "usos": h.usos, "expira_em": h.expira_em.isoformat()}
+                for (modelo, sha), h in self._handles.items()
+            ],
+        }
+
+
+caches_contexto = CachesContexto()
@@ -0,0 +1,189 @@
+import os
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from google.genai import types
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert
+
+from app.client import get_genai_client
+from app.database import SessionLocal, lock_exclusivo
+from app.models.gemini_models import ArquivoGemini
+from app.config import GEMINI_ARQUIVOS_MARGEM, GEMINI_VARREDURA_INTERVALO
+
+logger = logging.getLogger(__name__)
+
+CHAVE_LOCK_VARREDURA = 724_002
+VALIDADE_PADRAO = timedelta(hours=47)  # o Gemini mantém os arquivos por 48h
+IDADE_MINIMA_ORFAO = timedelta(minutes=15)
+
+
+def sha256_arquivo(caminho: str) -> str:
+    digest = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(65536), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+class RegistroArquivosGemini:
+    """
+    Registro dos uploads na API de arquivos do Gemini por SHA-256 do conteúdo.
+
+    Um documento já enviado e ainda longe de expirar (GEMINI_ARQUIVOS_MARGEM) é
+    reusado em vez de enviado de novo; uploads simultâneos do mesmo conteúdo no
+    processo são unificados. A varredura periódica apaga do Gemini e do registro
+    os uploads expirados e os arquivos que não constam do registro (órfãos).
+    """
+
+    def __init__(self, margem: int = GEMINI_ARQUIVOS_MARGEM):
+        self.margem = timedelta(seconds=margem)
+        self.reusados = 0
+        self.enviados = 0
+        self.removidos_expirados = 0
+        self.removidos_orfaos = 0
+        self.ultima_varredura: Optional[datetime] = None
+        self._em_envio: Dict[str, asyncio.Future] = {}
+
+    async def obter(self, caminho: str, sha256: Optional[str] = None, mime_type: str = "application/pdf") -> types.File:
+        """Arquivo do Gemini com o conteúdo de 'caminho', reusando um upload vivo quando houver"""
+        if sha256 is None:
+            sha256 = await asyncio.to_thread(sha256_arquivo, caminho)
+
+        existente = await self._buscar_vivo(sha256)
+        if existente:
+            self.reusados += 1
+            return existente
+
+        if sha256 in self._em_envio:
+            return await asyncio.shield(self._em_envio[sha256])
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_envio[sha256] = futuro
+        try:
+            arquivo = await self._enviar(caminho, sha256, mime_type)
+            futuro.set_result(arquivo)
+            return arquivo
+        except BaseException as e:
+            futuro.set_exception(e)
+            futuro.exception()  # evita aviso de exceção não recuperada quando ninguém espera
+            raise
+        finally:
+            del self._em_envio[sha256]
+
+    async def _buscar_vivo(self, sha256: str) -> Optional[types.File]:
+        limite = datetime.now(timezone.utc) + self.margem
+        async with SessionLocal() as session:
+            linha = (await session.execute(
+                select(ArquivoGemini).where(ArquivoGemini.sha256 == sha256, ArquivoGemini.expira_em > limite)
+            )).scalar_one_or_none()
+            if linha is None:
+                return None
+            await session.execute(
+                update(ArquivoGemini).where(ArquivoGemini.sha256 == sha256).values(ultimo_uso=datetime.now(timezone.utc))
+            )
+            await session.commit()
+            return types.File(name=linha.nome, uri=linha.uri, mime_type=linha.mime_type)
+
+    async def _enviar(self, caminho: str, sha256: str, mime_type: str) -> types.File:
+        client = get_genai_client()
+        arquivo = await client.aio.files.upload(
+            file=caminho,
+            config=types.UploadFileConfig(mime_type=mime_type, display_name=os.path.basename(caminho)),
+        )
+        self.enviados += 1
+
+        expira_em = arquivo.expiration_time or datetime.now(timezone.utc) + VALIDADE_PADRAO
+        valores = {
+            "nome": arquivo.name,
+            "uri": arquivo.uri,
+            "mime_type": arquivo.mime_type or mime_type,
+            "tamanho": arquivo.size_bytes,
+            "expira_em": expira_em,
+            "enviado_em": datetime.now(timezone.utc),
+            "ultimo_uso": datetime.now(timezone.utc),
+        }
+        stmt = insert(ArquivoGemini).values(sha256=sha256, **valores)
+        stmt = stmt.on_conflict_do_update(index_elements=[ArquivoGemini.sha256], set_=valores)
+        async with SessionLocal() as session:
+            anterior = await session.get(ArquivoGemini, sha256)
+            nome_anterior = anterior.nome if anterior else None
+            await session.execute(stmt)
+            await session.commit()
+
+        if nome_anterior and nome_anterior != arquivo.name:
+            await self._apagar_remoto(nome_anterior)
+        return arquivo
+
+    async def _apagar_remoto(self, nome: str):
+        try:
+            await get_genai_client().aio.files.delete(name=nome)
+        except Exception as e:
+            logger.debug(f"Arquivo {nome} já não existe no Gemini: {e}")
+
+    async def varrer(self) -> bool:
+        """
+        Remove uploads expirados e arquivos órfãos. Retorna False se outro worker
+        já estiver varrendo.
+
+        O lock fica numa conexão dedicada; as leituras e remoções no banco usam
+        sessões curtas e as chamadas ao Gemini acontecem fora delas.
+        """
+        async with lock_exclusivo(CHAVE_LOCK_VARREDURA) as obteve:
+            if not obteve:
+                return False
+
+            agora = datetime.now(timezone.utc)
+            async with SessionLocal() as session:
+                expirados = (await session.execute(
+                    select(ArquivoGemini.nome).where(ArquivoGemini.expira_em <= agora + self.margem)
+                )).scalars().all()
+            for nome in expirados:
+                await self._apagar_remoto(nome)
+            if expirados:
+                async with SessionLocal() as session:
+                    await session.execute(delete(ArquivoGemini).where(ArquivoGemini.nome.in_(expirados)))
+                    await session.commit()
+            self.removidos_expirados += len(expirados)
+
+            async with SessionLocal() as session:
+                registrados = set((await session.execute(select(ArquivoGemini.nome))).scalars().all())
+            orfaos = []
+            async for arquivo in await get_genai_client().aio.files.list():
+                criado_em = arquivo.create_time or agora
+                if arquivo.name not in registrados and agora - criado_em > IDADE_MINIMA_ORFAO:
+                    orfaos.append(arquivo.name)
+            for nome in orfaos:
+                await self._apagar_remoto(nome)
+            self.removidos_orfaos += len(orfaos)
+
+            self.ultima_varredura = agora
+            if expirados or orfaos:
+                logger.info(f"🧹 Gemini: {len(expirados)} uploads expirados e {len(orfaos)} órfãos removidos")
+            return True
+
+    async def loop(self, intervalo: int = GEMINI_VARREDURA_INTERVALO):
+        """Varredura periódica (tarefa de fundo iniciada no lifespan)"""
+        while True:
+            try:
+                await self.varrer()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Erro na varredura dos arquivos do Gemini: {e}")
+            await asyncio.sleep(intervalo)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "reusados": self.reusados,
+            "enviados": self.enviados,
+            "removidos_expirados": self.removidos_expirados,
+            "removidos_orfaos": self.removidos_orfaos,
+            "ultima_varredura": self.ultima_varredura.isoformat() if self.ultima_varredura else None,
+        }
+
+
+gemini_arquivos = RegistroArquivosGemini()
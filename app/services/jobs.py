@@ -0,0 +1,356 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import socket
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select, update, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import SessionLocal
+from app.dependencies import RemoteUser
+from app.models.job_models import JobGeracao
+from app.schemas.dfd_schemas import DFDCreate, DFDProjectRead
+from app.schemas.pdp_schemas import PDPCreate, PDPRead
+from app.schemas.pgr_schemas import PGRCreate, PGRRead
+from app.schemas.etp_schemas import ETPCreate, ETPRead
+from app.services.dfd_services import create_dfd_service
+from app.services.pdp_services import create_pdp_service
+from app.services.pgr_services import create_pgr_service
+from app.services.etp_services import create_etp_service
+from app.services.progresso import contexto_progresso, emitir
+from app.config import (
+    JOBS_CONCORRENCIA, JOBS_INTERVALO_POLL, JOBS_HEARTBEAT, JOBS_TIMEOUT_HEARTBEAT, JOBS_MAX_TENTATIVAS,
+    JOBS_JANELA_IDEMPOTENCIA
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TipoGeracao:
+    """Como executar e serializar um tipo de job"""
+    nome: str
+    entrada: Type[BaseModel]
+    executar: Callable[..., Awaitable[Any]]
+    resposta: Any
+
+
+TIPOS: Dict[str, TipoGeracao] = {
+    "dfd": TipoGeracao("DFD", DFDCreate, create_dfd_service, DFDProjectRead),
+    "pdp": TipoGeracao("PDP", PDPCreate, create_pdp_service, List[PDPRead]),
+    "pgr": TipoGeracao("PGR", PGRCreate, create_pgr_service, List[PGRRead]),
+    "etp": TipoGeracao("ETP", ETPCreate, create_etp_service, List[ETPRead]),
+}
+
+
+# Chave (classe) dos advisory locks por projeto que serializam a entrada na fila
+CHAVE_LOCK_PROJETO = 724_003
+
+# Artefatos lidos por cada geração: não começa enquanto um deles está sendo gerado
+DEPENDENCIAS: Dict[str, Tuple[str, ...]] = {
+    "dfd": (),
+    "pdp": ("dfd",),
+    "pgr": ("dfd", "pdp"),
+    "etp": ("dfd", "pdp", "pgr"),
+}
+
+ATIVOS = ("pendente", "executando")
+
+telemetria_fila = {"enfileirados": 0, "anexados": 0, "reaproveitados": 0, "rejeitados": 0}
+
+
+def chave_idempotencia(tipo: str, project_id: int, dados: BaseModel, informada: Optional[str] = None) -> str:
+    """sha256 do pedido (tipo, projeto e corpo) ou da chave Idempotency-Key enviada pelo cliente"""
+    if informada:
+        canonico = {"tipo": tipo, "id_projeto": project_id, "chave": informada}
+    else:
+        canonico = {"tipo": tipo, "id_projeto": project_id, "payload": dados.model_dump(mode="json")}
+    return hashlib.sha256(json.dumps(canonico, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+async def enfileirar(db: AsyncSession, tipo: str, project_id: int, dados: BaseModel, current_user: RemoteUser,
+                     chave_informada: Optional[str] = None) -> Tuple[JobGeracao, bool]:
+    """
+    Grava o pedido de geração na fila; o worker o executa em outro processo.
+
+    Single-flight por projeto e artefato: sob um advisory lock do projeto
+    (válido até o commit), um pedido igual a uma geração em andamento recebe
+    o mesmo job; um pedido diferente para o mesmo artefato, ou que dependa
+    de um artefato em geração, é recusado com 409. Com a chave
+    Idempotency-Key enviada pelo cliente, a repetição de um pedido já
+    concluído há menos de JOBS_JANELA_IDEMPOTENCIA segundos também recebe o
+    mesmo job.
+
+    Returns:
+        (job, reaproveitado)
+    """
+    chave = chave_idempotencia(tipo, project_id, dados, chave_informada)
+    await db.execute(text("SELECT pg_advisory_xact_lock(:classe, :projeto)"),
+                     {"classe": CHAVE_LOCK_PROJETO, "projeto": project_id})
+
+    ativos = (await db.execute(
+        select(JobGeracao)
+        .where(JobGeracao.id_projeto == project_id,
+               JobGeracao.tipo.in_((tipo,) + DEPENDENCIAS[tipo]),
+               JobGeracao.status.in_(ATIVOS))
+        .order_by(JobGeracao.criado_em)
+    )).scalars().all()
+
+    for job in ativos:
+        if job.tipo == tipo and job.chave_idempotencia == chave:
+            await db.commit()
+            telemetria_fila["anexados"] += 1
+            logger.info(f"🔗 Pedido de {tipo} do projeto {project_id} anexado ao job {job.id} em andamento")
+            return job, True
+
+    if ativos:
+        await db.rollback()
+        telemetria_fila["rejeitados"] += 1
+        conflito = ativos[0]
+        if conflito.tipo == tipo:
+            detalhe = f"Já existe uma geração de {TIPOS[tipo].nome} em andamento para este projeto (job {conflito.id})."
+        else:
+            detalhe = (f"Aguarde a geração de {TIPOS[conflito.tipo].nome} em andamento (job {conflito.id}) "
+                       f"antes de gerar o {TIPOS[tipo].nome}.")
+        raise HTTPException(status_code=409, detail=detalhe)
+
+    if chave_informada:
+        limite = datetime.now(timezone.utc) - timedelta(seconds=JOBS_JANELA_IDEMPOTENCIA)
+        recente = (await db.execute(
+            select(JobGeracao)
+            .where(JobGeracao.chave_idempotencia == chave,
+                   JobGeracao.status == "concluido",
+                   JobGeracao.concluido_em >= limite)
+            .order_by(JobGeracao.concluido_em.desc())
+            .limit(1)
+        )).scalar_one_or_none()
+        if recente is not None:
+            await db.commit()
+            telemetria_fila["reaproveitados"] += 1
+            logger.info(f"♻️ Idempotency-Key repetida: pedido de {tipo} do projeto {project_id} respondido com o job {recente.id}")
+            return recente, True
+
+    job = JobGeracao(
+        id=str(uuid.uuid4()),
+        tipo=tipo,
+        id_projeto=project_id,
+        payload=dados.model_dump(mode="json"),
+        usuario=current_user.username,
+        grupo=current_user.group,
+        chave_idempotencia=chave,
+        status="pendente",
+        tentativas=0,
+    )
+    db.add(job)
+    await db.commit()
+    telemetria_fila["enfileirados"] += 1
+    logger.info(f"📥 Job {job.id} ({tipo}) enfileirado para o projeto {project_id}")
+    return job, False
+
+
+async def obter_job(db: AsyncSession, job_id: str) -> Optional[JobGeracao]:
+    return await db.get(JobGeracao, job_id)
+
+
+async def resumo_fila() -> Dict[str, Any]:
+    """Quantidade de jobs por status e espera média dos que começaram na última hora"""
+    desde = datetime.now(timezone.utc) - timedelta(hours=1)
+    async with SessionLocal() as session:
+        por_status = dict((await session.execute(
+            select(JobGeracao.status, func.count()).group_by(JobGeracao.status)
+        )).all())
+        espera, execucao = (await session.execute(
+            select(
+                func.avg(func.extract("epoch", JobGeracao.iniciado_em - JobGeracao.criado_em)),
+                func.avg(func.extract("epoch", JobGeracao.concluido_em - JobGeracao.iniciado_em)),
+            ).where(JobGeracao.iniciado_em >= desde)
+        )).one()
+    return {
+        "por_status": por_status,
+        "single_flight": dict(telemetria_fila),
+        "espera_media_s": round(float(espera), 2) if espera is not None else None,
+        "execucao_media_s": round(float(execucao), 2) if execucao is not None else None,
+    }
+
+
+class WorkerJobs:
+    """
+    Executa os jobs de geração fora do processo web.
+
+    Cada worker reivindica jobs pendentes com SELECT ... FOR UPDATE SKIP LOCKED
+    (vários workers podem rodar juntos), executa até 'concorrencia' ao mesmo
+    tempo e mantém um heartbeat. Jobs de um worker que parou de responder
+    voltam para a fila até JOBS_MAX_TENTATIVAS.
+    """
+
+    def __init__(self, concorrencia: int = JOBS_CONCORRENCIA):
+        self.concorrencia = concorrencia
+        self.nome = f"{socket.gethostname()}:{os.getpid()}"
+        self.concluidos = 0
+        self.erros = 0
+        self.recuperados = 0
+        self._ativos = set()
+
+    async def reivindicar(self) -> Optional[JobGeracao]:
+        async with SessionLocal() as session:
+            job = (await session.execute(
+                select(JobGeracao)
+                .where(JobGeracao.status == "pendente")
+                .order_by(JobGeracao.criado_em)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )).scalar_one_or_none()
+            if job is None:
+                return None
+            agora = datetime.now(timezone.utc)
+            job.status = "executando"
+            job.worker = self.nome
+            job.tentativas += 1
+            job.iniciado_em = agora
+            job.heartbeat_em = agora
+            await session.commit()
+            return job
+
+    async def recuperar_orfaos(self):
+        """Devolve à fila (ou encerra com erro) os jobs cujo worker parou de enviar heartbeat"""
+        limite = datetime.now(timezone.utc) - timedelta(seconds=JOBS_TIMEOUT_HEARTBEAT)
+        orfao = (JobGeracao.status == "executando") & (JobGeracao.heartbeat_em < limite)
+        async with SessionLocal() as session:
+            devolvidos = await session.execute(
+                update(JobGeracao)
+                .where(orfao & (JobGeracao.tentativas < JOBS_MAX_TENTATIVAS))
+                .values(status="pendente", worker=None)
+            )
+            await session.execute(
+                update(JobGeracao)
+                .where(orfao)
+                .values(status="erro", erro="Geração interrompida: o worker parou de responder",
+                        codigo_erro=500, concluido_em=func.now())
+            )
+            await session.commit()
+        if devolvidos.rowcount:
+            self.recuperados += devolvidos.rowcount
+            logger.warning(f"♻️ {devolvidos.rowcount} jobs órfãos devolvidos à fila")
+
+    def _meu(self, job_id: str):
+        """Filtra o job pelo worker dono: um job devolvido à fila e reivindicado por outro não é mais deste"""
+        return (JobGeracao.id == job_id) & (JobGeracao.worker == self.nome)
+
+    async def _heartbeat(self, job_id: str, execucao: asyncio.Task):
+        while True:
+            await asyncio.sleep(JOBS_HEARTBEAT)
+            try:
+                async with SessionLocal() as session:
+                    atualizado = await session.execute(
+                        update(JobGeracao).where(self._meu(job_id) & (JobGeracao.status == "executando"))
+                        .values(heartbeat_em=func.now())
+                    )
+                    await session.commit()
+            except Exception as e:
+                logger.warning(f"Heartbeat do job {job_id} falhou: {e}")
+                continue
+            if not atualizado.rowcount:
+                # Considerado órfão e assumido por outro worker: interrompe para não gerar em dobro
+                logger.warning(f"Job {job_id} assumido por outro worker; interrompendo esta execução")
+                execucao.cancel()
+                return
+
+    async def _finalizar(self, job_id: str, **valores):
+        async with SessionLocal() as session:
+            await session.execute(
+                update(JobGeracao).where(self._meu(job_id)).values(concluido_em=func.now(), **valores)
+            )
+            await session.commit()
+
+    async def executar(self, job: JobGeracao):
+        with contexto_progresso(job.id, job.id_projeto, job.tipo):
+            await self._executar(job)
+
+    async def _executar(self, job: JobGeracao):
+        tipo = TIPOS[job.tipo]
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, asyncio.current_task()))
+        inicio = time.perf_counter()
+        logger.info(f"⚙️ Executando job {job.id} ({job.tipo}) do projeto {job.id_projeto}")
+        emitir("job", f"Gerando {tipo.nome}", fase="inicio", status="executando")
+        try:
+            dados = tipo.entrada(**job.payload)
+            usuario = RemoteUser(username=job.usuario, group=job.grupo)
+            async with SessionLocal() as db:
+                resultado = await tipo.executar(dados, db, usuario, job.id_projeto)
+                adaptador = TypeAdapter(tipo.resposta)
+                resultado = adaptador.dump_python(adaptador.validate_python(resultado, from_attributes=True), mode="json")
+            await self._finalizar(job.id, status="concluido", resultado=resultado)
+            self.concluidos += 1
+            duracao = time.perf_counter() - inicio
+            logger.info(f"✅ Job {job.id} concluído em {duracao:.1f}s")
+            # Evento terminal só depois de gravado: quem o recebe já encontra o resultado em /jobs/{id}
+            emitir(f"job_{job.tipo}", f"{tipo.nome} concluído", fase="fim", duracao=duracao, status="concluido")
+        except asyncio.CancelledError:
+            # Worker encerrando: o job volta para a fila
+            await asyncio.shield(self._devolver(job.id))
+            emitir("job", "Geração devolvida à fila", status="pendente")
+            raise
+        except Exception as e:
+            if isinstance(e, HTTPException):
+                codigo, mensagem = e.status_code, str(e.detail)
+            elif isinstance(e, ValueError):
+                codigo, mensagem = 404, str(e)
+            else:
+                codigo, mensagem = 500, f"Erro ao criar {tipo.nome}: {e}"
+            self.erros += 1
+            logger.error(f"❌ Job {job.id} falhou: {mensagem}")
+            await self._finalizar(job.id, status="erro", erro=mensagem, codigo_erro=codigo)
+            emitir(f"job_{job.tipo}", mensagem, fase="erro", duracao=time.perf_counter() - inicio,
+                   status="erro", codigo_erro=codigo)
+        finally:
+            heartbeat.cancel()
+
+    async def _devolver(self, job_id: str):
+        async with SessionLocal() as session:
+            await session.execute(
+                update(JobGeracao).where(self._meu(job_id)).values(status="pendente", worker=None)
+            )
+            await session.commit()
+
+    async def loop(self):
+        logger.info(f"👷 Worker {self.nome} iniciado (concorrência {self.concorrencia})")
+        ultima_recuperacao = 0.0
+        try:
+            while True:
+                try:
+                    if time.monotonic() - ultima_recuperacao >= JOBS_HEARTBEAT:
+                        await self.recuperar_orfaos()
+                        ultima_recuperacao = time.monotonic()
+                    while len(self._ativos) < self.concorrencia:
+                        job = await self.reivindicar()
+                        if job is None:
+                            break
+                        tarefa = asyncio.create_task(self.executar(job))
+                        self._ativos.add(tarefa)
+                        tarefa.add_done_callback(self._ativos.discard)
+                except Exception as e:
+                    logger.error(f"Erro no loop do worker: {e}")
+                await asyncio.sleep(JOBS_INTERVALO_POLL)
+        finally:
+            for tarefa in list(self._ativos):
+                tarefa.cancel()
+            await asyncio.gather(*self._ativos, return_exceptions=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "worker": self.nome,
+            "em_execucao": len(self._ativos),
+            "concorrencia": self.concorrencia,
+            "concluidos": self.concluidos,
+            "erros": self.erros,
+            "recuperados": self.recuperados,
+        }
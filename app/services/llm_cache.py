@@ -0,0 +1,145 @@
+import json
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from google.genai import types
+from pydantic import TypeAdapter
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import SessionLocal
+from app.models.gemini_models import RespostaLLMCache
+from app.config import LLM_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+LIMPEZA_A_CADA = 100
+
+
+def _serializar_schema(schema: Any) -> Any:
+    if schema is None or isinstance(schema, (dict, list, str)):
+        return schema
+    if isinstance(schema, types.Schema):
+        return schema.model_dump(exclude_none=True)
+    try:
+        return TypeAdapter(schema).json_schema()
+    except Exception:
+        return repr(schema)
+
+
+def _serializar_contents(contents: List[types.Content]) -> List[Dict[str, Any]]:
+    serializados = []
+    for content in contents:
+        partes = []
+        for part in content.parts or []:
+            if part.text is not None:
+                partes.append({"texto": part.text})
+            elif part.file_data is not None:
+                partes.append({"arquivo": part.file_data.file_uri})
+            else:
+                partes.append(part.model_dump(mode="json", exclude_none=True))
+        serializados.append({"role": content.role, "partes": partes})
+    return serializados
+
+
+def chave_resposta(model: str, contents: List[types.Content], system_instruction: Optional[str] = None,
+                   schema: Any = None) -> str:
+    """Hash canônico de tudo que determina a resposta do modelo"""
+    canonico = {
+        "modelo": model,
+        "sistema": system_instruction,
+        "conteudo": _serializar_contents(contents),
+        "schema": _serializar_schema(schema),
+    }
+    return hashlib.sha256(json.dumps(canonico, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+class CacheRespostasLLM:
+    """
+    Cache exato das respostas estruturadas do Gemini no Postgres, compartilhado
+    pelos workers. Regerar um artefato com as mesmas entradas devolve a resposta
+    anterior enquanto ela não expira (LLM_CACHE_TTL); 'forcar_regeneracao' nos
+    schemas de criação ignora a entrada e a substitui.
+    """
+
+    def __init__(self, ttl: int = LLM_CACHE_TTL):
+        self.ttl = timedelta(seconds=ttl)
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self.ignorados: Dict[str, int] = defaultdict(int)
+        self.latencia_economizada: Dict[str, float] = defaultdict(float)
+        self.erros = 0
+        self._gravacoes = 0
+
+    async def ler(self, chave: str, artefato: str) -> Optional[Any]:
+        try:
+            async with SessionLocal() as session:
+                linha = await session.get(RespostaLLMCache, chave)
+                if linha is None or linha.expira_em <= datetime.now(timezone.utc):
+                    self.misses[artefato] += 1
+                    return None
+                await session.execute(
+                    update(RespostaLLMCache)
+                    .where(RespostaLLMCache.chave == chave)
+                    .values(hits=RespostaLLMCache.hits + 1, ultimo_uso=datetime.now(timezone.utc))
+                )
+                await session.commit()
+        except Exception as e:
+            self.erros += 1
+            logger.warning(f"Cache de respostas do Gemini indisponível: {e}")
+            return None
+
+        self.hits[artefato] += 1
+        self.latencia_economizada[artefato] += linha.latencia or 0.0
+        logger.info(f"♻️ Resposta do Gemini reaproveitada para {artefato} ({linha.latencia or 0:.1f}s economizados)")
+        return linha.resposta
+
+    def ignorar(self, artefato: str):
+        """Conta uma geração forçada (cache ignorado)"""
+        self.ignorados[artefato] += 1
+
+    async def gravar(self, chave: str, artefato: str, modelo: str, resposta: Any, latencia: float):
+        valores = {
+            "chave": chave,
+            "artefato": artefato,
+            "modelo": modelo,
+            "resposta": resposta,
+            "latencia": latencia,
+            "hits": 0,
+            "expira_em": datetime.now(timezone.utc) + self.ttl,
+        }
+        stmt = insert(RespostaLLMCache).values(**valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RespostaLLMCache.chave],
+            set_={k: stmt.excluded[k] for k in valores if k != "chave"},
+        )
+        try:
+            async with SessionLocal() as session:
+                await session.execute(stmt)
+                self._gravacoes += 1
+                if self._gravacoes % LIMPEZA_A_CADA == 0:
+                    await session.execute(delete(RespostaLLMCache).where(RespostaLLMCache.expira_em < datetime.now(timezone.utc)))
+                await session.commit()
+        except Exception as e:
+            self.erros += 1
+            logger.warning(f"Não foi possível gravar a resposta do Gemini em cache: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        artefatos = set(self.hits) | set(self.misses) | set(self.ignorados)
+        por_artefato = {}
+        for artefato in sorted(artefatos):
+            total = self.hits[artefato] + self.misses[artefato]
+            por_artefato[artefato] = {
+                "hits": self.hits[artefato],
+                "misses": self.misses[artefato],
+                "forcados": self.ignorados[artefato],
+                "taxa_acerto": round(self.hits[artefato] / total, 4) if total else None,
+                "latencia_economizada_s": round(self.latencia_economizada[artefato], 2),
+            }
+        return {"ttl_s": int(self.ttl.total_seconds()), "erros": self.erros, "artefatos": por_artefato}
+
+
+cache_respostas = CacheRespostasLLM()
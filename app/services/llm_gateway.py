@@ -0,0 +1,232 @@
+import json
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+from google.genai import errors, types
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from app.client import get_genai_client
+from app.services.llm_cache import cache_respostas, chave_resposta
+from app.services.gemini_context_cache import caches_contexto
+from app.services.progresso import emitir, etapa
+from app.config import (
+    LLM_CACHE_ATIVO, GEMINI_CONTEXTO_CACHE, GEMINI_MAX_CONCORRENCIA, GEMINI_CONCORRENCIA_MODELO, GEMINI_LIMITES_MODELO,
+    GEMINI_TIMEOUT, GEMINI_RETENTATIVAS, GEMINI_RETRY_BASE, GEMINI_RETRY_MAX
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RespostaInvalidaLLM(Exception):
+    """O modelo respondeu, mas o texto não é o JSON esperado"""
+
+
+def _retentavel(erro: BaseException) -> bool:
+    if isinstance(erro, errors.APIError):
+        return erro.code == 429 or erro.code >= 500
+    return isinstance(erro, (asyncio.TimeoutError, httpx.TransportError))
+
+
+def extrair_json(texto: Optional[str]) -> Any:
+    """Interpreta a resposta do modelo como JSON, tolerando cercas de código markdown"""
+    if not texto:
+        raise RespostaInvalidaLLM("Resposta vazia do modelo")
+    texto = texto.strip()
+    if texto.startswith("```"):
+        texto = texto.split("\n", 1)[1] if "\n" in texto else ""
+        texto = texto.rsplit("```", 1)[0]
+    try:
+        return json.loads(texto)
+    except json.JSONDecodeError as e:
+        raise RespostaInvalidaLLM(f"JSON inválido na resposta do modelo: {e}") from e
+
+
+def _cache_recusado(erro: errors.ClientError) -> bool:
+    """Erro do Gemini por cache de contexto inexistente ou expirado (não vale para 429 e afins)"""
+    mensagem = f"{erro.message or ''} {erro.status or ''}".lower()
+    return erro.code in (400, 403, 404) and ("cache" in mensagem or "cached" in mensagem)
+
+
+class GatewayLLM:
+    """
+    Ponto único de chamada ao Gemini para todos os artefatos (DFD, PDP, PGR, ETP).
+
+    Usa o cliente assíncrono do SDK (client.aio), então a geração não bloqueia
+    o event loop. Limita as chamadas simultâneas no total
+    (GEMINI_MAX_CONCORRENCIA) e por modelo (GEMINI_LIMITES_MODELO, ou
+    GEMINI_CONCORRENCIA_MODELO), aplica timeout por tentativa e repete erros
+    transitórios (429/5xx, timeout, rede) com backoff exponencial e jitter.
+
+    A instrução de sistema de gerar_json é o prefixo estático de cada
+    artefato: com GEMINI_CONTEXTO_CACHE ela vai por context caching e cada
+    chamada envia só a parte específica do projeto.
+    """
+
+    def __init__(self, max_concorrencia: int, concorrencia_modelo: int, limites_modelo: Dict[str, int]):
+        self.max_concorrencia = max_concorrencia
+        self.concorrencia_modelo = concorrencia_modelo
+        self.limites_modelo = limites_modelo
+        self._global = asyncio.Semaphore(max_concorrencia)
+        self._por_modelo: Dict[str, asyncio.Semaphore] = {}
+        self.em_uso: Dict[str, int] = defaultdict(int)
+        self.chamadas: Dict[str, int] = defaultdict(int)
+        self.erros: Dict[str, int] = defaultdict(int)
+        self.latencia_total: Dict[str, float] = defaultdict(float)
+        self.tokens_entrada: Dict[str, int] = defaultdict(int)
+        self.tokens_cache: Dict[str, int] = defaultdict(int)
+        self.tokens_saida: Dict[str, int] = defaultdict(int)
+        self.retentativas = 0
+        self.timeouts = 0
+        self.respostas_invalidas = 0
+
+    def _semaforo_modelo(self, model: str) -> asyncio.Semaphore:
+        if model not in self._por_modelo:
+            self._por_modelo[model] = asyncio.Semaphore(self.limites_modelo.get(model, self.concorrencia_modelo))
+        return self._por_modelo[model]
+
+    def _retentador(self, model: str) -> AsyncRetrying:
+        def registrar(estado):
+            self.retentativas += 1
+            logger.warning(f"🔁 Retentativa {estado.attempt_number} no Gemini ({model}): {estado.outcome.exception()}")
+
+        return AsyncRetrying(
+            stop=stop_after_attempt(GEMINI_RETENTATIVAS),
+            wait=wait_random_exponential(multiplier=GEMINI_RETRY_BASE, max=GEMINI_RETRY_MAX),
+            retry=retry_if_exception(_retentavel),
+            before_sleep=registrar,
+            reraise=True,
+        )
+
+    async def _tentar(self, model: str, contents: List[types.Content],
+                      config: types.GenerateContentConfig, timeout: float) -> types.GenerateContentResponse:
+        async with self._global, self._semaforo_modelo(model):
+            self.em_uso[model] += 1
+            inicio = time.perf_counter()
+            try:
+                resposta = await asyncio.wait_for(
+                    get_genai_client().aio.models.generate_content(model=model, contents=contents, config=config),
+                    timeout=timeout,
+                )
+                self._registrar_uso(model, resposta)
+                return resposta
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            finally:
+                self.em_uso[model] -= 1
+                self.latencia_total[model] += time.perf_counter() - inicio
+
+    def _registrar_uso(self, model: str, resposta: types.GenerateContentResponse):
+        uso = resposta.usage_metadata
+        if uso is None:
+            return
+        self.tokens_entrada[model] += uso.prompt_token_count or 0
+        self.tokens_cache[model] += uso.cached_content_token_count or 0
+        self.tokens_saida[model] += uso.candidates_token_count or 0
+
+    async def gerar(self, model: str, contents: Union[str, List[types.Content]],
+                    config: Optional[types.GenerateContentConfig] = None,
+                    timeout: float = GEMINI_TIMEOUT) -> types.GenerateContentResponse:
+        """Gera conteúdo com limites, timeout e retentativas; 'contents' pode ser só o texto do prompt"""
+        if isinstance(contents, str):
+            contents = [types.Content(role="user", parts=[types.Part.from_text(text=contents)])]
+
+        self.chamadas[model] += 1
+        try:
+            async for tentativa in self._retentador(model):
+                with tentativa:
+                    return await self._tentar(model, contents, config, timeout)
+        except Exception:
+            self.erros[model] += 1
+            raise
+
+    async def gerar_json(self, model: str, contents: Union[str, List[types.Content]],
+                         schema: Optional[Any] = None, timeout: float = GEMINI_TIMEOUT,
+                         system_instruction: Optional[str] = None, artefato: Optional[str] = None,
+                         forcar_regeneracao: bool = False) -> Any:
+        """
+        Gera saída estruturada: pede application/json (com response_schema,
+        quando informado) e devolve o JSON já interpretado.
+
+        Com 'artefato' informado, a resposta passa pelo cache exato de
+        respostas (chave: modelo, instrução de sistema, conteúdo e schema);
+        'forcar_regeneracao' gera de novo e substitui a entrada.
+        """
+        if isinstance(contents, str):
+            contents = [types.Content(role="user", parts=[types.Part.from_text(text=contents)])]
+
+        chave = None
+        if artefato and LLM_CACHE_ATIVO:
+            chave = chave_resposta(model, contents, system_instruction, schema)
+            if forcar_regeneracao:
+                cache_respostas.ignorar(artefato)
+            else:
+                em_cache = await cache_respostas.ler(chave, artefato)
+                if em_cache is not None:
+                    emitir("geracao_ia", "Resposta reaproveitada do cache", artefato=artefato, cache=True)
+                    return em_cache
+
+        def configurar(cached_content: Optional[str]) -> types.GenerateContentConfig:
+            return types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=schema,
+                system_instruction=None if cached_content else system_instruction,
+                cached_content=cached_content,
+            )
+
+        nome_etapa = f"geracao_{artefato}" if artefato else "extracao_ia"
+        async with etapa(nome_etapa, f"Consultando {model}", modelo=model, artefato=artefato):
+            cached_content = None
+            if system_instruction and GEMINI_CONTEXTO_CACHE:
+                cached_content = await caches_contexto.obter(model, system_instruction)
+
+            inicio = time.perf_counter()
+            try:
+                resposta = await self.gerar(model, contents, configurar(cached_content), timeout)
+            except errors.ClientError as e:
+                if not cached_content or not _cache_recusado(e):
+                    raise
+                # Cache de contexto expirado ou removido no Gemini: descarta e envia a instrução inline
+                logger.warning(f"Cache de contexto {cached_content} recusado ({e}); reenviando sem cache")
+                caches_contexto.invalidar(model, system_instruction)
+                resposta = await self.gerar(model, contents, configurar(None), timeout)
+            try:
+                dados = extrair_json(resposta.text)
+            except RespostaInvalidaLLM:
+                self.respostas_invalidas += 1
+                raise
+
+        if chave:
+            await cache_respostas.gravar(chave, artefato, model, dados, time.perf_counter() - inicio)
+        return dados
+
+    def metrics(self) -> Dict[str, Any]:
+        modelos = set(self.chamadas) | set(self.em_uso)
+        return {
+            "max_concorrencia": self.max_concorrencia,
+            "retentativas": self.retentativas,
+            "timeouts": self.timeouts,
+            "respostas_invalidas": self.respostas_invalidas,
+            "modelos": {
+                model: {
+                    "limite": self.limites_modelo.get(model, self.concorrencia_modelo),
+                    "em_uso": self.em_uso[model],
+                    "chamadas": self.chamadas[model],
+                    "erros": self.erros[model],
+                    "latencia_media_s": round(self.latencia_total[model] / self.chamadas[model], 3) if self.chamadas[model] else None,
+                    "tokens_entrada": self.tokens_entrada[model],
+                    "tokens_entrada_cacheados": self.tokens_cache[model],
+                    "tokens_entrada_sem_cache": self.tokens_entrada[model] - self.tokens_cache[model],
+                    "fracao_cacheada": round(self.tokens_cache[model] / self.tokens_entrada[model], 4) if self.tokens_entrada[model] else None,
+                    "tokens_saida": self.tokens_saida[model],
+                }
+                for model in sorted(modelos)
+            },
+        }
+
+
+llm_gateway = GatewayLLM(GEMINI_MAX_CONCORRENCIA, GEMINI_CONCORRENCIA_MODELO, GEMINI_LIMITES_MODELO)
@@ -0,0 +1,128 @@
+import json
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Callable, Dict
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import SessionLocal
+from app.models.job_models import MetricaWorker
+from app.services.embedding_registry import model_registry
+from app.services.embedding_cache_services import embedding_cache
+from app.services.pncp_harvester import harvester
+from app.services.vector_index import indice_vetorial
+from app.services.document_store import document_store
+from app.services.executor import monitor_loop
+from app.services.ranking_incremental import telemetria_ranking
+from app.services.pncp_client import pncp_client
+from app.services.pncp_page_cache import cache_paginas
+from app.services.gemini_files import gemini_arquivos
+from app.services.pdf_paginas import telemetria_recorte
+from app.services.extracao_itens import extracoes_itens
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_cache import cache_respostas
+from app.services.gemini_context_cache import caches_contexto
+from app.services.telemetria_pool import telemetria_pool
+from app.config import METRICAS_WORKER_INTERVALO
+
+logger = logging.getLogger(__name__)
+
+# Métricas em memória de cada processo, pelo nome do endpoint /metrics/<fonte>
+FONTES: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "embeddings": model_registry.metrics,
+    "embedding_cache": embedding_cache.metrics,
+    "pncp_coleta": harvester.metrics,
+    "indice_vetorial": indice_vetorial.metrics,
+    "documentos": document_store.metrics,
+    "event_loop": monitor_loop.metrics,
+    "ranking_incremental": telemetria_ranking.metrics,
+    "pncp_cliente": pncp_client.metrics,
+    "pncp_cache_paginas": cache_paginas.metrics,
+    "gemini_arquivos": gemini_arquivos.metrics,
+    "recorte_pdf": telemetria_recorte.metrics,
+    "extracoes": extracoes_itens.metrics,
+    "llm": llm_gateway.metrics,
+    "llm_cache": cache_respostas.metrics,
+    "gemini_contexto": caches_contexto.metrics,
+    "pool_db": telemetria_pool.metrics,
+}
+
+
+def coletar() -> Dict[str, Any]:
+    """Métricas de todas as fontes deste processo (uma fonte com erro não derruba as demais)"""
+    dados = {}
+    for nome, fonte in FONTES.items():
+        try:
+            dados[nome] = fonte()
+        except Exception as e:
+            dados[nome] = {"erro": str(e)}
+    return dados
+
+
+class PublicadorMetricas:
+    """
+    Grava periodicamente em core.metrica_worker o retrato das métricas deste
+    worker. A API não compartilha memória com os workers: é por essa tabela
+    que os /metrics/* mostram o trabalho das gerações.
+    """
+
+    def __init__(self, worker: str, intervalo: float = METRICAS_WORKER_INTERVALO):
+        self.worker = worker
+        self.intervalo = intervalo
+
+    async def publicar(self):
+        dados = json.dumps(coletar(), ensure_ascii=False, default=str)
+        async with SessionLocal() as session:
+            stmt = insert(MetricaWorker).values(worker=self.worker, dados=dados, atualizado_em=func.now())
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=[MetricaWorker.worker],
+                set_={"dados": stmt.excluded.dados, "atualizado_em": stmt.excluded.atualizado_em},
+            ))
+            # Retratos de workers que pararam sem se remover
+            await session.execute(delete(MetricaWorker).where(
+                MetricaWorker.atualizado_em < func.now() - timedelta(seconds=3 * self.intervalo)
+            ))
+            await session.commit()
+
+    async def loop(self):
+        """Publicação periódica (tarefa de fundo do worker)"""
+        while True:
+            try:
+                await self.publicar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Métricas do worker não publicadas: {e}")
+            await asyncio.sleep(self.intervalo)
+
+    async def remover(self):
+        """Apaga o retrato deste worker no encerramento"""
+        try:
+            async with SessionLocal() as session:
+                await session.execute(delete(MetricaWorker).where(MetricaWorker.worker == self.worker))
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"Retrato de métricas do worker {self.worker} não removido: {e}")
+
+
+async def metricas_workers(fonte: str, intervalo: float = METRICAS_WORKER_INTERVALO) -> Dict[str, Any]:
+    """Último retrato da fonte publicado por cada worker ativo, por host:pid"""
+    async with SessionLocal() as session:
+        linhas = (await session.execute(
+            select(MetricaWorker).where(MetricaWorker.atualizado_em >= func.now() - timedelta(seconds=3 * intervalo))
+        )).scalars().all()
+    return {
+        linha.worker: {"atualizado_em": linha.atualizado_em.isoformat(), **json.loads(linha.dados).get(fonte, {})}
+        for linha in linhas
+    }
+
+
+async def por_processo(fonte: str) -> Dict[str, Any]:
+    """Métricas da fonte neste processo (API) e em cada worker, rotuladas pelo processo"""
+    try:
+        workers = await metricas_workers(fonte)
+    except Exception as e:
+        workers = {"erro": str(e)}
+    return {"api": FONTES[fonte](), "workers": workers}
@@ -0,0 +1,236 @@
+import os
+import re
+import sys
+import json
+import time
+import logging
+from typing import List, Union, Dict, Any
+
+import numpy as np
+
+from app.config import EMBEDDING_MODELS, EMBEDDING_ONNX_DIR, EMBEDDING_ONNX_THREADS
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_MODELO = "model_int8.onnx"
+ARQUIVO_CONFIG = "config_onnx.json"
+ARQUIVO_TOKENIZER = "tokenizer.json"
+
+# Amostra de objetos de contratação usada na paridade e no benchmark
+TEXTOS_AMOSTRA = [
+    "Aquisição de computadores desktop para as unidades administrativas",
+    "Contratação de empresa especializada em manutenção predial preventiva e corretiva",
+    "Registro de preços para aquisição de material de expediente",
+    "Prestação de serviços de limpeza, asseio e conservação",
+    "Aquisição de notebooks e monitores para o cartório eleitoral",
+    "Serviço de vigilância armada e desarmada nas dependências do tribunal",
+    "Fornecimento de combustível para a frota de veículos oficiais",
+    "Aquisição de licenças de software de antivírus corporativo",
+    "Contratação de serviços de telefonia móvel pessoal",
+    "Locação de veículos com motorista para transporte de urnas eletrônicas",
+    "Aquisição de mobiliário de escritório: cadeiras, mesas e armários",
+    "Serviços de outsourcing de impressão com fornecimento de insumos",
+    "Aquisição de nobreaks e estabilizadores de tensão",
+    "Contratação de link de internet dedicado com redundância",
+    "Fornecimento de água mineral em garrafões de 20 litros",
+    "Manutenção de aparelhos de ar-condicionado tipo split",
+]
+
+
+def diretorio_modelo(model_name: str, base_dir: str = EMBEDDING_ONNX_DIR) -> str:
+    """Diretório do modelo exportado (um por modelo configurado)"""
+    return os.path.join(base_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+
+
+def modelo_exportado(model_name: str, base_dir: str = EMBEDDING_ONNX_DIR) -> bool:
+    diretorio = diretorio_modelo(model_name, base_dir)
+    return all(os.path.exists(os.path.join(diretorio, arquivo))
+               for arquivo in [ARQUIVO_MODELO, ARQUIVO_CONFIG, ARQUIVO_TOKENIZER])
+
+
+class OnnxEmbeddingModel:
+    """
+    Modelo de embedding exportado para ONNX com quantização dinâmica int8.
+
+    Roda no onnxruntime (CPU) com o tokenizer do pacote tokenizers, sem torch,
+    e expõe o mesmo encode(textos) -> np.ndarray usado com o SentenceTransformer,
+    incluindo o pooling e a normalização do modelo original.
+    """
+
+    def __init__(self, diretorio: str, threads: int = EMBEDDING_ONNX_THREADS):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError("EMBEDDING_BACKEND=onnx requer os pacotes onnxruntime e tokenizers") from e
+
+        with open(os.path.join(diretorio, ARQUIVO_CONFIG), encoding="utf-8") as f:
+            self.config = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(diretorio, ARQUIVO_TOKENIZER))
+        self.tokenizer.enable_truncation(self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_id"], pad_token=self.config["pad_token"])
+
+        opcoes = ort.SessionOptions()
+        if threads:
+            opcoes.intra_op_num_threads = threads
+        self.sessao = ort.InferenceSession(
+            os.path.join(diretorio, ARQUIVO_MODELO), opcoes, providers=["CPUExecutionProvider"]
+        )
+        self.entradas = [entrada.name for entrada in self.sessao.get_inputs()]
+
+    def _pooling(self, tokens: np.ndarray, mascara: np.ndarray) -> np.ndarray:
+        modo = self.config["pooling"]
+        if modo == "cls":
+            return tokens[:, 0]
+        if modo == "max":
+            return np.where(mascara[..., None] > 0, tokens, -1e9).max(axis=1)
+        pesos = mascara[..., None].astype(np.float32)
+        return (tokens * pesos).sum(axis=1) / np.clip(pesos.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        unico = isinstance(sentences, str)
+        textos = [sentences] if unico else list(sentences)
+        if not textos:
+            return np.zeros((0, self.config["dimensao"]), dtype=np.float32)
+
+        # Lotes de textos de tamanho parecido reduzem o padding
+        ordem = np.argsort([len(texto) for texto in textos])
+        saidas = np.zeros((len(textos), self.config["dimensao"]), dtype=np.float32)
+        for inicio in range(0, len(textos), batch_size):
+            indices = ordem[inicio:inicio + batch_size]
+            codificados = self.tokenizer.encode_batch([textos[i] for i in indices])
+            valores = {
+                "input_ids": np.array([c.ids for c in codificados], dtype=np.int64),
+                "attention_mask": np.array([c.attention_mask for c in codificados], dtype=np.int64),
+                "token_type_ids": np.array([c.type_ids for c in codificados], dtype=np.int64),
+            }
+            tokens = self.sessao.run(None, {nome: valores[nome] for nome in self.entradas})[0]
+            saidas[indices] = self._pooling(tokens, valores["attention_mask"])
+
+        if self.config["normalizar"]:
+            saidas /= np.clip(np.linalg.norm(saidas, axis=1, keepdims=True), 1e-12, None)
+        return saidas[0] if unico else saidas
+
+
+def exportar_onnx(model_name: str, base_dir: str = EMBEDDING_ONNX_DIR, opset: int = 17) -> str:
+    """
+    Exporta o transformer do SentenceTransformer para ONNX e aplica quantização
+    dinâmica int8 nos pesos. Roda offline (precisa de torch, onnx e onnxruntime).
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Transformer, Pooling, Normalize
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    model = SentenceTransformer(model_name, device="cpu")
+    pooling, normalizar = "mean", False
+    for modulo in model:
+        if isinstance(modulo, Pooling):
+            pooling = modulo.get_pooling_mode_str()
+        elif isinstance(modulo, Normalize):
+            normalizar = True
+        elif not isinstance(modulo, Transformer):
+            raise ValueError(f"Módulo {type(modulo).__name__} de {model_name} não suportado na exportação ONNX")
+    if pooling not in ("mean", "cls", "max"):
+        raise ValueError(f"Pooling '{pooling}' de {model_name} não suportado na exportação ONNX")
+
+    transformer = model[0]
+    tokenizer = transformer.tokenizer
+    auto_model = transformer.auto_model.eval()
+    amostra = tokenizer(["exportação do modelo de embedding"], return_tensors="pt")
+    entradas = [nome for nome in ("input_ids", "attention_mask", "token_type_ids") if nome in amostra]
+
+    class SaidaTokens(torch.nn.Module):
+        def __init__(self, modelo):
+            super().__init__()
+            self.modelo = modelo
+
+        def forward(self, *args):
+            return self.modelo(**dict(zip(entradas, args))).last_hidden_state
+
+    diretorio = diretorio_modelo(model_name, base_dir)
+    os.makedirs(diretorio, exist_ok=True)
+    caminho_fp32 = os.path.join(diretorio, "model_fp32.onnx")
+    eixos = {nome: {0: "lote", 1: "sequencia"} for nome in entradas + ["token_embeddings"]}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            SaidaTokens(auto_model), tuple(amostra[nome] for nome in entradas), caminho_fp32,
+            input_names=entradas, output_names=["token_embeddings"], dynamic_axes=eixos, opset_version=opset,
+        )
+    quantize_dynamic(caminho_fp32, os.path.join(diretorio, ARQUIVO_MODELO), weight_type=QuantType.QInt8)
+    os.remove(caminho_fp32)
+
+    tokenizer.save_pretrained(diretorio)
+    with open(os.path.join(diretorio, ARQUIVO_CONFIG), "w", encoding="utf-8") as f:
+        json.dump({
+            "modelo": model_name,
+            "dimensao": model.get_sentence_embedding_dimension(),
+            "max_seq_length": model.max_seq_length,
+            "pooling": pooling,
+            "normalizar": normalizar,
+            "pad_id": tokenizer.pad_token_id,
+            "pad_token": tokenizer.pad_token,
+        }, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"✅ {model_name} exportado para ONNX int8 em {diretorio}")
+    return diretorio
+
+
+def verificar_paridade(referencia, candidato, textos: List[str] = TEXTOS_AMOSTRA, k: int = 5) -> Dict[str, Any]:
+    """
+    Compara os embeddings do backend candidato com os do modelo de referência
+    (torch): similaridade de cosseno por texto e concordância dos k vizinhos mais
+    próximos dentro da amostra.
+    """
+    a = np.asarray(referencia.encode(textos), dtype=np.float32)
+    b = np.asarray(candidato.encode(textos), dtype=np.float32)
+    a /= np.linalg.norm(a, axis=1, keepdims=True)
+    b /= np.linalg.norm(b, axis=1, keepdims=True)
+    cossenos = (a * b).sum(axis=1)
+
+    k = min(k, len(textos) - 1)
+    vizinhos_a = np.argsort(-(a @ a.T), axis=1)[:, 1:k + 1]
+    vizinhos_b = np.argsort(-(b @ b.T), axis=1)[:, 1:k + 1]
+    concordancia = np.mean([len(set(x) & set(y)) / k for x, y in zip(vizinhos_a, vizinhos_b)])
+
+    return {
+        "textos": len(textos),
+        "cosseno_min": round(float(cossenos.min()), 5),
+        "cosseno_medio": round(float(cossenos.mean()), 5),
+        f"concordancia_top{k}": round(float(concordancia), 4),
+    }
+
+
+def medir_throughput(modelo, textos: List[str] = TEXTOS_AMOSTRA, total: int = 2048, batch_size: int = 32) -> Dict[str, Any]:
+    """Textos por segundo no encode (após um aquecimento)"""
+    lote = (textos * (total // len(textos) + 1))[:total]
+    modelo.encode(textos[:batch_size], batch_size=batch_size)
+    inicio = time.perf_counter()
+    modelo.encode(lote, batch_size=batch_size)
+    duracao = time.perf_counter() - inicio
+    return {"textos": total, "segundos": round(duracao, 3), "textos_por_segundo": round(total / duracao, 1)}
+
+
+if __name__ == "__main__":
+    # python -m app.services.onnx_embedding [exportar|paridade|benchmark] [modelo]
+    logging.basicConfig(level=logging.INFO)
+    comando = sys.argv[1] if len(sys.argv) > 1 else "exportar"
+    model_name = sys.argv[2] if len(sys.argv) > 2 else EMBEDDING_MODELS[0]
+
+    if comando == "exportar":
+        exportar_onnx(model_name)
+    elif comando in ("paridade", "benchmark"):
+        from sentence_transformers import SentenceTransformer
+
+        referencia = SentenceTransformer(model_name, device="cpu")
+        candidato = OnnxEmbeddingModel(diretorio_modelo(model_name))
+        print(json.dumps({"paridade": verificar_paridade(referencia, candidato)}, indent=2))
+        if comando == "benchmark":
+            print(json.dumps({
+                "torch": medir_throughput(referencia),
+                "onnx_int8": medir_throughput(candidato),
+            }, indent=2))
+    else:
+        raise SystemExit(f"Comando desconhecido: {comando}")
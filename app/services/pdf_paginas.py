@@ -0,0 +1,137 @@
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.config import PDP_TOKENS_POR_DOCUMENTO
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # recorte desativado sem o pypdf
+    PdfReader = PdfWriter = None
+
+logger = logging.getLogger(__name__)
+
+# O Gemini cobra cada página de PDF como imagem (~258 tokens) mais o texto extraído
+TOKENS_POR_PAGINA = 258
+CARACTERES_POR_TOKEN = 4
+
+PADROES_PRECO = [
+    (re.compile(r"R\$\s*\d"), 3.0),
+    (re.compile(r"\b\d{1,3}(?:\.\d{3})*,\d{2}\b"), 1.0),
+    (re.compile(r"valor\s+unit", re.IGNORECASE), 8.0),
+    (re.compile(r"valor\s+total", re.IGNORECASE), 5.0),
+    (re.compile(r"pre[çc]o", re.IGNORECASE), 2.0),
+    (re.compile(r"\bquantidade\b|\bqtd[e]?\b", re.IGNORECASE), 2.0),
+    (re.compile(r"\bunidade\b|\bund\b|\bun\b", re.IGNORECASE), 1.0),
+    (re.compile(r"\bitem\b", re.IGNORECASE), 1.0),
+    (re.compile(r"\bmarca\b", re.IGNORECASE), 2.0),
+    (re.compile(r"\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}"), 4.0),  # CNPJ
+]
+LIMITE_POR_PADRAO = 20
+
+
+@dataclass
+class RecortePDF:
+    """Resultado do recorte de um PDF"""
+    caminho: str
+    paginas_originais: int
+    paginas_mantidas: List[int]
+    tokens_originais: int
+    tokens_mantidos: int
+
+
+def pontuar_pagina(texto: str) -> float:
+    """Indício de tabela de itens/preços na página (padrões de moeda, valor unitário, CNPJ...)"""
+    return sum(peso * min(len(padrao.findall(texto)), LIMITE_POR_PADRAO) for padrao, peso in PADROES_PRECO)
+
+
+def estimar_tokens(texto: str) -> int:
+    return TOKENS_POR_PAGINA + len(texto) // CARACTERES_POR_TOKEN
+
+
+def recortar_pdf(origem: str, destino: str, orcamento_tokens: int = PDP_TOKENS_POR_DOCUMENTO) -> Optional[RecortePDF]:
+    """
+    Grava em 'destino' um PDF só com as páginas que mais parecem conter a tabela
+    de itens e preços, dentro de 'orcamento_tokens'. A primeira página (órgão,
+    processo, fornecedor) é sempre mantida e a ordem original é preservada.
+
+    Retorna None quando não há o que recortar: pypdf ausente, PDF sem texto
+    extraível (digitalizado) ou documento que já cabe no orçamento.
+    """
+    if PdfReader is None:
+        return None
+
+    leitor = PdfReader(origem)
+    textos = []
+    for pagina in leitor.pages:
+        try:
+            textos.append(pagina.extract_text() or "")
+        except Exception:
+            textos.append("")
+
+    if not any(texto.strip() for texto in textos):
+        return None
+
+    tokens = [estimar_tokens(texto) for texto in textos]
+    total_tokens = sum(tokens)
+    if total_tokens <= orcamento_tokens:
+        return None
+
+    pontuacoes = [pontuar_pagina(texto) for texto in textos]
+    mantidas = {0}
+    usados = tokens[0]
+    for indice in sorted(range(1, len(textos)), key=lambda i: pontuacoes[i], reverse=True):
+        if pontuacoes[indice] <= 0:
+            break
+        if usados + tokens[indice] > orcamento_tokens:
+            continue
+        mantidas.add(indice)
+        usados += tokens[indice]
+
+    escritor = PdfWriter()
+    for indice in sorted(mantidas):
+        escritor.add_page(leitor.pages[indice])
+    with open(destino, "wb") as f:
+        escritor.write(f)
+
+    return RecortePDF(
+        caminho=destino,
+        paginas_originais=len(textos),
+        paginas_mantidas=[i + 1 for i in sorted(mantidas)],
+        tokens_originais=total_tokens,
+        tokens_mantidos=usados,
+    )
+
+
+class TelemetriaRecorte:
+    """Páginas e tokens estimados poupados pelo recorte neste worker"""
+
+    def __init__(self):
+        self.documentos = 0
+        self.recortados = 0
+        self.paginas_originais = 0
+        self.paginas_enviadas = 0
+        self.tokens_originais = 0
+        self.tokens_enviados = 0
+
+    def registrar(self, recorte: RecortePDF):
+        self.recortados += 1
+        self.paginas_originais += recorte.paginas_originais
+        self.paginas_enviadas += len(recorte.paginas_mantidas)
+        self.tokens_originais += recorte.tokens_originais
+        self.tokens_enviados += recorte.tokens_mantidos
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "pypdf_disponivel": PdfReader is not None,
+            "documentos": self.documentos,
+            "recortados": self.recortados,
+            "paginas_originais": self.paginas_originais,
+            "paginas_enviadas": self.paginas_enviadas,
+            "tokens_estimados_originais": self.tokens_originais,
+            "tokens_estimados_enviados": self.tokens_enviados,
+        }
+
+
+telemetria_recorte = TelemetriaRecorte()
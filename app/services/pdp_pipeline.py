@@ -0,0 +1,176 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import (
+    PDP_DOWNLOADS_SIMULTANEOS, PDP_UPLOADS_SIMULTANEOS, PDP_DOCUMENTOS_MINIMOS_IA, PDP_TOLERANCIA_UPLOAD,
+    PDP_RECORTE_PAGINAS
+)
+from app.services.document_store import document_store
+from app.services.gemini_files import gemini_arquivos
+from app.services.executor import executar_cpu
+from app.services.pdf_paginas import recortar_pdf, telemetria_recorte
+from app.services.extracao_itens import extracoes_itens
+from app.services.pdp_search_services import PNCPSearcher, DocumentoResultado
+from app.services.progresso import emitir, etapa
+
+logger = logging.getLogger(__name__)
+
+
+def nomear_por_tipo(documentos: List[DocumentoResultado]) -> List[str]:
+    """Nomes dos arquivos no workspace (ATA_1.pdf, CONTRATOS_1.pdf, ...) na ordem do ranking"""
+    contadores = {}
+    nomes = []
+    for documento in documentos:
+        prefixo = "ATA" if "ata" in (documento.tipo or "").lower() else "CONTRATOS"
+        contadores[prefixo] = contadores.get(prefixo, 0) + 1
+        nomes.append(f"{prefixo}_{contadores[prefixo]}.pdf")
+    return nomes
+
+
+def materializar_pdf(origem: str, destino: str) -> bool:
+    """Valida que o documento é um PDF e o disponibiliza no workspace"""
+    with open(origem, "rb") as f:
+        if f.read(5) != b"%PDF-":
+            return False
+    document_store.materializar(origem, destino)
+    return True
+
+
+async def recortar_para_ia(caminho: str) -> Optional[str]:
+    """Recorta o PDF nas páginas com tabelas de preços; None se o documento vai inteiro"""
+    telemetria_recorte.documentos += 1
+    destino = caminho[:-len(".pdf")] + "_recorte.pdf"
+    try:
+        recorte = await executar_cpu(recortar_pdf, caminho, destino)
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível recortar {os.path.basename(caminho)}: {e}")
+        return None
+    if recorte is None:
+        return None
+    telemetria_recorte.registrar(recorte)
+    logger.info(
+        f"✂️ {os.path.basename(caminho)}: {len(recorte.paginas_mantidas)} de {recorte.paginas_originais} páginas "
+        f"({recorte.tokens_mantidos} de ~{recorte.tokens_originais} tokens)"
+    )
+    return recorte.caminho
+
+
+async def enviar_ao_gemini(caminho: str, sha256: Optional[str] = None) -> Any:
+    """Arquivo no Gemini para o documento, reusando o upload anterior do mesmo conteúdo"""
+    return await gemini_arquivos.obter(caminho, sha256)
+
+
+async def preparar_documentos_ia(searcher: PNCPSearcher,
+                                 documentos_similares: List[Tuple[DocumentoResultado, float]],
+                                 destino_dir: str,
+                                 minimo: int = PDP_DOCUMENTOS_MINIMOS_IA,
+                                 tolerancia: float = PDP_TOLERANCIA_UPLOAD,
+                                 forcar_regeneracao: bool = False) -> List[Dict[str, Any]]:
+    """
+    Baixa os documentos selecionados e obtém os itens extraídos de cada um, em pipeline.
+
+    Documentos já extraídos antes (mesmo SHA-256, modelo e prompt) vêm do cache
+    de extrações, exceto com 'forcar_regeneracao', que extrai de novo e
+    substitui a entrada.
+    Os demais seguem para o upload ao Gemini assim que terminam o download
+    (recortados nas páginas com tabelas de preços, com PDP_RECORTE_PAGINAS) e
+    têm os itens extraídos numa chamada própria. A concorrência é limitada em
+    cada etapa (PDP_DOWNLOADS_SIMULTANEOS e PDP_UPLOADS_SIMULTANEOS). Quando
+    'minimo' documentos estão prontos, os demais têm mais 'tolerancia'
+    segundos; os que não terminarem são cancelados e a geração começa com o
+    que já foi extraído.
+
+    Returns:
+        {'documento': origem, 'extracao': dados no formato PpModel}, na ordem do ranking
+    """
+    documentos = [doc for doc, _ in documentos_similares if doc.url_download]
+    nomes = nomear_por_tipo(documentos)
+    semaforo_download = asyncio.Semaphore(PDP_DOWNLOADS_SIMULTANEOS)
+    semaforo_upload = asyncio.Semaphore(PDP_UPLOADS_SIMULTANEOS)
+    inicio = time.perf_counter()
+
+    def resultado(documento: DocumentoResultado, extracao: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "documento": {
+                "orgao": documento.orgao,
+                "objeto": documento.objeto,
+                "tipo": documento.tipo,
+                "url_visualizacao": documento.url_visualizacao,
+            },
+            "extracao": extracao,
+        }
+
+    async def processar(documento: DocumentoResultado, nome: str) -> Optional[Dict[str, Any]]:
+        try:
+            async with semaforo_download:
+                async with etapa("download_pdf", f"Baixando {nome}"):
+                    baixado = await searcher.download_document(documento)
+                if not baixado:
+                    return None
+
+            if forcar_regeneracao:
+                extracoes_itens.ignorar()
+            elif documento.sha256:
+                extracao = await extracoes_itens.ler(documento.sha256)
+                if extracao is not None:
+                    logger.info(f"♻️ {nome}: itens reaproveitados do cache de extrações")
+                    return resultado(documento, extracao)
+
+            destino = os.path.join(destino_dir, nome)
+            if not await asyncio.to_thread(materializar_pdf, documento.filepath, destino):
+                logger.warning(f"⚠️ Documento descartado (não é PDF): {documento.objeto[:50]}...")
+                return None
+
+            # O recorte muda o conteúdo, então o hash do upload passa a ser o do recorte
+            sha256 = documento.sha256
+            if PDP_RECORTE_PAGINAS:
+                recortado = await recortar_para_ia(destino)
+                if recortado:
+                    destino, sha256 = recortado, None
+
+            async with semaforo_upload:
+                async with etapa("upload_gemini", f"Enviando {nome} ao Gemini"):
+                    arquivo = await enviar_ao_gemini(destino, sha256)
+                logger.info(f"☁️ {nome} enviado ao Gemini em {time.perf_counter() - inicio:.2f}s")
+                extracao = await extracoes_itens.extrair(arquivo, documento.sha256)
+            logger.info(f"📑 {nome}: {len(extracao.get('tabela_itens', []))} itens extraídos")
+            return resultado(documento, extracao)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erro ao preparar {nome}: {e}")
+            return None
+
+    emitir("documentos", f"Baixando {len(documentos)} PDFs", atual=0, total=len(documentos))
+    tarefas = {asyncio.create_task(processar(doc, nome)): ordem for ordem, (doc, nome) in enumerate(zip(documentos, nomes))}
+    pendentes = set(tarefas)
+    prontos = []
+    prazo = None
+    loop = asyncio.get_running_loop()
+
+    while pendentes:
+        timeout = None if prazo is None else max(0.0, prazo - loop.time())
+        concluidas, pendentes = await asyncio.wait(pendentes, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not concluidas:
+            break
+        for tarefa in concluidas:
+            pronto = tarefa.result()
+            if pronto is not None:
+                prontos.append((tarefas[tarefa], pronto))
+                emitir("documentos", f"{len(prontos)} de {len(documentos)} documentos prontos",
+                       atual=len(prontos), total=len(documentos))
+        if prazo is None and len(prontos) >= minimo:
+            logger.info(f"🚦 {len(prontos)} documentos prontos em {time.perf_counter() - inicio:.2f}s; iniciando a geração em até {tolerancia}s")
+            prazo = loop.time() + tolerancia
+
+    for tarefa in pendentes:
+        tarefa.cancel()
+    await asyncio.gather(*pendentes, return_exceptions=True)
+    if pendentes:
+        logger.info(f"⏭️ {len(pendentes)} documentos ainda em preparo foram deixados de fora da geração")
+
+    prontos.sort(key=lambda item: item[0])
+    return [pronto for _, pronto in prontos]
@@ -1,20 +1,37 @@
 import os
 import re
 import shutil
-import requests
-from sentence_transformers import SentenceTransformer
-import torch
-from sentence_transformers.util import cos_sim
-from typing import List, Dict, Tuple, Optional
+import asyncio
+import httpx
+import numpy as np
+from typing import Any, List, Dict, Tuple, Optional
 import logging
 from urllib.parse import unquote
 from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from app.config import PNCP_MAX_CONCORRENCIA, PNCP_MODO_BUSCA, PNCP_LOCAL_MIN_RESULTADOS, PNCP_ESPELHAR_BUSCAS, RANKING_BACKEND, RANKING_STREAMING
+from app.config import RANKING_HIBRIDO, RANKING_HIBRIDO_SHORTLIST, SELECAO_MMR, SELECAO_POOL_FATOR, PNCP_CACHE_PAGINAS
+from app.services import pncp_corpus_services
+from app.services.embedding_registry import model_registry, similaridade_cosseno
+from app.services.embedding_cache_services import embedding_cache
+from app.services.vector_index import indice_vetorial
+from app.services.document_store import document_store
+from app.services.pncp_client import pncp_client, CircuitoAbertoError, ErroTransitorioPNCP
+from app.services.pncp_page_cache import cache_paginas
+from app.services.executor import executar_cpu
+from app.services.ranking_incremental import RankingIncremental, RankingPorPaginas, ShortlistLexicaIncremental, telemetria_ranking
+from app.services.ranking_hibrido import pontuar_bm25, fundir_rrf
+from app.services.selecao_diversa import selecionar_mmr
+from app.services.progresso import emitir, etapa
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Datas sem fuso retornadas pela API do PNCP estão no horário de Brasília
+FUSO_PNCP = ZoneInfo("America/Sao_Paulo")
+
 @dataclass
 class DocumentoResultado:
     """Classe para representar um documento encontrado"""
@@ -24,15 +41,27 @@ class DocumentoResultado:
     url_visualizacao: str
     url_download: Optional[str]
     filepath: Optional[str] = None
+    sha256: Optional[str] = None
     similaridade: Optional[float] = None
+    chave: Optional[str] = None
+    uf: Optional[str] = None
+    esfera: Optional[str] = None
+    modalidade: Optional[str] = None
+    data_publicacao: Optional[datetime] = None
 
 class PNCPSearcher:
     def __init__(self, download_dir: str = "app/temp/docs/downloads_pncp", 
-                 similar_files_dir: str = "app/temp/docs/similares"):
+                 similar_files_dir: str = "app/temp/docs/similares",
+                 model: Optional[Any] = None,
+                 modo: str = PNCP_MODO_BUSCA,
+                 ranking: str = RANKING_BACKEND):
         self.download_dir = download_dir
+        self.ranking = ranking  # 'embeddings' (documentos da busca) ou 'indice' (corpus acumulado)
+        self.modo = modo  # 'live' (API do PNCP) ou 'local' (espelho, com fallback para a API)
         self.similar_files_dir = similar_files_dir
         self.base_url = "https://pncp.gov.br/api/search/"
-        self.model = None
+        self.model = model
+        self.telemetria_ranking: Optional[Dict] = None  # telemetria da última busca com ranking incremental
         self._setup_directories()
         
         # Dicionários de mapeamento para validação
@@ -68,27 +97,15 @@ class PNCPSearcher:
             os.makedirs(directory, exist_ok=True)
     
     def _load_model(self):
-        """Carrega o modelo de embedding otimizado para português"""
+        """Obtém o modelo de embedding compartilhado do processo (carregado no startup)"""
         if self.model is None:
-            logger.info("Carregando modelo Sentence Transformer...")
-            # Tentativa de usar modelos em português, com fallback para inglês
-            models_to_try = [
-                'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',  # Multilingual
-                'sentence-transformers/distiluse-base-multilingual-cased',      # Multilingual
-                'all-MiniLM-L6-v2'  # Fallback inglês
-            ]
-            
-            for model_name in models_to_try:
-                try:
-                    self.model = SentenceTransformer(model_name)
-                    logger.info(f"✅ Modelo carregado com sucesso: {model_name}")
-                    break
-                except Exception as e:
-                    logger.warning(f"⚠️ Erro ao carregar {model_name}: {e}")
-                    continue
-            
-            if self.model is None:
-                raise Exception("Não foi possível carregar nenhum modelo de embedding")
+            self.model = model_registry.get_model()
+    
+    def _model_name(self) -> str:
+        """Nome do modelo em uso, parte da chave do cache de embeddings"""
+        if self.model is model_registry.model and model_registry.model_name:
+            return model_registry.model_name
+        return type(self.model).__name__
     
     def _validar_parametros(self, ufs: List[str] = None, esferas: List[str] = None, 
                            modalidades: List[str] = None):
@@ -143,12 +160,177 @@ class PNCPSearcher:
         logger.info(filename)
         return filename[:100] if len(filename) > 100 else filename
     
-    def search_documents(self, palavras: str, tipos_documento: List[str] = None, 
-                        max_documentos: int = 300, tam_pagina: int = 10,
-                        ufs: List[str] = None, esferas: List[str] = None, 
-                        modalidades: List[str] = None, ordenacao: str = "-data") -> List[DocumentoResultado]:
+    def _montar_params(self, palavras: str, tipo: str, pagina: int, tam_pagina: int,
+                       ufs: List[str] = None, esferas: List[str] = None,
+                       modalidades: List[str] = None, ordenacao: str = "-data") -> Dict[str, str]:
+        """Monta os parâmetros de consulta de uma página da API de busca do PNCP"""
+        params = {
+            "q": palavras,
+            "tipos_documento": tipo,
+            "ordenacao": ordenacao,
+            "pagina": str(pagina),
+            "tam_pagina": str(tam_pagina),
+            "status": "vigente"
+        }
+        
+        # Adiciona filtros opcionais
+        if ufs:
+            params["ufs"] = self._processar_ufs(ufs)
+        
+        if esferas:
+            params["esferas"] = self._processar_esferas(esferas)
+        
+        if modalidades:
+            params["modalidades"] = self._processar_modalidades(modalidades)
+        
+        return params
+    
+    async def _buscar_pagina(self, semaforo: asyncio.Semaphore, params: Dict[str, str],
+                             usar_cache: bool = PNCP_CACHE_PAGINAS) -> Dict:
+        """
+        Busca uma página da API respeitando o limite de concorrência da busca. Taxa,
+        concorrência adaptativa, retentativas e circuit breaker ficam no pncp_client.
+        Com 'usar_cache', a página vem do cache compartilhado quando disponível.
+        """
+        async def buscar() -> Dict:
+            async with semaforo:
+                logger.info(f"  📄 Buscando página {params['pagina']} ({params['tipos_documento']})...")
+                logger.debug(f"  🔧 Parâmetros da requisição: {params}")
+                return await pncp_client.get_json(self.base_url, params)
+        
+        if usar_cache:
+            return await cache_paginas.obter(params, buscar)
+        return await buscar()
+    
+    def _processar_pagina(self, resultados: List[Dict], tipo: str, pagina: int,
+                          documentos_tipo: List[DocumentoResultado], documentos_por_tipo: int):
+        """Converte os itens de uma página em documentos, respeitando a meta do tipo"""
+        documentos_processados = 0
+        documentos_aceitos = 0
+        
+        for doc in resultados:
+            if len(documentos_tipo) >= documentos_por_tipo:
+                break
+            
+            documentos_processados += 1
+            documento = self._parse_document(doc, tipo)
+            if documento:
+                documentos_tipo.append(documento)
+                documentos_aceitos += 1
+        
+        logger.info(f"  Página {pagina}: {len(resultados)} documentos | Processados: {documentos_processados} | Aceitos: {documentos_aceitos} | Filtrados: {documentos_processados - documentos_aceitos}")
+    
+    async def _buscar_tipo(self, semaforo: asyncio.Semaphore,
+                           palavras: str, tipo: str, documentos_por_tipo: int, tam_pagina: int,
+                           ufs: List[str] = None, esferas: List[str] = None,
+                           modalidades: List[str] = None, ordenacao: str = "-data",
+                           ranking: Optional[RankingPorPaginas] = None) -> List[DocumentoResultado]:
+        """
+        Busca os documentos de um tipo: a primeira página informa o total de
+        resultados e as páginas restantes são buscadas em paralelo, em lotes do
+        tamanho necessário para completar a meta. Os itens são processados na
+        ordem das páginas, preservando a ordenação da API.
+        
+        Com 'ranking', cada página é pontuada assim que chega, os lotes ficam
+        limitados a PNCP_MAX_CONCORRENCIA páginas e a busca para quando o
+        top-k se estabiliza.
         """
-        Busca documentos na API do PNCP com paginação (sem baixar arquivos)
+        logger.info(f"🔎 Buscando por '{palavras}' (tipo: {tipo}) - Meta: {documentos_por_tipo} documentos")
+        
+        def params_pagina(pagina: int) -> Dict[str, str]:
+            return self._montar_params(palavras, tipo, pagina, tam_pagina, ufs, esferas, modalidades, ordenacao)
+        
+        documentos_tipo = []
+        
+        try:
+            dados = await self._buscar_pagina(semaforo, params_pagina(1))
+        except (httpx.HTTPError, CircuitoAbertoError, ErroTransitorioPNCP, ValueError) as e:
+            logger.error(f"Erro na busca para {tipo}, página 1: {e}")
+            return documentos_tipo
+        
+        resultados = dados.get("items", [])
+        total_resultados = dados.get("total", 0)
+        total_paginas = (total_resultados + tam_pagina - 1) // tam_pagina
+        logger.info(f"  Total de resultados disponíveis: {total_resultados} (≈{total_paginas} páginas)")
+        
+        if resultados:
+            tipos_encontrados = {doc.get('document_type', 'N/D') for doc in resultados[:5]}
+            logger.info(f"  🔍 Tipos de documentos retornados pela API: {list(tipos_encontrados)}")
+        
+        if not resultados:
+            logger.info(f"  Página 1 retornou vazia. Parando busca para {tipo}")
+            return documentos_tipo
+        
+        self._processar_pagina(resultados, tipo, 1, documentos_tipo, documentos_por_tipo)
+        emitir("pncp_paginas", f"Página PNCP 1/{total_paginas} ({tipo})", atual=1, total=total_paginas, tipo_documento=tipo)
+        if ranking:
+            ranking.registrar_busca()
+            ranking.registrar_previsao(min(total_paginas, (documentos_por_tipo + tam_pagina - 1) // tam_pagina))
+            await ranking.adicionar(documentos_tipo)
+            if ranking.encerrado:
+                return documentos_tipo
+        if len(resultados) < tam_pagina:
+            logger.info(f"  Página 1 retornou menos que {tam_pagina} resultados. Fim da busca para {tipo}")
+            return documentos_tipo
+        
+        proxima_pagina = 2
+        while len(documentos_tipo) < documentos_por_tipo and proxima_pagina <= total_paginas:
+            # Busca de uma vez as páginas que faltam para completar a meta
+            faltantes = documentos_por_tipo - len(documentos_tipo)
+            ultima_pagina = min(total_paginas, proxima_pagina + (faltantes + tam_pagina - 1) // tam_pagina - 1)
+            if ranking:
+                ultima_pagina = min(ultima_pagina, proxima_pagina + PNCP_MAX_CONCORRENCIA - 1)
+            paginas = list(range(proxima_pagina, ultima_pagina + 1))
+            
+            respostas = await asyncio.gather(
+                *(self._buscar_pagina(semaforo, params_pagina(pagina)) for pagina in paginas),
+                return_exceptions=True
+            )
+            if ranking:
+                ranking.registrar_busca(len(paginas))
+            
+            for pagina, resposta in zip(paginas, respostas):
+                if isinstance(resposta, Exception):
+                    logger.error(f"Erro na busca para {tipo}, página {pagina}: {resposta}")
+                    return documentos_tipo
+                
+                resultados = resposta.get("items", [])
+                if not resultados:
+                    logger.info(f"  Página {pagina} retornou vazia. Parando busca para {tipo}")
+                    return documentos_tipo
+                
+                antes = len(documentos_tipo)
+                self._processar_pagina(resultados, tipo, pagina, documentos_tipo, documentos_por_tipo)
+                emitir("pncp_paginas", f"Página PNCP {pagina}/{total_paginas} ({tipo})",
+                       atual=pagina, total=total_paginas, tipo_documento=tipo)
+                if ranking:
+                    await ranking.adicionar(documentos_tipo[antes:])
+                    if ranking.encerrado:
+                        logger.info(f"  Busca para {tipo} encerrada na página {pagina} (top-k estável)")
+                        return documentos_tipo
+                
+                if len(documentos_tipo) >= documentos_por_tipo:
+                    break
+                if len(resultados) < tam_pagina:
+                    logger.info(f"  Página {pagina} retornou menos que {tam_pagina} resultados. Fim da busca para {tipo}")
+                    return documentos_tipo
+            
+            proxima_pagina = ultima_pagina + 1
+        
+        return documentos_tipo
+    
+    async def search_documents(self, palavras: str, tipos_documento: List[str] = None, 
+                               max_documentos: int = 300, tam_pagina: int = 10,
+                               ufs: List[str] = None, esferas: List[str] = None, 
+                               modalidades: List[str] = None, ordenacao: str = "-data",
+                               ranking: Optional[RankingPorPaginas] = None) -> List[DocumentoResultado]:
+        """
+        Busca documentos na API do PNCP com paginação concorrente (sem baixar arquivos)
+        
+        Os tipos de documento são buscados em paralelo e, dentro de cada tipo, as
+        páginas são distribuídas em um pool HTTP keep-alive compartilhado, limitado
+        por PNCP_MAX_CONCORRENCIA requisições simultâneas. O resultado mantém a
+        ordem da busca sequencial: tipos na ordem informada e páginas em ordem.
         
         Args:
             palavras: Termos de busca
@@ -159,6 +341,7 @@ class PNCPSearcher:
             esferas: Lista de esferas ['federal', 'estadual', 'municipal', 'distrital'] ou ['F', 'E', 'M', 'D']
             modalidades: Lista de modalidades ['pregao_eletronico', 'concorrencia_eletronica', etc.] ou códigos ['6', '4', etc.]
             ordenacao: Critério de ordenação ('-data' para mais recente, 'relevancia' para relevância)
+            ranking: Ranking incremental alimentado página a página (permite encerrar a busca cedo)
         """
         if tipos_documento is None:
             tipos_documento = ['ata', 'contrato']
@@ -172,121 +355,100 @@ class PNCPSearcher:
             tipos_documento = ['ata', 'contrato']
         
         logger.info(f"🎯 Tipos de documento a buscar: {tipos_documento}")
+        logger.info(f"  📅 Ordenação: {ordenacao} (mais recente primeiro)" if ordenacao == "-data" else f"  📊 Ordenação: {ordenacao}")
         
         # Valida parâmetros
         self._validar_parametros(ufs, esferas, modalidades)
         
-        todos_documentos = []
+        # Log dos filtros aplicados
+        filtros_log = []
+        if ufs:
+            filtros_log.append(f"UFs: {ufs}")
+        if esferas:
+            filtros_log.append(f"Esferas: {esferas}")
+        if modalidades:
+            filtros_log.append(f"Modalidades: {modalidades}")
+        
+        if filtros_log:
+            logger.info(f"  🔧 Filtros aplicados: {' | '.join(filtros_log)}")
+        
         documentos_por_tipo = max_documentos // len(tipos_documento)  # Divide igualmente entre tipos
         
-        for tipo in tipos_documento:
-            logger.info(f"🔎 Buscando por '{palavras}' (tipo: {tipo}) - Meta: {documentos_por_tipo} documentos")
-            logger.info(f"  📅 Ordenação: {ordenacao} (mais recente primeiro)" if ordenacao == "-data" else f"  📊 Ordenação: {ordenacao}")
-            
-            # Log dos filtros aplicados
-            filtros_log = []
-            if ufs:
-                filtros_log.append(f"UFs: {ufs}")
-            if esferas:
-                filtros_log.append(f"Esferas: {esferas}")
-            if modalidades:
-                filtros_log.append(f"Modalidades: {modalidades}")
-            
-            if filtros_log:
-                logger.info(f"  🔧 Filtros aplicados: {' | '.join(filtros_log)}")
-            
-            documentos_tipo = []
-            pagina = 1
-            total_paginas_estimado = None
-            
-            while len(documentos_tipo) < documentos_por_tipo:
-                params = {
-                    "q": palavras,
-                    "tipos_documento": tipo,
-                    "ordenacao": ordenacao,
-                    "pagina": str(pagina),
-                    "tam_pagina": str(tam_pagina),
-                    "status": "vigente"
-                }
-                
-                # Adiciona filtros opcionais - CORREÇÃO AQUI
-                if ufs:
-                    params["ufs"] = self._processar_ufs(ufs)  # Mudança: usar pipe ao invés de vírgula
-                
-                if esferas:
-                    params["esferas"] = self._processar_esferas(esferas)
-                
-                if modalidades:
-                    params["modalidades"] = self._processar_modalidades(modalidades)
-                
-                # Debug: mostra parâmetros da requisição
-                logger.debug(f"  🔧 Parâmetros da requisição: {params}")
-                
-                try:
-                    logger.info(f"  📄 Buscando página {pagina}...")
-                    response = requests.get(self.base_url, params=params, timeout=30)
-                    response.raise_for_status()
-                    
-                    dados = response.json()
-                    resultados = dados.get("items", [])
-                    total_resultados = dados.get("total", 0)
-                    
-                    # Debug: mostra tipos de documentos retornados
-                    if resultados and pagina == 1:  # Só na primeira página para não poluir o log
-                        tipos_encontrados = set()
-                        for doc in resultados[:5]:  # Apenas os primeiros 5 para debug
-                            doc_type = doc.get('document_type', 'N/D')
-                            tipos_encontrados.add(doc_type)
-                        logger.info(f"  🔍 Tipos de documentos retornados pela API: {list(tipos_encontrados)}")
-                    
-                    # Calcula total de páginas na primeira chamada
-                    if total_paginas_estimado is None:
-                        total_paginas_estimado = (total_resultados + tam_pagina - 1) // tam_pagina
-                        logger.info(f"  Total de resultados disponíveis: {total_resultados} (≈{total_paginas_estimado} páginas)")
-                    
-                    if not resultados:
-                        logger.info(f"  Página {pagina} retornou vazia. Parando busca para {tipo}")
-                        break
-                    
-                    logger.info(f"  Página {pagina}: {len(resultados)} documentos encontrados")
-                    
-                    # Processa documentos da página atual
-                    documentos_processados = 0
-                    documentos_aceitos = 0
-                    
-                    for doc in resultados:
-                        if len(documentos_tipo) >= documentos_por_tipo:
-                            break
-                        
-                        documentos_processados += 1
-                        documento = self._parse_document(doc, tipo)
-                        if documento:
-                            documentos_tipo.append(documento)
-                            documentos_aceitos += 1
-                    
-                    logger.info(f"  Processados: {documentos_processados} | Aceitos: {documentos_aceitos} | Filtrados: {documentos_processados - documentos_aceitos}")
-                    
-                    # Verifica se deve continuar
-                    if len(resultados) < tam_pagina:
-                        logger.info(f"  Página {pagina} retornou menos que {tam_pagina} resultados. Fim da busca para {tipo}")
-                        break
-                    
-                    pagina += 1
-                    
-                    # Pequena pausa entre requisições para não sobrecarregar a API
-                    import time
-                    time.sleep(0.1)
-                        
-                except requests.RequestException as e:
-                    logger.error(f"Erro na busca para {tipo}, página {pagina}: {e}")
-                    break
-            
+        if self.modo == "local":
+            documentos_locais = await self._buscar_local(
+                palavras, tipos_documento, documentos_por_tipo, ufs, esferas, modalidades, ordenacao
+            )
+            if len(documentos_locais) >= min(max_documentos, PNCP_LOCAL_MIN_RESULTADOS):
+                logger.info(f"🗄️ {len(documentos_locais)} documentos servidos pelo espelho local")
+                return documentos_locais
+            logger.info(f"🗄️ Espelho local retornou {len(documentos_locais)} documentos. Consultando a API do PNCP...")
+        
+        semaforo = asyncio.Semaphore(PNCP_MAX_CONCORRENCIA)
+        
+        async with etapa("pesquisa_pncp", f"Pesquisando '{palavras}' no PNCP"):
+            documentos_por_tipo_lista = await asyncio.gather(*(
+                self._buscar_tipo(semaforo, palavras, tipo, documentos_por_tipo, tam_pagina,
+                                  ufs, esferas, modalidades, ordenacao, ranking)
+                for tipo in tipos_documento
+            ))
+        
+        todos_documentos = []
+        for tipo, documentos_tipo in zip(tipos_documento, documentos_por_tipo_lista):
             logger.info(f"✅ Coletados {len(documentos_tipo)} documentos para {tipo}")
             todos_documentos.extend(documentos_tipo)
         
         logger.info(f"🎯 Total de documentos coletados: {len(todos_documentos)}")
+        
+        if PNCP_ESPELHAR_BUSCAS:
+            await self._espelhar(todos_documentos)
+        
         return todos_documentos
     
+    async def _espelhar(self, documentos: List[DocumentoResultado]):
+        """Grava no espelho local os documentos obtidos da API (falhas não interrompem a busca)"""
+        try:
+            await pncp_corpus_services.salvar_documentos(documentos)
+        except Exception as e:
+            logger.warning(f"Não foi possível atualizar o espelho local do PNCP: {e}")
+    
+    async def _buscar_local(self, palavras: str, tipos_documento: List[str], documentos_por_tipo: int,
+                            ufs: List[str] = None, esferas: List[str] = None,
+                            modalidades: List[str] = None, ordenacao: str = "-data") -> List[DocumentoResultado]:
+        """Busca no espelho local do PNCP com os mesmos filtros da API"""
+        codigos_ufs = self._processar_ufs(ufs).split('|') if ufs else None
+        codigos_esferas = self._processar_esferas(esferas).split('|') if esferas else None
+        codigos_modalidades = self._processar_modalidades(modalidades).split('|') if modalidades else None
+        
+        try:
+            linhas_por_tipo = await asyncio.gather(*(
+                pncp_corpus_services.buscar_documentos_locais(
+                    palavras, tipo.lower(), documentos_por_tipo,
+                    codigos_ufs, codigos_esferas, codigos_modalidades, ordenacao
+                )
+                for tipo in tipos_documento
+            ))
+        except Exception as e:
+            logger.warning(f"Espelho local indisponível: {e}")
+            return []
+        
+        return [self._documento_do_espelho(linha) for linhas in linhas_por_tipo for linha in linhas]
+    
+    @staticmethod
+    def _documento_do_espelho(linha) -> DocumentoResultado:
+        """Converte uma linha do espelho local (DocumentoPNCP) em DocumentoResultado"""
+        return DocumentoResultado(
+            orgao=linha.orgao,
+            objeto=linha.objeto,
+            tipo=linha.tipo,
+            url_visualizacao=linha.url_visualizacao,
+            url_download=linha.url_download,
+            chave=linha.chave,
+            uf=linha.uf,
+            esfera=linha.esfera,
+            modalidade=linha.modalidade,
+            data_publicacao=linha.data_publicacao
+        )
+    
     
     
     
@@ -406,12 +568,28 @@ class PNCPSearcher:
                 objeto=objeto,
                 tipo=tipo_doc_api,
                 url_visualizacao=url_visualizacao,
-                url_download=url_download
+                url_download=url_download,
+                chave=item_url_relativo or url_download,
+                uf=doc.get('uf'),
+                esfera=doc.get('esfera_id'),
+                modalidade=str(doc['modalidade_licitacao_id']) if doc.get('modalidade_licitacao_id') else None,
+                data_publicacao=self._parse_data(doc.get('data_publicacao_pncp') or doc.get('data_atualizacao_pncp'))
             )
         except Exception as e:
             logger.error(f"Erro ao processar documento: {e}")
             return None
     
+    @staticmethod
+    def _parse_data(valor) -> Optional[datetime]:
+        """Converte as datas ISO da API (com ou sem horário/fuso) para datetime"""
+        if not valor:
+            return None
+        try:
+            data = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        return data if data.tzinfo else data.replace(tzinfo=FUSO_PNCP)
+    
     def _build_download_url(self, doc: Dict, tipo: str) -> Optional[str]:
         """Constrói a URL de download do documento"""
         orgao_cnpj = doc.get('orgao_cnpj')
@@ -432,21 +610,134 @@ class PNCPSearcher:
         
         return None
     
-    def find_similar_documents_by_object(self, documentos: List[DocumentoResultado], 
+    def _usar_indice(self) -> bool:
+        """
+        Indica se o ranking deve usar o índice vetorial em disco: só com o
+        modelo já carregado e igual (nome e dimensão) ao usado na construção
+        """
+        if self.ranking != "indice" or not indice_vetorial.disponivel:
+            return False
+        if not model_registry.pronto:
+            model_registry.carregar_em_segundo_plano()
+            return False
+        return indice_vetorial.compativel(model_registry.model_name, model_registry.dimensao)
+    
+    async def _rankear_pelo_indice(self, texto_similaridade: str, max_similares: int,
+                                   ufs: List[str] = None, esferas: List[str] = None,
+                                   modalidades: List[str] = None) -> List[Tuple[DocumentoResultado, float]]:
+        """Ranking sobre todo o corpus acumulado usando o índice vetorial memory-mapped"""
+        embedding_busca = (await executar_cpu(self.model.encode, [texto_similaridade]))[0]
+        resultados = await executar_cpu(
+            indice_vetorial.buscar,
+            embedding_busca, max_similares,
+            ufs=self._processar_ufs(ufs).split('|') if ufs else None,
+            esferas=self._processar_esferas(esferas).split('|') if esferas else None,
+            modalidades=self._processar_modalidades(modalidades).split('|') if modalidades else None
+        )
+        linhas = await pncp_corpus_services.carregar_documentos([id_doc for id_doc, _ in resultados])
+        
+        resultados_ordenados = []
+        for id_doc, similaridade in resultados:
+            if id_doc in linhas:
+                documento = self._documento_do_espelho(linhas[id_doc])
+                documento.similaridade = similaridade
+                resultados_ordenados.append((documento, similaridade))
+        
+        logger.info(f"📚 Top {len(resultados_ordenados)} documentos do índice vetorial para '{texto_similaridade}':")
+        for i, (doc, sim) in enumerate(resultados_ordenados, 1):
+            logger.info(f"  {i}. {doc.orgao} - {doc.objeto[:60]}... (Similaridade: {sim:.4f})")
+        
+        return resultados_ordenados
+    
+    @staticmethod
+    def _ordenar_por_similaridade(documentos: List[DocumentoResultado], embedding_busca,
+                                  embeddings_objetos) -> List[Tuple[DocumentoResultado, float]]:
+        """Similaridade de cosseno entre a busca e os objetos, em ordem decrescente"""
+        similaridades = similaridade_cosseno(embedding_busca, embeddings_objetos).tolist()
+        return sorted(zip(documentos, similaridades), key=lambda item: item[1], reverse=True)
+    
+    def _modelo_disponivel(self) -> bool:
+        """Indica se o modelo de embedding pode ser usado sem esperar pela carga"""
+        return self.model is not None or model_registry.pronto
+    
+    async def _rankear_hibrido(self, documentos: List[DocumentoResultado], objetos_texto: List[str],
+                               texto_similaridade: str) -> List[Tuple[DocumentoResultado, float]]:
+        """BM25 em todos os objetos, embeddings só na shortlist lexical e fusão por RRF"""
+        pontuacoes_lexicas = await executar_cpu(pontuar_bm25, texto_similaridade, objetos_texto)
+        ordem_lexica = np.argsort(-pontuacoes_lexicas, kind="stable")
+        shortlist = ordem_lexica[:RANKING_HIBRIDO_SHORTLIST]
+        
+        if not self._modelo_disponivel():
+            logger.info("🧊 Modelo de embedding ainda não carregado: usando apenas o ranking lexical (BM25)")
+            model_registry.carregar_em_segundo_plano()
+            return [(documentos[i], float(pontuacoes_lexicas[i])) for i in ordem_lexica]
+        
+        self._load_model()
+        textos_shortlist = [objetos_texto[i] for i in shortlist]
+        embeddings_shortlist = await embedding_cache.encode(self.model, self._model_name(), textos_shortlist)
+        embedding_busca = await executar_cpu(self.model.encode, [texto_similaridade])
+        ordenados_densos = await executar_cpu(
+            self._ordenar_por_similaridade, list(shortlist), embedding_busca, embeddings_shortlist
+        )
+        for indice, similaridade in ordenados_densos:
+            documentos[indice].similaridade = similaridade
+        
+        logger.info(f"🔀 Ranking híbrido: {len(shortlist)} de {len(objetos_texto)} objetos enviados ao modelo de embedding")
+        fundidos = fundir_rrf([shortlist, [indice for indice, _ in ordenados_densos]])
+        return [(documentos[indice], pontuacao) for indice, pontuacao in fundidos]
+    
+    async def _selecionar_diversos(self, candidatos: List[Tuple[DocumentoResultado, float]],
+                                   orcamento: int) -> List[Tuple[DocumentoResultado, float]]:
+        """
+        Escolhe até 'orcamento' candidatos por MMR sobre os embeddings dos objetos,
+        evitando quase duplicatas e repetição de órgãos
+        """
+        relevancias = np.array([pontuacao for _, pontuacao in candidatos], dtype=np.float64)
+        grupos = [(doc.orgao or "").strip().lower() for doc, _ in candidatos]
+        
+        embeddings = None
+        if self._modelo_disponivel():
+            self._load_model()
+            embeddings = await embedding_cache.encode(
+                self.model, self._model_name(), [(doc.objeto or "").strip() for doc, _ in candidatos]
+            )
+        
+        indices = await executar_cpu(selecionar_mmr, relevancias, embeddings, orcamento, grupos)
+        selecionados = [candidatos[i] for i in indices]
+        
+        orgaos = {grupos[i] for i in indices}
+        logger.info(f"🎯 Seleção diversa: {len(selecionados)} de {len(candidatos)} candidatos, {len(orgaos)} órgãos distintos")
+        return selecionados
+    
+    async def find_similar_documents_by_object(self, documentos: List[DocumentoResultado], 
                                        texto_similaridade: str, 
-                                       max_similares: int = 10) -> List[Tuple[DocumentoResultado, float]]:
+                                       max_similares: int = 10,
+                                       ufs: List[str] = None, esferas: List[str] = None,
+                                       modalidades: List[str] = None) -> List[Tuple[DocumentoResultado, float]]:
         """
         Encontra documentos mais similares usando apenas o campo 'objeto' dos documentos
         
+        Com RANKING_BACKEND='indice' (e índice disponível), o ranking é feito sobre
+        todo o corpus acumulado no índice vetorial, filtrado por UF/esfera/modalidade,
+        em vez de apenas sobre 'documentos'.
+        
+        Com RANKING_HIBRIDO, os documentos são pontuados por BM25 e apenas a
+        shortlist lexical passa pelo modelo de embedding; os dois rankings são
+        fundidos por RRF. Com o modelo ainda frio, vale só o ranking lexical.
+        
         Args:
             documentos: Lista de documentos para analisar
             texto_similaridade: Texto para buscar similaridade
             max_similares: Número máximo de documentos similares a retornar
+            ufs, esferas, modalidades: Filtros aplicados no backend de índice
         
         Returns:
             Lista de tuplas (documento, similaridade) ordenada por similaridade
         """
-        self._load_model()
+        if self._usar_indice():
+            if self.model is None:
+                await asyncio.to_thread(self._load_model)
+            return await self._rankear_pelo_indice(texto_similaridade, max_similares, ufs, esferas, modalidades)
         
         # Filtra documentos que têm objeto válido
         documentos_validos = []
@@ -463,19 +754,20 @@ class PNCPSearcher:
         
         logger.info(f"🔍 Analisando similaridade de {len(documentos_validos)} documentos usando campo 'objeto'...")
         
-        # Calcula embeddings
-        embeddings_objetos = self.model.encode(objetos_texto)
-        embedding_busca = self.model.encode([texto_similaridade])
-        
-        # Calcula similaridades
-        similaridades = cos_sim(torch.tensor(embedding_busca), torch.tensor(embeddings_objetos))[0].tolist()
-        
-        # Ordena por similaridade
-        resultados_ordenados = sorted(
-            zip(documentos_validos, similaridades), 
-            key=lambda item: item[1], 
-            reverse=True
-        )
+        if RANKING_HIBRIDO:
+            resultados_ordenados = await self._rankear_hibrido(documentos_validos, objetos_texto, texto_similaridade)
+        else:
+            if self.model is None:
+                await asyncio.to_thread(self._load_model)
+            
+            # Calcula embeddings (objetos já vistos vêm do cache)
+            embeddings_objetos = await embedding_cache.encode(self.model, self._model_name(), objetos_texto)
+            embedding_busca = await executar_cpu(self.model.encode, [texto_similaridade])
+            
+            # Calcula similaridades e ordena (no executor de CPU)
+            resultados_ordenados = await executar_cpu(
+                self._ordenar_por_similaridade, documentos_validos, embedding_busca, embeddings_objetos
+            )
         
         # Log dos resultados
         logger.info(f"📊 Top {min(max_similares, len(resultados_ordenados))} documentos mais similares a '{texto_similaridade}':")
@@ -484,37 +776,32 @@ class PNCPSearcher:
         
         return resultados_ordenados[:max_similares]
     
-    def download_document(self, documento: DocumentoResultado) -> bool:
+    async def download_document(self, documento: DocumentoResultado) -> bool:
         """
-        Baixa um documento individual
+        Obtém um documento individual pelo armazenamento endereçado por conteúdo
+        (só baixa se a URL ainda não estiver armazenada ou tiver mudado)
         
         Returns:
-            bool: True se o download foi bem-sucedido
+            bool: True se o documento está disponível localmente
         """
         if not documento.url_download:
             logger.warning(f"URL de download não disponível para {documento.objeto}")
             return False
         
         try:
-            logger.info(f"📥 Baixando: {documento.objeto[:50]}...")
+            logger.info(f"📥 Obtendo: {documento.objeto[:50]}...")
             
-            response = requests.get(documento.url_download, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            # Determina o nome do arquivo
-            filename = self._get_filename_from_response(response, documento)
-            filepath = os.path.join(self.download_dir, filename)
-            
-            # Salva o arquivo
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            arquivo = await document_store.obter(
+                documento.url_download,
+                lambda response: self._get_filename_from_response(response, documento)
+            )
             
-            documento.filepath = filepath
-            logger.info(f"✅ Arquivo salvo: {filename}")
+            documento.filepath = arquivo.caminho
+            documento.sha256 = arquivo.sha256
+            logger.info(f"✅ Arquivo disponível: {arquivo.nome_arquivo} ({arquivo.sha256[:12]})")
             return True
             
-        except requests.RequestException as e:
+        except (httpx.HTTPError, CircuitoAbertoError, ErroTransitorioPNCP) as e:
             logger.error(f"❌ Erro ao baixar {documento.objeto}: {e}")
             return False
         except Exception as e:
@@ -549,8 +836,8 @@ class PNCPSearcher:
         
         return filename
     
-    def download_similar_documents(self, documentos_similares: List[Tuple[DocumentoResultado, float]], 
-                                 max_workers: int = 3) -> List[DocumentoResultado]:
+    async def download_similar_documents(self, documentos_similares: List[Tuple[DocumentoResultado, float]], 
+                                         max_workers: int = 3) -> List[DocumentoResultado]:
         """
         Baixa apenas os documentos similares selecionados
         
@@ -558,25 +845,24 @@ class PNCPSearcher:
             documentos_similares: Lista de tuplas (documento, similaridade)
             max_workers: Número máximo de downloads simultâneos
         """
-        documentos_baixados = []
         documentos_para_baixar = [doc for doc, _ in documentos_similares if doc.url_download]
         
         logger.info(f"📥 Baixando {len(documentos_para_baixar)} documentos similares...")
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submete todos os downloads
-            future_to_doc = {executor.submit(self.download_document, doc): doc 
-                           for doc in documentos_para_baixar}
-            
-            # Coleta os resultados
-            for future in as_completed(future_to_doc):
-                documento = future_to_doc[future]
-                try:
-                    success = future.result()
-                    if success:
-                        documentos_baixados.append(documento)
-                except Exception as e:
-                    logger.error(f"Erro no download paralelo: {e}")
+        semaforo = asyncio.Semaphore(max_workers)
+        
+        async def baixar(documento: DocumentoResultado) -> bool:
+            async with semaforo:
+                return await self.download_document(documento)
+        
+        resultados = await asyncio.gather(*(baixar(doc) for doc in documentos_para_baixar), return_exceptions=True)
+        
+        documentos_baixados = []
+        for documento, resultado in zip(documentos_para_baixar, resultados):
+            if isinstance(resultado, Exception):
+                logger.error(f"Erro no download paralelo: {resultado}")
+            elif resultado:
+                documentos_baixados.append(documento)
         
         logger.info(f"✅ {len(documentos_baixados)} documentos baixados com sucesso!")
         return documentos_baixados
@@ -627,7 +913,7 @@ class PNCPSearcher:
             dest_path = os.path.join(self.similar_files_dir, f"ATA_{i}.pdf")
             
             try:
-                shutil.copy2(documento.filepath, dest_path)
+                document_store.materializar(documento.filepath, dest_path)
                 logger.info(f"  {i}. ATA copiada: {documento.objeto[:40]}... -> ATA_{i}.pdf (Similaridade: {similaridade:.4f})")
                 logger.info(f"     📄 Órgão: {documento.orgao}")
                 if documento.url_download:
@@ -645,7 +931,7 @@ class PNCPSearcher:
             dest_path = os.path.join(self.similar_files_dir, f"CONTRATOS_{i}.pdf")
             
             try:
-                shutil.copy2(documento.filepath, dest_path)
+                document_store.materializar(documento.filepath, dest_path)
                 logger.info(f"  {i}. CONTRATO copiado: {documento.objeto[:40]}... -> CONTRATOS_{i}.pdf (Similaridade: {similaridade:.4f})")
                 logger.info(f"     📄 Órgão: {documento.orgao}")
                 if documento.url_download:
@@ -666,7 +952,10 @@ class PNCPSearcher:
         logger.info(f"   📋 Total de documentos: {total_atas + total_contratos}")
     
     def cleanup_downloads(self):
-        """Remove todos os arquivos baixados para limpeza"""
+        """
+        Remove o diretório temporário de downloads. Os documentos em si ficam no
+        armazenamento endereçado por conteúdo, que é persistente e tem quota própria.
+        """
         if os.path.exists(self.download_dir):
             try:
                 shutil.rmtree(self.download_dir)
@@ -674,11 +963,13 @@ class PNCPSearcher:
             except Exception as e:
                 logger.error(f"❌ Erro ao remover diretório {self.download_dir}: {e}")
     
-    def pesquisar_mercado(self, palavras_busca: str, texto_similaridade: str, 
+    async def pesquisar_mercado(self, palavras_busca: str, texto_similaridade: str, 
                          tipos_documento: List[str] = None, max_documentos: int = 300,
                          max_similares: int = 10, limpar_downloads: bool = True,
                          ufs: List[str] = None, esferas: List[str] = None, 
-                         modalidades: List[str] = None, ordenacao: str = "-data") -> List[Tuple[DocumentoResultado, float]]:
+                         modalidades: List[str] = None, ordenacao: str = "-data",
+                         orcamento_documentos: Optional[int] = None,
+                         baixar: bool = True) -> List[Tuple[DocumentoResultado, float]]:
         """
         Método principal que executa todo o processo de pesquisa de mercado otimizado
         
@@ -698,46 +989,83 @@ class PNCPSearcher:
             esferas: Lista de esferas ['federal', 'estadual', etc.] ou ['F', 'E', etc.]
             modalidades: Lista de modalidades ['pregao_eletronico', etc.] ou códigos ['6', etc.]
             ordenacao: Critério de ordenação ('-data' para mais recente, 'relevancia' para relevância)
+            orcamento_documentos: Máximo de documentos escolhidos pela seleção diversa (MMR)
+                                  entre os candidatos; padrão: max_similares
+            baixar: Se False, retorna os documentos selecionados sem baixá-los (o download
+                    fica a cargo do chamador, p.ex. o pipeline download -> upload da PDP)
         
         Returns:
             Lista com os documentos mais similares e suas pontuações
         """
         try:
             # 1. Busca documentos na API (SEM BAIXAR) com filtros
+            #    (dispensada quando o ranking é feito sobre o índice vetorial do corpus)
             logger.info("🚀 Iniciando pesquisa de mercado otimizada...")
-            documentos = self.search_documents(
-                palavras_busca, tipos_documento, max_documentos, 
-                ufs=ufs, esferas=esferas, modalidades=modalidades, ordenacao=ordenacao
-            )
-            
-            if not documentos:
-                logger.warning("Nenhum documento encontrado na busca")
-                return []
+            documentos = []
+            ranking = None
+            # Com a seleção diversa, o ranking devolve um conjunto maior de candidatos
+            max_candidatos = max_similares * SELECAO_POOL_FATOR if SELECAO_MMR else max_similares
+            if not self._usar_indice():
+                # Com o híbrido, a busca acompanha os candidatos do BM25 (sem o modelo) e o passo
+                # denso + RRF roda depois sobre o que foi buscado; sem ele, o top-k por embeddings
+                if RANKING_STREAMING and RANKING_HIBRIDO:
+                    ranking = ShortlistLexicaIncremental(texto_similaridade, max_candidatos)
+                elif RANKING_STREAMING and self._modelo_disponivel():
+                    self._load_model()
+                    ranking = RankingIncremental(self.model, self._model_name(), texto_similaridade, max_candidatos)
+                
+                documentos = await self.search_documents(
+                    palavras_busca, tipos_documento, max_documentos, 
+                    ufs=ufs, esferas=esferas, modalidades=modalidades, ordenacao=ordenacao,
+                    ranking=ranking
+                )
+                
+                if not documentos:
+                    logger.warning("Nenhum documento encontrado na busca")
+                    return []
             
             # 2. Análise de similaridade usando campo 'objeto'
+            #    (já feita página a página quando o ranking incremental é por embeddings)
             logger.info("🔍 Analisando similaridade usando campo 'objeto'...")
-            documentos_similares = self.find_similar_documents_by_object(
-                documentos, texto_similaridade, max_similares
-            )
+            async with etapa("ranking", f"Ranqueando {len(documentos)} documentos por similaridade"):
+                if ranking and ranking.paginas_buscadas > 0:
+                    telemetria_ranking.registrar(ranking)
+                    self.telemetria_ranking = ranking.telemetria()
+                if ranking and ranking.paginas_buscadas > 0 and ranking.ranking_final:
+                    documentos_similares = ranking.resultados()
+                else:
+                    documentos_similares = await self.find_similar_documents_by_object(
+                        documentos, texto_similaridade, max_candidatos,
+                        ufs=ufs, esferas=esferas, modalidades=modalidades
+                    )
             
             if not documentos_similares:
                 logger.warning("Nenhum documento similar encontrado")
                 return []
             
+            if SELECAO_MMR:
+                documentos_similares = await self._selecionar_diversos(
+                    documentos_similares, orcamento_documentos or max_similares
+                )
+            
+            if not baixar:
+                logger.info("✅ Pesquisa de mercado concluída (download a cargo do chamador)")
+                return documentos_similares
+            
             # 3. Baixa APENAS os documentos similares
-            documentos_baixados = self.download_similar_documents(documentos_similares)
+            documentos_baixados = await self.download_similar_documents(documentos_similares)
             
             if not documentos_baixados:
                 logger.warning("Nenhum documento foi baixado com sucesso")
                 return []
             
             # 4. Copia documentos similares
-            self.copy_similar_documents(documentos_similares)
+            await asyncio.to_thread(self.copy_similar_documents, documentos_similares)
             
             # 5. Limpeza (opcional)
             if limpar_downloads:
                 logger.info("🧹 Limpando arquivos temporários...")
-                self.cleanup_downloads()
+                await asyncio.to_thread(self.cleanup_downloads)
             
             logger.info("✅ Pesquisa de mercado concluída!")
             return documentos_similares
@@ -1,7 +1,11 @@
 from app.services.pdp_search_services import PNCPSearcher
-from app.services.prompts.pdp_prompts import prompt_sistema
+from app.services.workspace import JobWorkspace
+from app.services.pdp_pipeline import preparar_documentos_ia
+from app.services.prompts.pdp_prompts import prompt_sistema, prompt_adaptacao_itens
 from app.schemas.pdp_schemas import PpModel, PDPCreate, PDPRead, PDPUpdate
-from app.client import get_genai_client
+from app.services.llm_gateway import llm_gateway
+from app.services.progresso import emitir
+from app.config import PDP_ORCAMENTO_DOCUMENTOS
 from app.dependencies import RemoteUser
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text, update, delete
@@ -17,7 +21,9 @@ from fastapi import HTTPException
 from sqlalchemy.orm import selectinload
 
 import json 
-import os
+
+# Prefixo estático do prompt da PDP (igual em todas as gerações)
+instrucao_sistema_pdp = "\n---\n".join([prompt_sistema, prompt_adaptacao_itens])
 
 
 def parse_date_safely(date_value, fallback_date=None):
@@ -43,8 +49,13 @@ def parse_date_safely(date_value, fallback_date=None):
         return fallback_date
 
 async def create_pdp_service(pdp_in: PDPCreate, db: AsyncSession, current_user: RemoteUser, project_id: int) -> List[PDPRead]:
+    """
+    Gera os PDPs do projeto em três fases: leitura do contexto, pesquisa de
+    mercado e IA sem conexão com o banco, e uma transação curta que troca os
+    PDPs e as soluções antigos pelos novos.
+    """
     try:
-        # Verifica se o projeto existe
+        # 1. Leitura: verifica se o projeto existe
         result = await db.execute(
             select(Projeto).where(Projeto.id_projeto == project_id)
         )
@@ -57,32 +68,9 @@ async def create_pdp_service(pdp_in: PDPCreate, db: AsyncSession, current_user:
         if not contexto:
             raise ValueError("Dados do projeto não encontrados.")
         
-        # <<< CORREÇÃO 1: Limpar PDPs antigos para garantir que a nova análise substitua a anterior >>>
-        print(f"Limpando PDPs antigos para o projeto ID: {project_id}")
-        await db.execute(delete(PDP).where(PDP.id_projeto == project_id))
-        await db.flush() # Garante que a exclusão seja processada antes das inserções
-
-        # Realiza pesquisa de mercado...
-        searcher = PNCPSearcher()
-        palavras_busca = " ".join(pdp_in.palavras_chave) if pdp_in.palavras_chave else contexto.get('objeto_contratacao', 'contratação')
-        
-        resultados = searcher.pesquisar_mercado(
-            palavras_busca=palavras_busca,
-            texto_similaridade=pdp_in.descricao,
-            tipos_documento=['ata', 'contrato'],
-            max_documentos=1000,
-            max_similares=8,
-            ufs=pdp_in.ufs if pdp_in.ufs else None,
-            esferas=pdp_in.esferas if pdp_in.esferas else None,
-            modalidades=pdp_in.modalidades if pdp_in.modalidades else None
-        )
-        print(f"Encontrados {len(resultados)} documentos similares")
-
         # Monta o prompt para IA
         prompt_usuario = pdp_in.descricao
         prompt_final_completo = f"""
-        {prompt_sistema}
-        ---
         Contexto do Banco de Dados (JSON):
         {json.dumps(contexto, indent=2, ensure_ascii=False)}
         ---
@@ -96,9 +84,45 @@ async def create_pdp_service(pdp_in: PDPCreate, db: AsyncSession, current_user:
         - Modalidades: {pdp_in.modalidades}
         """
 
-        # Chama a IA
-        resposta_ia = await consulta_ia(prompt_final_completo)
-        print("Resposta da IA:", json.dumps(resposta_ia, indent=2, ensure_ascii=False))
+        # Encerra a transação de leitura: a conexão volta ao pool durante a pesquisa e a IA
+        await db.commit()
+
+        # 2. Pesquisa de mercado e consulta à IA num workspace exclusivo desta geração
+        async with JobWorkspace() as workspace:
+            searcher = PNCPSearcher(
+                download_dir=workspace.downloads_dir,
+                similar_files_dir=workspace.similares_dir
+            )
+            palavras_busca = " ".join(pdp_in.palavras_chave) if pdp_in.palavras_chave else contexto.get('objeto_contratacao', 'contratação')
+            
+            resultados = await searcher.pesquisar_mercado(
+                palavras_busca=palavras_busca,
+                texto_similaridade=pdp_in.descricao,
+                tipos_documento=['ata', 'contrato'],
+                max_documentos=1000,
+                max_similares=8,
+                orcamento_documentos=PDP_ORCAMENTO_DOCUMENTOS,
+                ufs=pdp_in.ufs if pdp_in.ufs else None,
+                esferas=pdp_in.esferas if pdp_in.esferas else None,
+                modalidades=pdp_in.modalidades if pdp_in.modalidades else None,
+                baixar=False
+            )
+            print(f"Encontrados {len(resultados)} documentos similares")
+
+            # Download -> validação -> extração dos itens (cacheada por documento) em pipeline
+            extracoes = await preparar_documentos_ia(
+                searcher, resultados, workspace.similares_dir, forcar_regeneracao=pdp_in.forcar_regeneracao
+            )
+
+            # Chama a IA só para adaptar os itens extraídos ao projeto
+            resposta_ia = await consulta_ia(prompt_final_completo, extracoes, pdp_in.forcar_regeneracao)
+            print("Resposta da IA:", json.dumps(resposta_ia, indent=2, ensure_ascii=False))
+
+        # 3. Gravação: PDPs antigos saem e os novos entram na mesma transação
+        emitir("gravacao", "Gravando os PDPs e as soluções identificadas")
+        print(f"Limpando PDPs antigos para o projeto ID: {project_id}")
+        await db.execute(delete(PDP).where(PDP.id_projeto == project_id))
+        await db.flush() # Garante que a exclusão seja processada antes das inserções
 
         pdps_criados = []
         
@@ -146,14 +170,12 @@ async def create_pdp_service(pdp_in: PDPCreate, db: AsyncSession, current_user:
         # <<< NOVA CORREÇÃO: Salvar soluções identificadas baseadas na análise da IA >>>
         await salvar_solucoes_identificadas(project_id, pdp_in, contexto, db, current_user)
 
-        await db.commit()
-        
-        pdps_response = []
         for pdp in pdps_criados:
             # Atualiza o objeto para garantir que todos os campos (como data_created) estejam populados
-            await db.refresh(pdp) 
-            pdp_read = PDPRead.from_orm(pdp)
-            pdps_response.append(pdp_read)
+            await db.refresh(pdp)
+        await db.commit()
+        
+        pdps_response = [PDPRead.from_orm(pdp) for pdp in pdps_criados]
         
         return pdps_response
         
@@ -268,60 +290,33 @@ async def buscar_dfd_por_id(project_id: int, db: AsyncSession) -> Optional[Dict[
         return None
 
 
-async def consulta_ia(prompt_final_completo):
+async def consulta_ia(prompt_final_completo, extracoes: List[Dict], forcar_regeneracao: bool = False):
     try:
-        client = get_genai_client()
         model = "gemini-2.0-flash"
-        
-        similares_dir = os.path.join("app", "temp", "docs", "similares")
-        pdf_files = [
-            f for f in os.listdir(similares_dir)
-            if f.lower().endswith(".pdf")
-        ]
 
-        if not pdf_files:
+        if not extracoes:
             raise ValueError("Não foi possível achar nenhum documento com as seleções feitas, por favor tente novamente.")
             
-        pdf_files = pdf_files[:5]
-
-        uploaded_files = []
-        for file_name in pdf_files:
-            file_path = os.path.join(similares_dir, file_name)
-            uploaded = client.files.upload(file=file_path)
-            uploaded_files.append(uploaded)
-
-        parts = []
-        for uploaded in uploaded_files:
-            parts.append(
-                types.Part.from_uri(
-                    file_uri=uploaded.uri,
-                    mime_type=uploaded.mime_type
-                )
-            )
-        parts.append(types.Part.from_text(text=prompt_final_completo))
+        extracoes = extracoes[:PDP_ORCAMENTO_DOCUMENTOS]
+
+        parts = [
+            types.Part.from_text(text=prompt_final_completo),
+            types.Part.from_text(text=f"""
+        Itens extraídos dos documentos de referência (JSON):
+        {json.dumps(extracoes, indent=2, ensure_ascii=False)}
+        """),
+        ]
         
         contents = [types.Content(role="user", parts=parts)]
-            
-        generate_content_config = types.GenerateContentConfig(
-            response_mime_type="application/json",
-            response_schema=list[PpModel],
-        )
         
         print("--- Aguardando resposta da API Gemini... ---")
         
-        response_chunks = []
-        for chunk in client.models.generate_content_stream(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        ):
-            response_chunks.append(chunk.text)
-            print(chunk.text)
-
-        full_response_json = "".join(response_chunks)
+        dados_formatados = await llm_gateway.gerar_json(
+            model, contents, schema=list[PpModel], system_instruction=instrucao_sistema_pdp,
+            artefato="pdp", forcar_regeneracao=forcar_regeneracao,
+        )
 
         print("\n--- Resposta da API Gemini (JSON Estruturado) ---")
-        dados_formatados = json.loads(full_response_json)
 
         return dados_formatados
 
@@ -352,7 +347,7 @@ async def consulta_ia(prompt_final_completo):
         }]
 
 
-async def consulta_ia_simples(projeto_id: int, db: AsyncSession) -> Dict[str, any]:
+async def consulta_ia_simples(projeto_id: int, db: AsyncSession, forcar_regeneracao: bool = False) -> Dict[str, any]:
     try:
         contexto_projeto = await buscar_dfd_por_id(projeto_id, db)
         if not contexto_projeto:
@@ -401,21 +396,12 @@ async def consulta_ia_simples(projeto_id: int, db: AsyncSession) -> Dict[str, an
         - Inclua alertas sobre pontos de atenção na contratação.
         """
 
-        client = get_genai_client()
         model = "gemini-2.0-flash"
-        generate_content_config = types.GenerateContentConfig(
-            response_mime_type="application/json"
-        )
-        contents = [types.Content(role="user", parts=[types.Part.from_text(text=prompt_simples)])]
         
-        response = client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=generate_content_config
+        resposta_json = await llm_gateway.gerar_json(
+            model, prompt_simples, artefato="pdp_analise", forcar_regeneracao=forcar_regeneracao,
         )
         
-        resposta_json = json.loads(response.text)
-        
         if isinstance(resposta_json, list):
             resposta_json = resposta_json[0] if resposta_json and isinstance(resposta_json[0], dict) else {}
 
@@ -1,9 +1,10 @@
-from app.client import get_genai_client
+from app.services.llm_gateway import llm_gateway
+from app.services.progresso import emitir
+from app.services.prompts.pgr_prompts import prompt_sistema, prompt_estrutura_riscos
 from app.dependencies import RemoteUser
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text, delete
 from typing import Optional, Dict, List
-from google.genai import types
 from datetime import datetime
 from app.models.projects_models import Projeto
 from app.models.pgr_models import PGR
@@ -12,13 +13,19 @@ from app.schemas.pgr_schemas import PGRCreate, PGRRead
 
 import json
 
+# Prefixo estático do prompt do PGR (igual em todas as gerações)
+instrucao_sistema_pgr = "\n".join([prompt_sistema, prompt_estrutura_riscos])
+
 
 async def create_pgr_service(pgr_in: PGRCreate, db: AsyncSession, current_user: RemoteUser, project_id: int) -> List[PGRRead]:
     """
-    Cria PGR baseado na análise de riscos das soluções identificadas
+    Cria PGR baseado na análise de riscos das soluções identificadas.
+
+    A análise da IA roda sem conexão com o banco: a leitura do contexto e a
+    troca dos PGRs antigos pelos novos ficam em transações curtas.
     """
     try:
-        # Verifica se o projeto existe
+        # 1. Leitura: verifica se o projeto existe
         result = await db.execute(
             select(Projeto).where(Projeto.id_projeto == project_id)
         )
@@ -31,11 +38,6 @@ async def create_pgr_service(pgr_in: PGRCreate, db: AsyncSession, current_user:
         if not contexto:
             raise ValueError("Dados do projeto não encontrados.")
         
-        # Limpar PGRs antigos para garantir que a nova análise substitua a anterior
-        print(f"Limpando PGRs antigos para o projeto ID: {project_id}")
-        await db.execute(delete(PGR).where(PGR.id_projeto == project_id))
-        await db.flush()
-
         # Busca soluções identificadas do projeto
         solucoes_todas = await buscar_solucoes_projeto(project_id, db)
         if not solucoes_todas:
@@ -50,10 +52,20 @@ async def create_pgr_service(pgr_in: PGRCreate, db: AsyncSession, current_user:
         if not solucoes_selecionadas:
             raise ValueError("Nenhuma das soluções selecionadas foi encontrada.")
 
-        # Análise de riscos usando IA
+        # Encerra a transação de leitura: a conexão volta ao pool durante a análise da IA
+        await db.commit()
+
+        # 2. Análise de riscos usando IA
+        emitir("contexto", f"Analisando os riscos de {len(solucoes_selecionadas)} soluções")
         analise_riscos = await analisar_riscos_ia(pgr_in, contexto, solucoes_selecionadas)
         print("Análise de riscos da IA:", json.dumps(analise_riscos, indent=2, ensure_ascii=False))
 
+        # 3. Gravação: PGRs antigos saem e os novos entram na mesma transação
+        emitir("gravacao", "Gravando os PGRs")
+        print(f"Limpando PGRs antigos para o projeto ID: {project_id}")
+        await db.execute(delete(PGR).where(PGR.id_projeto == project_id))
+        await db.flush()
+
         pgrs_criados = []
         
         # Cria PGR para cada solução selecionada com seus respectivos riscos
@@ -96,14 +108,12 @@ async def create_pgr_service(pgr_in: PGRCreate, db: AsyncSession, current_user:
             print(f"Nenhum PGR foi criado. Atualizando 'exist_pgr' para False no projeto ID: {project_id}")
             projeto.exist_pgr = False
 
+        for pgr in pgrs_criados:
+            await db.refresh(pgr)
         await db.commit()
         
         # Preparar resposta
-        pgrs_response = []
-        for pgr in pgrs_criados:
-            await db.refresh(pgr)
-            pgr_read = PGRRead.from_orm(pgr)
-            pgrs_response.append(pgr_read)
+        pgrs_response = [PGRRead.from_orm(pgr) for pgr in pgrs_criados]
         
         return pgrs_response
         
@@ -163,7 +173,6 @@ async def analisar_riscos_ia(pgr_in: PGRCreate, contexto: Dict, solucoes: List[S
     Analisa riscos das soluções usando IA
     """
     try:
-        client = get_genai_client()
         model = "gemini-2.5-flash"
         
         # Preparar dados das soluções para análise
@@ -197,9 +206,8 @@ async def analisar_riscos_ia(pgr_in: PGRCreate, contexto: Dict, solucoes: List[S
             if instrucoes_foco:
                 instrucoes_adicionais = f"\nFOCO DA ANÁLISE (solicitado pelo usuário):\n{instrucoes_foco}\n"
 
+        # As diretrizes e a estrutura de resposta vão como instrução de sistema (cacheada no Gemini)
         prompt_completo = f"""
-        Você é um especialista em gestão de riscos em contratações públicas. Analise as soluções identificadas para este projeto e identifique riscos detalhados para cada uma.
-
         CONTEXTO DO PROJETO:
         - Objeto: {contexto.get('objeto_contratacao', 'Não informado')}
         - Justificativa: {contexto.get('justificativa_necessidade', 'Não informada')}
@@ -211,82 +219,6 @@ async def analisar_riscos_ia(pgr_in: PGRCreate, contexto: Dict, solucoes: List[S
 
         SOLUÇÕES IDENTIFICADAS:
         {json.dumps(solucoes_dados, indent=2, ensure_ascii=False)}
-```
-
-        Para cada solução, identifique e analise os riscos seguindo esta estrutura JSON:
-        {{
-            "resumo_analise": "Resumo geral da análise de riscos para o projeto",
-            "metodologia_aplicada": "Metodologia de análise de riscos utilizada",
-            "riscos_por_solucao": [
-                {{
-                    "id_solucao": 1,
-                    "nome_solucao": "Nome da solução",
-                    "categoria_risco_principal": "Técnico/Operacional/Financeiro/Legal/Estratégico",
-                    "nivel_risco_geral": "Baixo/Médio/Alto/Crítico",
-                    "riscos_identificados": [
-                        {{
-                            "categoria": "Técnico/Operacional/Financeiro/Legal/Estratégico",
-                            "tipo_risco": "Nome específico do risco",
-                            "descricao": "Descrição detalhada do risco",
-                            "probabilidade": "Muito Baixa/Baixa/Média/Alta/Muito Alta",
-                            "impacto": "Muito Baixo/Baixo/Médio/Alto/Muito Alto",
-                            "nivel_risco": "Baixo/Médio/Alto/Crítico",
-                            "fase_projeto": "Planejamento/Licitação/Contratação/Execução/Encerramento",
-                            "causas_potenciais": ["Causa 1", "Causa 2"],
-                            "consequencias": ["Consequência 1", "Consequência 2"],
-                            "indicadores": ["Indicador 1", "Indicador 2"],
-                            "acoes_mitigacao": [
-                                {{
-                                    "acao": "Descrição da ação",
-                                    "responsavel": "Área/função responsável",
-                                    "prazo": "Prazo para implementação",
-                                    "custo_estimado": "Estimativa de custo",
-                                    "eficacia_estimada": "Baixa/Média/Alta"
-                                }}
-                            ],
-                            "plano_contingencia": {{
-                                "trigger": "Condição que ativa o plano",
-                                "acoes": ["Ação 1", "Ação 2"],
-                                "recursos_necessarios": ["Recurso 1", "Recurso 2"]
-                            }},
-                            "monitoramento": {{
-                                "frequencia": "Diária/Semanal/Mensal/Trimestral",
-                                "responsavel": "Área/função responsável",
-                                "metricas": ["Métrica 1", "Métrica 2"]
-                            }}
-                        }}
-                    ],
-                    "matriz_riscos": {{
-                        "riscos_criticos": ["Lista de riscos críticos"],
-                        "riscos_altos": ["Lista de riscos altos"],
-                        "riscos_medios": ["Lista de riscos médios"],
-                        "riscos_baixos": ["Lista de riscos baixos"]
-                    }},
-                    "recomendacoes_gerais": [
-                        "Recomendação específica para esta solução"
-                    ]
-                }}
-            ],
-            "analise_comparativa": {{
-                "solucao_menor_risco": "Nome da solução com menor risco geral",
-                "solucao_maior_risco": "Nome da solução com maior risco geral",
-                "fatores_decisao": ["Fator 1", "Fator 2"],
-                "recomendacao_final": "Recomendação sobre qual solução escolher"
-            }},
-            "plano_geral_riscos": {{
-                "estrutura_governanca": "Descrição da estrutura de governança de riscos",
-                "periodicidade_revisao": "Frequência de revisão do plano",
-                "criterios_escalacao": ["Critério 1", "Critério 2"],
-                "documentacao_necessaria": ["Documento 1", "Documento 2"]
-            }}
-        }}
-
-        IMPORTANTE:
-        - Identifique pelo menos 3-5 riscos por solução
-        - Seja específico sobre ações de mitigação
-        - Considere riscos típicos de contratações públicas
-        - Avalie tanto riscos internos quanto externos
-        - Inclua aspectos legais, técnicos, operacionais e financeiros
         """
 
         # Log do prompt completo para depuração
@@ -294,24 +226,16 @@ async def analisar_riscos_ia(pgr_in: PGRCreate, contexto: Dict, solucoes: List[S
         print(prompt_completo)
         print("------------------------------------------")
 
-        generate_content_config = types.GenerateContentConfig(
-            response_mime_type="application/json"
-        )
-        contents = [types.Content(role="user", parts=[types.Part.from_text(text=prompt_completo)])]
-        
-        response = client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=generate_content_config
+        resposta_json = await llm_gateway.gerar_json(
+            model, prompt_completo, system_instruction=instrucao_sistema_pgr,
+            artefato="pgr", forcar_regeneracao=pgr_in.forcar_regeneracao,
         )
 
-        # Log da resposta bruta da IA para depuração
-        print("--- RESPOSTA DA IA (TEXTO BRUTO) ---")
-        print(response.text)
+        # Log da resposta da IA para depuração
+        print("--- RESPOSTA DA IA ---")
+        print(json.dumps(resposta_json, indent=2, ensure_ascii=False))
         print("------------------------------------")
         
-        resposta_json = json.loads(response.text)
-        
         # Validar e enriquecer resposta
         resposta_json = validar_resposta_riscos(resposta_json, solucoes_dados)
         
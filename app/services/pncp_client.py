@@ -0,0 +1,291 @@
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager, AsyncExitStack
+from typing import Any, Dict, Optional
+
+import httpx
+from cachetools import LRUCache
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from app.client import get_pncp_http_client
+from app.config import (
+    PNCP_TAXA_REQUISICOES, PNCP_RAJADA, PNCP_MAX_CONCORRENCIA, PNCP_AIMD_MIN, PNCP_AIMD_MAX,
+    PNCP_RETENTATIVAS, PNCP_RETRY_BASE, PNCP_RETRY_MAX, PNCP_CIRCUITO_FALHAS,
+    PNCP_CIRCUITO_TEMPO_ABERTO, PNCP_ULTIMOS_RESULTADOS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ErroTransitorioPNCP(Exception):
+    """Resposta 429/5xx do PNCP (sobrecarga ou indisponibilidade momentânea)"""
+
+    def __init__(self, status_code: int, url: str):
+        super().__init__(f"PNCP respondeu {status_code} para {url}")
+        self.status_code = status_code
+
+
+class CircuitoAbertoError(Exception):
+    """O PNCP está indisponível e o circuit breaker está bloqueando novas chamadas"""
+
+
+class TokenBucket:
+    """Limite de taxa: 'taxa' requisições por segundo, com rajadas de até 'capacidade'"""
+
+    def __init__(self, taxa: float, capacidade: int):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = float(capacidade)
+        self.ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self):
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.taxa)
+
+
+class ControleAIMD:
+    """
+    Limite de requisições simultâneas com aumento aditivo e redução
+    multiplicativa: cada sucesso soma 1/limite (≈ +1 por janela) e cada
+    429/5xx multiplica o limite por 'fator' (no máximo uma vez por 'intervalo').
+    """
+
+    def __init__(self, inicial: int, minimo: int, maximo: int, fator: float = 0.5, intervalo: float = 1.0):
+        self.limite = float(max(minimo, min(inicial, maximo)))
+        self.minimo = minimo
+        self.maximo = maximo
+        self.fator = fator
+        self.intervalo = intervalo
+        self.em_uso = 0
+        self.reducoes = 0
+        self._ultima_reducao = 0.0
+        self._espera = deque()
+
+    async def adquirir(self):
+        while self.em_uso >= int(self.limite):
+            futuro = asyncio.get_running_loop().create_future()
+            self._espera.append(futuro)
+            await futuro
+        self.em_uso += 1
+
+    def liberar(self):
+        self.em_uso -= 1
+        self._acordar()
+
+    def _acordar(self):
+        while self._espera:
+            futuro = self._espera.popleft()
+            if not futuro.done():
+                futuro.set_result(None)
+
+    def sucesso(self):
+        limite_anterior = int(self.limite)
+        self.limite = min(self.maximo, self.limite + 1.0 / self.limite)
+        if int(self.limite) > limite_anterior:
+            self._acordar()
+
+    def sobrecarga(self):
+        agora = time.monotonic()
+        if agora - self._ultima_reducao >= self.intervalo:
+            self.limite = max(self.minimo, self.limite * self.fator)
+            self._ultima_reducao = agora
+            self.reducoes += 1
+            logger.warning(f"⚠️ PNCP sob pressão: concorrência reduzida para {int(self.limite)}")
+
+
+class CircuitBreaker:
+    """Abre após 'limiar' falhas seguidas; depois de 'tempo_aberto' libera uma chamada de teste"""
+
+    def __init__(self, limiar: int, tempo_aberto: float):
+        self.limiar = limiar
+        self.tempo_aberto = tempo_aberto
+        self.estado = "fechado"
+        self.falhas = 0
+        self.aberto_em = 0.0
+        self.aberturas = 0
+        self._sondando = False
+
+    def permitir(self) -> bool:
+        if self.estado == "aberto" and time.monotonic() - self.aberto_em >= self.tempo_aberto:
+            self.estado = "meio_aberto"
+        if self.estado == "fechado":
+            return True
+        if self.estado == "meio_aberto" and not self._sondando:
+            self._sondando = True
+            return True
+        return False
+
+    def sucesso(self):
+        self.estado = "fechado"
+        self.falhas = 0
+        self._sondando = False
+
+    def liberar_sonda(self):
+        """Chamada interrompida sem resultado (p.ex. cancelada): permite outra chamada de teste"""
+        self._sondando = False
+
+    def falha(self):
+        self.falhas += 1
+        self._sondando = False
+        if self.estado == "meio_aberto" or self.falhas >= self.limiar:
+            if self.estado != "aberto":
+                self.aberturas += 1
+                logger.error(f"🔌 Circuit breaker do PNCP aberto após {self.falhas} falhas")
+            self.estado = "aberto"
+            self.aberto_em = time.monotonic()
+
+
+def _retentavel(erro: BaseException) -> bool:
+    return isinstance(erro, (ErroTransitorioPNCP, httpx.TransportError))
+
+
+def _transitorio(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+class PNCPClient:
+    """
+    Camada única de acesso à API do PNCP usada pela busca, pela coleta e pelos
+    downloads: token bucket, concorrência AIMD, retentativas exponenciais com
+    jitter (tenacity) e circuit breaker. Com o circuito aberto, as buscas são
+    respondidas com o último resultado conhecido da mesma consulta.
+    """
+
+    def __init__(self):
+        self.bucket = TokenBucket(PNCP_TAXA_REQUISICOES, PNCP_RAJADA)
+        self.aimd = ControleAIMD(PNCP_MAX_CONCORRENCIA, PNCP_AIMD_MIN, PNCP_AIMD_MAX)
+        self.circuito = CircuitBreaker(PNCP_CIRCUITO_FALHAS, PNCP_CIRCUITO_TEMPO_ABERTO)
+        self.ultimos_resultados = LRUCache(maxsize=PNCP_ULTIMOS_RESULTADOS)
+        self.requisicoes = 0
+        self.retentativas = 0
+        self.respostas_transitorias = 0
+        self.servidos_ultimo_conhecido = 0
+
+    def _retentador(self) -> AsyncRetrying:
+        def registrar(estado):
+            self.retentativas += 1
+            logger.warning(f"🔁 Retentativa {estado.attempt_number} no PNCP: {estado.outcome.exception()}")
+
+        return AsyncRetrying(
+            stop=stop_after_attempt(PNCP_RETENTATIVAS),
+            wait=wait_random_exponential(multiplier=PNCP_RETRY_BASE, max=PNCP_RETRY_MAX),
+            retry=retry_if_exception(_retentavel),
+            before_sleep=registrar,
+            reraise=True,
+        )
+
+    async def _enviar(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None) -> httpx.Response:
+        """Uma tentativa: respeita o token bucket e ocupa uma vaga do AIMD até a resposta ser fechada"""
+        await self.bucket.adquirir()
+        await self.aimd.adquirir()
+        try:
+            client = get_pncp_http_client()
+            self.requisicoes += 1
+            response = await client.send(client.build_request("GET", url, params=params, headers=headers), stream=True)
+        except BaseException:
+            self.aimd.liberar()
+            raise
+
+        if _transitorio(response.status_code):
+            await response.aclose()
+            self.aimd.liberar()
+            self.respostas_transitorias += 1
+            self.aimd.sobrecarga()
+            raise ErroTransitorioPNCP(response.status_code, url)
+        return response
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: Optional[Dict] = None):
+        """Resposta em streaming (downloads). Respostas não transitórias (2xx, 304, 4xx) vão ao chamador."""
+        if not self.circuito.permitir():
+            raise CircuitoAbertoError(f"PNCP indisponível (circuito aberto): {url}")
+
+        async with AsyncExitStack() as pilha:
+            try:
+                async for tentativa in self._retentador():
+                    with tentativa:
+                        response = await self._enviar(url, headers=headers)
+            except Exception:
+                self.circuito.falha()
+                raise
+            except BaseException:
+                self.circuito.liberar_sonda()
+                raise
+
+            pilha.callback(self.aimd.liberar)
+            pilha.push_async_callback(response.aclose)
+            self.aimd.sucesso()
+            self.circuito.sucesso()
+            yield response
+
+    async def get_json(self, url: str, params: Dict[str, Any]) -> Dict:
+        """GET com resposta JSON; com o circuito aberto ou após esgotar as retentativas, usa o último resultado conhecido"""
+        chave = url + "?" + json.dumps(params, sort_keys=True)
+
+        if not self.circuito.permitir():
+            return self._ultimo_conhecido(chave, CircuitoAbertoError(f"PNCP indisponível (circuito aberto): {url}"))
+
+        try:
+            async for tentativa in self._retentador():
+                with tentativa:
+                    response = await self._enviar(url, params=params)
+                    try:
+                        await response.aread()
+                    finally:
+                        await response.aclose()
+                        self.aimd.liberar()
+            response.raise_for_status()
+            dados = response.json()
+        except (ErroTransitorioPNCP, httpx.TransportError) as e:
+            self.circuito.falha()
+            return self._ultimo_conhecido(chave, e)
+        except httpx.HTTPStatusError:
+            # 4xx: o PNCP respondeu, o erro é da requisição
+            self.circuito.sucesso()
+            raise
+        except Exception:
+            # Resposta sem JSON válido (p.ex. 204 ou corpo truncado)
+            self.circuito.falha()
+            raise
+        except BaseException:
+            self.circuito.liberar_sonda()
+            raise
+
+        self.aimd.sucesso()
+        self.circuito.sucesso()
+        self.ultimos_resultados[chave] = dados
+        return dados
+
+    def _ultimo_conhecido(self, chave: str, erro: Exception) -> Dict:
+        if chave in self.ultimos_resultados:
+            self.servidos_ultimo_conhecido += 1
+            logger.warning(f"🗃️ PNCP indisponível ({erro}); usando o último resultado conhecido")
+            return self.ultimos_resultados[chave]
+        raise erro
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requisicoes": self.requisicoes,
+            "retentativas": self.retentativas,
+            "respostas_429_5xx": self.respostas_transitorias,
+            "concorrencia_limite": int(self.aimd.limite),
+            "concorrencia_em_uso": self.aimd.em_uso,
+            "reducoes_aimd": self.aimd.reducoes,
+            "circuito": self.circuito.estado,
+            "aberturas_circuito": self.circuito.aberturas,
+            "servidos_ultimo_conhecido": self.servidos_ultimo_conhecido,
+        }
+
+
+pncp_client = PNCPClient()
@@ -0,0 +1,125 @@
+import logging
+from datetime import datetime
+from typing import List, Optional, Dict
+
+from sqlalchemy import select, func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import SessionLocal
+from app.models.pncp_models import DocumentoPNCP, WatermarkColetaPNCP
+
+logger = logging.getLogger(__name__)
+
+# Configuração textual literal (não parametrizada) para casar com o índice GIN
+CONFIG_FTS = literal_column("'portuguese'")
+
+
+def _tipo_busca(tipo_documento: str) -> str:
+    return 'ata' if 'ata' in (tipo_documento or '').lower() else 'contrato'
+
+
+async def salvar_documentos(documentos: List) -> int:
+    """
+    Insere/atualiza no espelho local os documentos retornados pela API
+    (objetos DocumentoResultado). Retorna quantos foram gravados.
+    """
+    linhas = {}
+    for doc in documentos:
+        if not doc.chave:
+            continue
+        linhas[doc.chave] = {
+            "chave": doc.chave,
+            "tipo_busca": _tipo_busca(doc.tipo),
+            "orgao": doc.orgao,
+            "objeto": doc.objeto,
+            "tipo": doc.tipo,
+            "url_visualizacao": doc.url_visualizacao,
+            "url_download": doc.url_download,
+            "uf": doc.uf,
+            "esfera": doc.esfera,
+            "modalidade": doc.modalidade,
+            "data_publicacao": doc.data_publicacao,
+        }
+    if not linhas:
+        return 0
+
+    stmt = insert(DocumentoPNCP).values(list(linhas.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DocumentoPNCP.chave],
+        set_={
+            coluna: stmt.excluded[coluna]
+            for coluna in ("orgao", "objeto", "tipo", "url_visualizacao", "url_download",
+                           "uf", "esfera", "modalidade", "data_publicacao")
+        } | {"data_coleta": func.now()},
+    )
+    async with SessionLocal() as session:
+        await session.execute(stmt)
+        await session.commit()
+    return len(linhas)
+
+
+async def buscar_documentos_locais(palavras: str, tipo: str, limite: int,
+                                   ufs: Optional[List[str]] = None, esferas: Optional[List[str]] = None,
+                                   modalidades: Optional[List[str]] = None,
+                                   ordenacao: str = "-data") -> List[DocumentoPNCP]:
+    """
+    Busca no espelho local por texto completo no 'objeto' (português), com os
+    mesmos filtros da API. 'ufs', 'esferas' e 'modalidades' já em códigos.
+    """
+    consulta = func.plainto_tsquery(CONFIG_FTS, palavras)
+    documento_ts = func.to_tsvector(CONFIG_FTS, DocumentoPNCP.objeto)
+
+    stmt = select(DocumentoPNCP).where(
+        DocumentoPNCP.tipo_busca == tipo,
+        documento_ts.op('@@')(consulta),
+    )
+    if ufs:
+        stmt = stmt.where(DocumentoPNCP.uf.in_(ufs))
+    if esferas:
+        stmt = stmt.where(DocumentoPNCP.esfera.in_(esferas))
+    if modalidades:
+        stmt = stmt.where(DocumentoPNCP.modalidade.in_(modalidades))
+
+    if ordenacao == "-data":
+        stmt = stmt.order_by(DocumentoPNCP.data_publicacao.desc().nulls_last())
+    else:
+        stmt = stmt.order_by(func.ts_rank(documento_ts, consulta).desc())
+
+    async with SessionLocal() as session:
+        result = await session.execute(stmt.limit(limite))
+        return list(result.scalars().all())
+
+
+async def carregar_documentos(ids: List[int]) -> Dict[int, DocumentoPNCP]:
+    """Carrega documentos do espelho pelos ids (usado pelo índice vetorial)"""
+    if not ids:
+        return {}
+    async with SessionLocal() as session:
+        result = await session.execute(select(DocumentoPNCP).where(DocumentoPNCP.id.in_(ids)))
+        return {doc.id: doc for doc in result.scalars().all()}
+
+
+async def ler_watermark(tipo: str, termo: str) -> Optional[datetime]:
+    async with SessionLocal() as session:
+        result = await session.execute(
+            select(WatermarkColetaPNCP.data_publicacao)
+            .where(WatermarkColetaPNCP.tipo == tipo, WatermarkColetaPNCP.termo == termo)
+        )
+        return result.scalar_one_or_none()
+
+
+async def gravar_watermark(tipo: str, termo: str, data_publicacao: datetime, coletados: int):
+    stmt = insert(WatermarkColetaPNCP).values(
+        tipo=tipo, termo=termo, data_publicacao=data_publicacao, total_coletado=coletados
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WatermarkColetaPNCP.tipo, WatermarkColetaPNCP.termo],
+        set_={
+            "data_publicacao": func.greatest(WatermarkColetaPNCP.data_publicacao, stmt.excluded.data_publicacao),
+            "total_coletado": WatermarkColetaPNCP.total_coletado + stmt.excluded.total_coletado,
+            "atualizado_em": func.now(),
+        },
+    )
+    async with SessionLocal() as session:
+        await session.execute(stmt)
+        await session.commit()
@@ -0,0 +1,158 @@
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional, Dict, Any
+
+from app.database import lock_exclusivo
+from app.config import (
+    PNCP_COLETA_TERMOS, PNCP_COLETA_INTERVALO, PNCP_COLETA_MAX_PAGINAS, PNCP_COLETA_CONCORRENCIA
+)
+from app.services.pdp_search_services import PNCPSearcher
+from app.services import pncp_corpus_services
+
+logger = logging.getLogger(__name__)
+
+# Chave do advisory lock que garante um único coletor ativo entre os workers
+CHAVE_LOCK_COLETA = 724_001
+
+
+class PNCPHarvester:
+    """
+    Coletor incremental que espelha no banco local os metadados de atas e
+    contratos do PNCP.
+
+    Para cada tipo de documento e termo configurado, percorre as páginas da
+    busca ordenadas da mais recente para a mais antiga (em lotes paralelos
+    limitados por 'concorrencia') até alcançar a marca d'água gravada na
+    execução anterior. A marca só avança quando a coleta termina sem erro e
+    alcança a marca anterior (ou esgota a listagem), para que uma falha ou o
+    limite de páginas não deixe lacunas no espelho.
+    """
+
+    def __init__(self, termos: List[str], tipos: Optional[List[str]] = None,
+                 tam_pagina: int = 50, max_paginas: int = PNCP_COLETA_MAX_PAGINAS,
+                 concorrencia: int = PNCP_COLETA_CONCORRENCIA):
+        self.termos = termos
+        self.tipos = tipos or ['ata', 'contrato']
+        self.tam_pagina = tam_pagina
+        self.max_paginas = max_paginas
+        self.concorrencia = concorrencia
+        self.searcher = PNCPSearcher()
+        self.execucoes = 0
+        self.ultima_execucao: Optional[float] = None
+        self.ultima_duracao: Optional[float] = None
+        self.ultimo_erro: Optional[str] = None
+        self.coletados: Dict[str, int] = {}
+
+    async def coletar(self, tipo: str, termo: str, semaforo: asyncio.Semaphore) -> int:
+        """Coleta incremental de um tipo/termo. Retorna quantos documentos novos foram gravados"""
+        watermark = await pncp_corpus_services.ler_watermark(tipo, termo)
+        mais_recente: Optional[datetime] = None
+        total = 0
+        pagina = 1
+        completa = False
+
+        while pagina <= self.max_paginas:
+            paginas = list(range(pagina, min(pagina + self.concorrencia, self.max_paginas + 1)))
+            respostas = await asyncio.gather(*(
+                self.searcher._buscar_pagina(
+                    semaforo,
+                    self.searcher._montar_params(termo, tipo, p, self.tam_pagina, ordenacao="-data"),
+                    usar_cache=False
+                )
+                for p in paginas
+            ), return_exceptions=True)
+
+            for p, resposta in zip(paginas, respostas):
+                if isinstance(resposta, Exception):
+                    raise RuntimeError(f"Falha na coleta de {tipo} '{termo}', página {p}: {resposta}")
+
+                itens = resposta.get("items", [])
+                documentos = [d for d in (self.searcher._parse_document(i, tipo) for i in itens) if d]
+                novos = [
+                    d for d in documentos
+                    if watermark is None or d.data_publicacao is None or d.data_publicacao > watermark
+                ]
+                if novos:
+                    total += await pncp_corpus_services.salvar_documentos(novos)
+
+                datas = [d.data_publicacao for d in documentos if d.data_publicacao]
+                if datas:
+                    mais_recente = max([mais_recente, *datas]) if mais_recente else max(datas)
+
+                alcancou_watermark = watermark is not None and datas and min(datas) <= watermark
+                if len(itens) < self.tam_pagina or alcancou_watermark:
+                    completa = True
+                    pagina = self.max_paginas + 1
+                    break
+            else:
+                pagina = paginas[-1] + 1
+
+        # Na primeira coleta (sem marca) a janela é limitada por max_paginas de propósito
+        if mais_recente and (completa or watermark is None):
+            await pncp_corpus_services.gravar_watermark(tipo, termo, mais_recente, total)
+        elif not completa:
+            logger.warning(
+                f"⚠️ Coleta PNCP {tipo} '{termo}' parou em {self.max_paginas} páginas sem alcançar a marca "
+                f"d'água; a marca não avança e a próxima rodada percorre o intervalo de novo"
+            )
+        logger.info(f"🗄️ Coleta PNCP {tipo} '{termo}': {total} documentos novos")
+        return total
+
+    async def executar(self) -> bool:
+        """
+        Executa uma rodada de coleta para todos os tipos e termos. Retorna False
+        se outro worker já estiver coletando.
+        """
+        async with lock_exclusivo(CHAVE_LOCK_COLETA) as obteve:
+            if not obteve:
+                logger.info("Coleta do PNCP em andamento em outro worker")
+                return False
+
+            inicio = time.perf_counter()
+            semaforo = asyncio.Semaphore(self.concorrencia)
+            tarefas = [(tipo, termo) for tipo in self.tipos for termo in self.termos]
+            resultados = await asyncio.gather(
+                *(self.coletar(tipo, termo, semaforo) for tipo, termo in tarefas),
+                return_exceptions=True
+            )
+
+            self.ultimo_erro = None
+            for (tipo, termo), resultado in zip(tarefas, resultados):
+                if isinstance(resultado, Exception):
+                    logger.error(f"❌ {resultado}")
+                    self.ultimo_erro = str(resultado)
+                else:
+                    self.coletados[tipo] = self.coletados.get(tipo, 0) + resultado
+
+            self.execucoes += 1
+            self.ultima_execucao = time.time()
+            self.ultima_duracao = time.perf_counter() - inicio
+            return True
+
+    async def loop(self, intervalo: int = PNCP_COLETA_INTERVALO):
+        """Executa a coleta periodicamente (tarefa de fundo iniciada no lifespan)"""
+        while True:
+            try:
+                await self.executar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.ultimo_erro = str(e)
+                logger.error(f"❌ Erro na coleta do PNCP: {e}")
+            await asyncio.sleep(intervalo)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "termos": self.termos,
+            "tipos": self.tipos,
+            "execucoes": self.execucoes,
+            "ultima_execucao": self.ultima_execucao,
+            "ultima_duracao_s": self.ultima_duracao,
+            "documentos_coletados": self.coletados,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+
+harvester = PNCPHarvester(PNCP_COLETA_TERMOS)
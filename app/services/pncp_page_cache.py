@@ -0,0 +1,145 @@
+import json
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import SessionLocal
+from app.models.pncp_models import PaginaPNCPCache
+from app.config import PNCP_CACHE_TTL, PNCP_CACHE_STALE
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_CHAVE = ("q", "tipos_documento", "ufs", "esferas", "modalidades", "ordenacao", "pagina", "tam_pagina", "status")
+CAMPOS_LISTA = ("tipos_documento", "ufs", "esferas", "modalidades")
+LIMPEZA_A_CADA = 200
+
+
+def normalizar_params(params: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Parâmetros de busca em forma canônica: termos em minúsculas com espaços
+    colapsados e listas separadas por '|' ordenadas e sem repetição, para que
+    consultas equivalentes compartilhem a mesma entrada do cache.
+    """
+    normalizados = {}
+    for campo in CAMPOS_CHAVE:
+        valor = params.get(campo)
+        if valor is None or str(valor).strip() == "":
+            continue
+        valor = str(valor)
+        if campo == "q":
+            valor = " ".join(valor.lower().split())
+        elif campo in CAMPOS_LISTA:
+            valor = "|".join(sorted({v.strip().lower() for v in valor.split("|") if v.strip()}))
+        normalizados[campo] = valor
+    return normalizados
+
+
+def chave_params(normalizados: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(normalizados, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CachePaginasPNCP:
+    """
+    Cache das páginas da busca do PNCP no Postgres, compartilhado pelos workers.
+
+    Até 'ttl' segundos a página é servida como fresca. Entre 'ttl' e
+    'ttl + stale' ela ainda é servida, mas uma revalidação em segundo plano
+    busca a versão atual. Depois disso é tratada como ausente.
+    """
+
+    def __init__(self, ttl: int = PNCP_CACHE_TTL, stale: int = PNCP_CACHE_STALE):
+        self.ttl = timedelta(seconds=ttl)
+        self.stale = timedelta(seconds=stale)
+        self.hits_frescos = 0
+        self.hits_obsoletos = 0
+        self.misses = 0
+        self.revalidacoes = 0
+        self.erros = 0
+        self._gravacoes = 0
+        self._revalidando = set()
+        self._tarefas = set()
+
+    async def obter(self, params: Dict[str, Any], buscar: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Resposta da página para 'params', usando 'buscar' quando não houver entrada utilizável"""
+        normalizados = normalizar_params(params)
+        chave = chave_params(normalizados)
+
+        linha = await self._ler(chave)
+        if linha:
+            idade = datetime.now(timezone.utc) - linha.buscado_em
+            if idade < self.ttl:
+                self.hits_frescos += 1
+                return linha.resposta
+            if idade < self.ttl + self.stale:
+                self.hits_obsoletos += 1
+                self._agendar_revalidacao(chave, normalizados, buscar)
+                return linha.resposta
+
+        self.misses += 1
+        dados = await buscar()
+        await self._gravar(chave, normalizados, dados)
+        return dados
+
+    def _agendar_revalidacao(self, chave: str, normalizados: Dict[str, str], buscar: Callable[[], Awaitable[Dict]]):
+        if chave in self._revalidando:
+            return
+        self._revalidando.add(chave)
+
+        async def revalidar():
+            try:
+                await self._gravar(chave, normalizados, await buscar())
+                self.revalidacoes += 1
+            except Exception as e:
+                logger.warning(f"Não foi possível revalidar a página do PNCP em cache: {e}")
+            finally:
+                self._revalidando.discard(chave)
+
+        tarefa = asyncio.create_task(revalidar())
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _ler(self, chave: str) -> Optional[PaginaPNCPCache]:
+        try:
+            async with SessionLocal() as session:
+                return await session.get(PaginaPNCPCache, chave)
+        except Exception as e:
+            self.erros += 1
+            logger.warning(f"Cache de páginas do PNCP indisponível: {e}")
+            return None
+
+    async def _gravar(self, chave: str, normalizados: Dict[str, str], dados: Dict):
+        stmt = insert(PaginaPNCPCache).values(chave=chave, params=normalizados, resposta=dados)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PaginaPNCPCache.chave],
+            set_={"resposta": stmt.excluded.resposta, "buscado_em": func.now()},
+        )
+        try:
+            async with SessionLocal() as session:
+                await session.execute(stmt)
+                self._gravacoes += 1
+                if self._gravacoes % LIMPEZA_A_CADA == 0:
+                    limite = datetime.now(timezone.utc) - self.ttl - self.stale
+                    await session.execute(delete(PaginaPNCPCache).where(PaginaPNCPCache.buscado_em < limite))
+                await session.commit()
+        except Exception as e:
+            self.erros += 1
+            logger.warning(f"Não foi possível gravar a página do PNCP em cache: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        total = self.hits_frescos + self.hits_obsoletos + self.misses
+        return {
+            "hits_frescos": self.hits_frescos,
+            "hits_obsoletos": self.hits_obsoletos,
+            "misses": self.misses,
+            "taxa_acerto": round((self.hits_frescos + self.hits_obsoletos) / total, 4) if total else None,
+            "revalidacoes": self.revalidacoes,
+            "erros": self.erros,
+        }
+
+
+cache_paginas = CachePaginasPNCP()
@@ -0,0 +1,274 @@
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+from sqlalchemy import text
+
+from app.database import engine
+from app.config import PROGRESSO_CANAL, PROGRESSO_EVENTOS_POR_JOB, PROGRESSO_JOBS_RECENTES, PROGRESSO_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# Limite de payload do NOTIFY no Postgres é 8000 bytes
+TAMANHO_MAX_MENSAGEM = 500
+
+_contexto: ContextVar[Optional[Dict[str, Any]]] = ContextVar("progresso_contexto", default=None)
+
+
+@contextmanager
+def contexto_progresso(job_id: str, id_projeto: int, tipo: str):
+    """Associa os eventos emitidos dentro do bloco (e das tasks criadas nele) ao job"""
+    token = _contexto.set({"job_id": job_id, "id_projeto": id_projeto, "tipo": tipo})
+    try:
+        yield
+    finally:
+        _contexto.reset(token)
+
+
+def contexto_atual() -> Optional[Dict[str, Any]]:
+    """Job em execução na task corrente (job_id, id_projeto, tipo), se houver"""
+    return _contexto.get()
+
+
+def emitir(etapa: str, mensagem: str, atual: Optional[int] = None, total: Optional[int] = None,
+           fase: Optional[str] = None, **extra):
+    """
+    Publica um evento de progresso do job corrente (sem job no contexto, não faz nada).
+    Não bloqueia: o envio (NOTIFY) fica a cargo de uma task do processo.
+    """
+    contexto = _contexto.get()
+    if contexto is None:
+        return
+    evento = {
+        **contexto,
+        "etapa": etapa,
+        "fase": fase,
+        "mensagem": mensagem[:TAMANHO_MAX_MENSAGEM],
+        "atual": atual,
+        "total": total,
+        "ts": time.time(),
+        **extra,
+    }
+    publicador_progresso.publicar(evento)
+
+
+@asynccontextmanager
+async def etapa(nome: str, mensagem: str, **extra):
+    """Emite o início e o fim (com a duração) de uma etapa; a duração alimenta os histogramas"""
+    inicio = time.perf_counter()
+    emitir(nome, mensagem, fase="inicio", **extra)
+    try:
+        yield
+    except BaseException:
+        emitir(nome, mensagem, fase="erro", duracao=time.perf_counter() - inicio, **extra)
+        raise
+    emitir(nome, mensagem, fase="fim", duracao=time.perf_counter() - inicio, **extra)
+
+
+class PublicadorProgresso:
+    """Envia os eventos do processo por NOTIFY, em ordem, a partir de uma única task"""
+
+    def __init__(self, canal: str = PROGRESSO_CANAL):
+        self.canal = canal
+        self.publicados = 0
+        self.falhas = 0
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def publicar(self, evento: Dict[str, Any]):
+        if self._tarefa is None or self._tarefa.done():
+            self._fila = asyncio.Queue()
+            self._tarefa = asyncio.create_task(self._enviar())
+        self._fila.put_nowait(evento)
+
+    async def _enviar(self):
+        # A task nasce com a cópia do contexto do primeiro job que publicou; sem
+        # limpar, as conexões do NOTIFY seriam atribuídas a ele na telemetria do pool
+        _contexto.set(None)
+        while True:
+            lote = [await self._fila.get()]
+            while not self._fila.empty():
+                lote.append(self._fila.get_nowait())
+            try:
+                async with engine.connect() as conn:
+                    for evento in lote:
+                        await conn.execute(
+                            text("SELECT pg_notify(:canal, :payload)"),
+                            {"canal": self.canal, "payload": json.dumps(evento, ensure_ascii=False, default=str)},
+                        )
+                    await conn.commit()
+                self.publicados += len(lote)
+            except Exception as e:
+                self.falhas += len(lote)
+                logger.warning(f"Eventos de progresso não publicados: {e}")
+            finally:
+                for _ in lote:
+                    self._fila.task_done()
+
+    async def encerrar(self):
+        """Aguarda o envio dos eventos pendentes"""
+        if self._tarefa is None or self._tarefa.done():
+            return
+        try:
+            await asyncio.wait_for(self._fila.join(), timeout=5)
+        except asyncio.TimeoutError:
+            pass
+        self._tarefa.cancel()
+
+
+class HistogramaEtapas:
+    """Histograma de latência por etapa (limites superiores em segundos, cumulativo como no Prometheus)"""
+
+    def __init__(self, limites: List[float] = PROGRESSO_BUCKETS):
+        self.limites = sorted(limites)
+        self._etapas: Dict[str, Dict[str, Any]] = {}
+
+    def registrar(self, etapa: str, duracao: float):
+        dados = self._etapas.setdefault(etapa, {"contagem": 0, "soma": 0.0, "buckets": [0] * (len(self.limites) + 1)})
+        dados["contagem"] += 1
+        dados["soma"] += duracao
+        for i, limite in enumerate(self.limites):
+            if duracao <= limite:
+                dados["buckets"][i] += 1
+                break
+        else:
+            dados["buckets"][-1] += 1
+
+    def _quantil(self, dados: Dict[str, Any], q: float) -> Optional[float]:
+        alvo = q * dados["contagem"]
+        acumulado = 0
+        for i, contagem in enumerate(dados["buckets"]):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return self.limites[i] if i < len(self.limites) else float("inf")
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        resultado = {}
+        for etapa, dados in sorted(self._etapas.items()):
+            acumulado = 0
+            buckets = {}
+            for i, contagem in enumerate(dados["buckets"]):
+                acumulado += contagem
+                buckets[str(self.limites[i]) if i < len(self.limites) else "+Inf"] = acumulado
+            resultado[etapa] = {
+                "contagem": dados["contagem"],
+                "media_s": round(dados["soma"] / dados["contagem"], 3),
+                "p50_s": self._quantil(dados, 0.5),
+                "p95_s": self._quantil(dados, 0.95),
+                "buckets": buckets,
+            }
+        return resultado
+
+
+class Assinatura:
+    def __init__(self, id_projeto: Optional[int], job_id: Optional[str]):
+        self.id_projeto = id_projeto
+        self.job_id = job_id
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=1000)
+
+    def aceita(self, evento: Dict[str, Any]) -> bool:
+        if self.job_id is not None and evento.get("job_id") != self.job_id:
+            return False
+        if self.id_projeto is not None and evento.get("id_projeto") != self.id_projeto:
+            return False
+        return True
+
+    def entregar(self, evento: Dict[str, Any]):
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            pass
+
+
+class OuvinteProgresso:
+    """
+    Recebe por LISTEN os eventos publicados pelos workers e os distribui às
+    conexões SSE do processo web. Guarda os últimos eventos de cada job (para
+    quem assina no meio da geração) e alimenta os histogramas por etapa.
+    """
+
+    def __init__(self, canal: str = PROGRESSO_CANAL):
+        self.canal = canal
+        self.histogramas = HistogramaEtapas()
+        self.recebidos = 0
+        self.conectado = False
+        self._assinantes: set = set()
+        self._recentes: "OrderedDict[str, deque]" = OrderedDict()
+
+    def _dsn(self) -> str:
+        return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    async def loop(self):
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self._dsn())
+                await conn.add_listener(self.canal, self._receber)
+                self.conectado = True
+                logger.info(f"📡 Escutando eventos de progresso no canal '{self.canal}'")
+                while not conn.is_closed():
+                    await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Conexão de eventos de progresso perdida: {e}")
+            finally:
+                self.conectado = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(5)
+
+    def _receber(self, conn, pid, canal, payload: str):
+        try:
+            self.distribuir(json.loads(payload))
+        except Exception as e:
+            logger.warning(f"Evento de progresso inválido: {e}")
+
+    def distribuir(self, evento: Dict[str, Any]):
+        self.recebidos += 1
+        if evento.get("fase") == "fim" and evento.get("duracao") is not None:
+            self.histogramas.registrar(evento["etapa"], evento["duracao"])
+
+        job_id = evento.get("job_id")
+        if job_id:
+            if job_id not in self._recentes:
+                self._recentes[job_id] = deque(maxlen=PROGRESSO_EVENTOS_POR_JOB)
+                while len(self._recentes) > PROGRESSO_JOBS_RECENTES:
+                    self._recentes.popitem(last=False)
+            self._recentes[job_id].append(evento)
+
+        for assinatura in list(self._assinantes):
+            if assinatura.aceita(evento):
+                assinatura.entregar(evento)
+
+    @asynccontextmanager
+    async def assinar(self, id_projeto: Optional[int] = None, job_id: Optional[str] = None):
+        """Fila com os eventos do projeto e/ou job, começando pelos já recebidos do job"""
+        assinatura = Assinatura(id_projeto, job_id)
+        if job_id and job_id in self._recentes:
+            for evento in self._recentes[job_id]:
+                assinatura.entregar(evento)
+        self._assinantes.add(assinatura)
+        try:
+            yield assinatura.fila
+        finally:
+            self._assinantes.discard(assinatura)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "conectado": self.conectado,
+            "eventos_recebidos": self.recebidos,
+            "assinantes": len(self._assinantes),
+            "etapas": self.histogramas.metrics(),
+        }
+
+
+publicador_progresso = PublicadorProgresso()
+ouvinte_progresso = OuvinteProgresso()
@@ -209,4 +209,116 @@ INSTRUÇÕES CRÍTICAS:
 6. Fundamente a solução proposta nas soluções identificadas
 7. Considere aspectos de sustentabilidade em toda a análise
 8. Garanta que a posição conclusiva seja tecnicamente fundamentada
-"""
\ No newline at end of file
+"""
+
+prompt_estrutura_geracao = """
+ESTRUTURA JSON DE RESPOSTA OBRIGATÓRIA:
+
+Com base nos dados fornecidos, gere um ETP completo seguindo exatamente esta estrutura JSON:
+
+{
+    "unidade_demandante": "Unidade responsável pela demanda (extrair do DFD)",
+    "objeto_contratacao": "Descrição detalhada do objeto (baseado no DFD)",
+    "sist_reg_preco": false,
+    "justificativa_necessidade": "Justificativa detalhada da necessidade (baseado no DFD)",
+    "alinhamento_estrategico": [
+        "Alinhamento estratégico extraído do DFD",
+        "Objetivos institucionais relacionados"
+    ],
+    "informacoes_contratacao": "Informações técnicas detalhadas sobre a contratação",
+    "previsto_pca": true,
+    "item_pca": 1,
+    "requisitos_contratacao": [
+        "Requisito técnico específico 1",
+        "Requisito habilitatório 2",
+        "Experiência comprovada na área",
+        "Certificações necessárias"
+    ],
+    "levantamento_mercado": {
+        "pesquisa_mercado": "Descrição da pesquisa realizada baseada nos dados do PDP",
+        "preco_medio": 0.0,
+        "variacao_percentual": 15.0,
+        "fontes": ["PDP - Análise de contratos similares", "Consulta ao mercado", "Dados históricos"],
+        "data_pesquisa": "AAAA-MM-DD (data de referência informada)",
+        "observacoes": "Observações específicas sobre a pesquisa de mercado realizada"
+    },
+    "solucao_proposta": "Descrição detalhada da solução técnica proposta (integrar dados das soluções identificadas)",
+    "quantidade_estimada": {
+        "item_principal": {
+            "descricao": "Descrição do item principal",
+            "quantidade": 1,
+            "unidade": "unidade apropriada",
+            "valor_unitario": 0.0,
+            "valor_total": 0.0
+        },
+        "itens_adicionais": [],
+        "total_estimado": 0.0,
+        "criterios_dimensionamento": "Critérios técnicos utilizados para dimensionamento"
+    },
+    "justificativa_nao_parcelamento": "Justificativa técnica fundamentada para não parcelamento da contratação",
+    "valor_total_estimado": "R$ 0,00 (baseado nos dados do PDP)",
+    "demonstracao_resultados": {
+        "resultados_quantitativos": {
+            "eficiencia_operacional": "Percentual de melhoria esperado",
+            "redução_custos": "Economia estimada",
+            "tempo_execucao": "Prazo de implementação"
+        },
+        "resultados_qualitativos": {
+            "melhoria_servicos": "Descrição da melhoria na qualidade",
+            "satisfacao_usuarios": "Impacto na satisfação dos usuários finais",
+            "conformidade_legal": "Atendimento às normas e regulamentações"
+        },
+        "indicadores_desempenho": ["Indicador específico 1", "Indicador específico 2"],
+        "prazo_resultados": "Prazo realista para obtenção dos resultados"
+    },
+    "servico_continuo": false,
+    "justificativa_servico_continuo": "Justificativa se for serviço de natureza continuada (ou null se não for)",
+    "providencias_necessarias": {
+        "pre_contratacao": [
+            "Elaboração detalhada do Termo de Referência/Projeto Básico",
+            "Aprovação pela autoridade competente",
+            "Processo licitatório conforme modalidade adequada",
+            "Dotação orçamentária específica"
+        ],
+        "durante_execucao": [
+            "Fiscalização técnica especializada",
+            "Acompanhamento sistemático da execução",
+            "Controle rigoroso de qualidade",
+            "Gestão de riscos identificados no PGR"
+        ],
+        "pos_contratacao": [
+            "Avaliação final dos resultados obtidos",
+            "Documentação completa do processo",
+            "Lições aprendidas para futuras contratações"
+        ],
+        "responsaveis": {
+            "gestor_contrato": "Perfil do gestor responsável",
+            "fiscal_tecnico": "Competências técnicas necessárias",
+            "equipe_apoio": "Equipe de apoio necessária"
+        }
+    },
+    "impactos_ambientais": "Análise detalhada dos impactos ambientais considerando todo o ciclo de vida",
+    "alinhamento_pls": [
+        "Critério específico de sustentabilidade 1",
+        "Critério específico de sustentabilidade 2",
+        "Conformidade com PLS da Administração Pública"
+    ],
+    "posicao_conclusiva": true,
+    "justificativa_posicao": "Justificativa técnica fundamentada da posição conclusiva",
+    "equipe_planejamento": "Identificação completa da equipe responsável pelo planejamento"
+}
+
+INSTRUÇÕES CRÍTICAS PARA GERAÇÃO:
+1. INTEGRE OBRIGATORIAMENTE os dados reais dos artefatos fornecidos (DFD, PDP, PGR, Soluções)
+2. INCORPORE os riscos identificados no PGR nas seções apropriadas
+3. USE os dados de preços e fornecedores do PDP no levantamento de mercado
+4. MANTENHA absoluta coerência com o objeto e justificativas definidos no DFD
+5. FUNDAMENTE a solução proposta nas soluções identificadas previamente
+6. SEJA específico, detalhado e tecnicamente preciso em todas as seções
+7. CONSIDERE obrigatoriamente aspectos de sustentabilidade conforme PLS
+8. GARANTA que a posição conclusiva seja baseada em análise técnica sólida
+9. ATENDA às exigências da Lei 14.133/2021 e normas correlatas
+10. APRESENTE conteúdo profissional compatível com padrões da Administração Pública
+
+Gere um ETP de excelência técnica que justifique adequadamente a contratação proposta.
+"""
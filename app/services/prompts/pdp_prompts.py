@@ -90,4 +90,24 @@ INSTRUÇÕES IMPORTANTES:
    - Se não houver preços: pesquise por referências de mercado
 
 IMPORTANTE: Retorne sempre um array JSON válido, mesmo que seja um único PDP. Todos os campos numéricos devem ser numbers, não strings. Datas no formato ISO (YYYY-MM-DD).
-"""
\ No newline at end of file
+"""
+
+prompt_extracao_itens = """
+Você é um especialista em documentos de contratação pública.
+
+Extraia do documento anexado (ata de registro de preços ou contrato) os dados da contratação e a tabela de itens, exatamente como constam no documento:
+
+- orgao_contratante, processo_pregao, empresa_adjudicada, cnpj_empresa, objeto e data_vigencia_inicio (YYYY-MM-DD)
+- tipo_fonte: 'Ata de Registro de Preços' ou 'Contrato'
+- tabela_itens: todos os itens com descrição, unidade, quantidade, valor unitário e valor total, especificação técnica e marca quando houver
+
+NÃO adapte, estime ou invente valores: copie os dados do documento. Campos ausentes devem ser "A definir" (texto) ou 0 (números).
+Retorne um único objeto JSON válido. Todos os campos numéricos devem ser numbers, não strings.
+"""
+
+
+prompt_adaptacao_itens = """
+Os documentos de referência já foram analisados: abaixo estão os dados e itens extraídos de cada um
+(JSON, campo 'extracao', com a origem em 'documento'). Use-os como os documentos anexados mencionados
+nas instruções: adapte os itens e preços ao projeto e retorne o array de PDPs no formato pedido.
+"""
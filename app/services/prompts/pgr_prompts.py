@@ -0,0 +1,82 @@
+# app/services/prompts/pgr_prompts.py
+
+prompt_sistema = """
+Você é um especialista em gestão de riscos em contratações públicas. Analise as soluções identificadas para este projeto e identifique riscos detalhados para cada uma.
+"""
+
+prompt_estrutura_riscos = """
+Para cada solução, identifique e analise os riscos seguindo esta estrutura JSON:
+{
+    "resumo_analise": "Resumo geral da análise de riscos para o projeto",
+    "metodologia_aplicada": "Metodologia de análise de riscos utilizada",
+    "riscos_por_solucao": [
+        {
+            "id_solucao": 1,
+            "nome_solucao": "Nome da solução",
+            "categoria_risco_principal": "Técnico/Operacional/Financeiro/Legal/Estratégico",
+            "nivel_risco_geral": "Baixo/Médio/Alto/Crítico",
+            "riscos_identificados": [
+                {
+                    "categoria": "Técnico/Operacional/Financeiro/Legal/Estratégico",
+                    "tipo_risco": "Nome específico do risco",
+                    "descricao": "Descrição detalhada do risco",
+                    "probabilidade": "Muito Baixa/Baixa/Média/Alta/Muito Alta",
+                    "impacto": "Muito Baixo/Baixo/Médio/Alto/Muito Alto",
+                    "nivel_risco": "Baixo/Médio/Alto/Crítico",
+                    "fase_projeto": "Planejamento/Licitação/Contratação/Execução/Encerramento",
+                    "causas_potenciais": ["Causa 1", "Causa 2"],
+                    "consequencias": ["Consequência 1", "Consequência 2"],
+                    "indicadores": ["Indicador 1", "Indicador 2"],
+                    "acoes_mitigacao": [
+                        {
+                            "acao": "Descrição da ação",
+                            "responsavel": "Área/função responsável",
+                            "prazo": "Prazo para implementação",
+                            "custo_estimado": "Estimativa de custo",
+                            "eficacia_estimada": "Baixa/Média/Alta"
+                        }
+                    ],
+                    "plano_contingencia": {
+                        "trigger": "Condição que ativa o plano",
+                        "acoes": ["Ação 1", "Ação 2"],
+                        "recursos_necessarios": ["Recurso 1", "Recurso 2"]
+                    },
+                    "monitoramento": {
+                        "frequencia": "Diária/Semanal/Mensal/Trimestral",
+                        "responsavel": "Área/função responsável",
+                        "metricas": ["Métrica 1", "Métrica 2"]
+                    }
+                }
+            ],
+            "matriz_riscos": {
+                "riscos_criticos": ["Lista de riscos críticos"],
+                "riscos_altos": ["Lista de riscos altos"],
+                "riscos_medios": ["Lista de riscos médios"],
+                "riscos_baixos": ["Lista de riscos baixos"]
+            },
+            "recomendacoes_gerais": [
+                "Recomendação específica para esta solução"
+            ]
+        }
+    ],
+    "analise_comparativa": {
+        "solucao_menor_risco": "Nome da solução com menor risco geral",
+        "solucao_maior_risco": "Nome da solução com maior risco geral",
+        "fatores_decisao": ["Fator 1", "Fator 2"],
+        "recomendacao_final": "Recomendação sobre qual solução escolher"
+    },
+    "plano_geral_riscos": {
+        "estrutura_governanca": "Descrição da estrutura de governança de riscos",
+        "periodicidade_revisao": "Frequência de revisão do plano",
+        "criterios_escalacao": ["Critério 1", "Critério 2"],
+        "documentacao_necessaria": ["Documento 1", "Documento 2"]
+    }
+}
+
+IMPORTANTE:
+- Identifique pelo menos 3-5 riscos por solução
+- Seja específico sobre ações de mitigação
+- Considere riscos típicos de contratações públicas
+- Avalie tanto riscos internos quanto externos
+- Inclua aspectos legais, técnicos, operacionais e financeiros
+"""
@@ -0,0 +1,55 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+from app.config import RANKING_RRF_K
+
+# Palavras sem valor discriminante nos objetos de contratação
+STOPWORDS_PT = [
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "nos", "nas",
+    "para", "por", "com", "sem", "um", "uma", "ao", "aos", "que", "se", "ou",
+]
+
+
+def pontuar_bm25(consulta: str, documentos: List[str], k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """
+    Pontuação BM25 de cada documento para a consulta. O vocabulário e os IDFs
+    são calculados sobre os próprios candidatos da busca (sem acentos e em
+    minúsculas).
+    """
+    pontuacoes = np.zeros(len(documentos), dtype=np.float64)
+    vetorizador = CountVectorizer(strip_accents="unicode", lowercase=True, stop_words=STOPWORDS_PT)
+    try:
+        frequencias = vetorizador.fit_transform(documentos).tocsr()
+    except ValueError:
+        # Vocabulário vazio (somente stopwords ou textos vazios)
+        return pontuacoes
+
+    termos = sorted({vetorizador.vocabulary_[t] for t in vetorizador.build_analyzer()(consulta)
+                     if t in vetorizador.vocabulary_})
+    if not termos:
+        return pontuacoes
+
+    n = frequencias.shape[0]
+    df = np.bincount(frequencias.indices, minlength=frequencias.shape[1])[termos]
+    idf = np.log((n - df + 0.5) / (df + 0.5) + 1.0)
+    tamanhos = np.asarray(frequencias.sum(axis=1)).ravel()
+    tamanho_medio = tamanhos.mean() or 1.0
+
+    tf = frequencias[:, termos].toarray().astype(np.float64)
+    normalizacao = k1 * (1 - b + b * tamanhos / tamanho_medio)
+    return (tf * (k1 + 1) / (tf + normalizacao[:, None]) * idf).sum(axis=1)
+
+
+def fundir_rrf(ordens: List[Sequence[int]], k: int = RANKING_RRF_K) -> List[Tuple[int, float]]:
+    """
+    Reciprocal-rank fusion: cada ranking contribui 1 / (k + posição) para os
+    seus itens. Retorna (índice, pontuação) em ordem decrescente; empates
+    mantêm a ordem do primeiro ranking.
+    """
+    pontuacoes = {}
+    for ordem in ordens:
+        for posicao, indice in enumerate(ordem, 1):
+            pontuacoes[int(indice)] = pontuacoes.get(int(indice), 0.0) + 1.0 / (k + posicao)
+    return sorted(pontuacoes.items(), key=lambda item: item[1], reverse=True)
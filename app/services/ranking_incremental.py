@@ -0,0 +1,217 @@
+import heapq
+import asyncio
+import logging
+import itertools
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.config import RANKING_PACIENCIA_PAGINAS
+from app.services.embedding_cache_services import embedding_cache
+from app.services.embedding_registry import similaridade_cosseno
+from app.services.executor import executar_cpu
+from app.services.ranking_hibrido import pontuar_bm25
+
+logger = logging.getLogger(__name__)
+
+
+def _objetos_validos(documentos: List[Any]) -> List[Any]:
+    return [doc for doc in documentos if doc.objeto and doc.objeto.strip() and doc.objeto != "Não informado"]
+
+
+class RankingPorPaginas:
+    """
+    Base dos rankings alimentados página a página durante a busca no PNCP:
+    conta as páginas buscadas e previstas e encerra a busca quando
+    'paciencia' páginas seguidas não alteram os k melhores.
+
+    'ranking_final' indica se resultados() já é o ranking da busca ou se a
+    ordenação final fica a cargo de find_similar_documents_by_object.
+    """
+
+    tipo = None
+    ranking_final = True
+
+    def __init__(self, texto_similaridade: str, k: int, paciencia: int = RANKING_PACIENCIA_PAGINAS):
+        self.texto_similaridade = texto_similaridade
+        self.k = k
+        self.paciencia = paciencia
+        self._lock = asyncio.Lock()
+        self.paginas_sem_mudanca = 0
+        self.encerrado = False
+        self.paginas_buscadas = 0
+        self.paginas_previstas = 0
+        self.documentos_avaliados = 0
+
+    def registrar_previsao(self, paginas: int):
+        """Páginas que a busca completa pediria (base do cálculo de páginas economizadas)"""
+        self.paginas_previstas += paginas
+
+    def registrar_busca(self, paginas: int = 1):
+        self.paginas_buscadas += paginas
+
+    @property
+    def paginas_economizadas(self) -> int:
+        return max(0, self.paginas_previstas - self.paginas_buscadas)
+
+    def _registrar_pagina(self, mudou: bool, completo: bool):
+        self.paginas_sem_mudanca = 0 if mudou else self.paginas_sem_mudanca + 1
+        if self.paciencia > 0 and self.paginas_sem_mudanca >= self.paciencia and completo:
+            if not self.encerrado:
+                logger.info(f"⏹️ Top-{self.k} estável há {self.paginas_sem_mudanca} páginas. Encerrando a busca")
+            self.encerrado = True
+
+    async def adicionar(self, documentos: List[Any]) -> bool:
+        raise NotImplementedError
+
+    def telemetria(self) -> Dict[str, Any]:
+        return {
+            "tipo": self.tipo,
+            "paginas_buscadas": self.paginas_buscadas,
+            "paginas_previstas": self.paginas_previstas,
+            "paginas_economizadas": self.paginas_economizadas,
+            "documentos_avaliados": self.documentos_avaliados,
+            "encerrado_antecipadamente": self.encerrado,
+        }
+
+
+class RankingIncremental(RankingPorPaginas):
+    """
+    Top-k por similaridade mantido enquanto as páginas do PNCP chegam.
+
+    Cada página é embedada (via cache de embeddings) e pontuada assim que é
+    recebida; um min-heap guarda os k melhores documentos. Quando 'paciencia'
+    páginas seguidas não alteram o top-k, 'encerrado' passa a ser True e a
+    busca deixa de pedir novas páginas.
+    """
+
+    tipo = "embeddings"
+
+    def __init__(self, model, model_name: str, texto_similaridade: str, k: int,
+                 paciencia: int = RANKING_PACIENCIA_PAGINAS):
+        super().__init__(texto_similaridade, k, paciencia)
+        self.model = model
+        self.model_name = model_name
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._sequencia = itertools.count()
+        self._embedding_busca = None
+
+    async def adicionar(self, documentos: List[Any]) -> bool:
+        """
+        Pontua os documentos de uma página e atualiza o top-k.
+
+        Returns:
+            bool: True se a página alterou o top-k
+        """
+        validos = _objetos_validos(documentos)
+
+        async with self._lock:
+            mudou = False
+            if validos:
+                if self._embedding_busca is None:
+                    self._embedding_busca = await executar_cpu(self.model.encode, [self.texto_similaridade])
+                embeddings = await embedding_cache.encode(
+                    self.model, self.model_name, [doc.objeto.strip() for doc in validos]
+                )
+                similaridades = await executar_cpu(
+                    lambda: similaridade_cosseno(self._embedding_busca, embeddings).tolist()
+                )
+                self.documentos_avaliados += len(validos)
+
+                for doc, similaridade in zip(validos, similaridades):
+                    # Empates favorecem o documento recebido antes (mesma ordem do sort estável)
+                    item = (similaridade, -next(self._sequencia), doc)
+                    if len(self._heap) < self.k:
+                        heapq.heappush(self._heap, item)
+                        mudou = True
+                    elif item[:2] > self._heap[0][:2]:
+                        heapq.heapreplace(self._heap, item)
+                        mudou = True
+
+            self._registrar_pagina(mudou, len(self._heap) >= self.k)
+            return mudou
+
+    def resultados(self) -> List[Tuple[Any, float]]:
+        """Top-k em ordem decrescente de similaridade"""
+        ordenados = sorted(self._heap, key=lambda item: item[:2], reverse=True)
+        resultados = []
+        for similaridade, _, doc in ordenados:
+            doc.similaridade = similaridade
+            resultados.append((doc, similaridade))
+        return resultados
+
+
+class ShortlistLexicaIncremental(RankingPorPaginas):
+    """
+    Shortlist BM25 mantida enquanto as páginas do PNCP chegam, para o ranking
+    híbrido: a cada página o BM25 é recalculado sobre todos os objetos já
+    recebidos (os IDFs mudam com o conjunto) e a busca para quando 'paciencia'
+    páginas seguidas não mudam os k primeiros. O modelo de embedding não é
+    usado aqui; o passo denso e a fusão RRF rodam depois, sobre os documentos
+    buscados, em find_similar_documents_by_object.
+    """
+
+    tipo = "hibrido"
+    ranking_final = False
+
+    def __init__(self, texto_similaridade: str, k: int, paciencia: int = RANKING_PACIENCIA_PAGINAS):
+        super().__init__(texto_similaridade, k, paciencia)
+        self._objetos: List[str] = []
+        self._shortlist: frozenset = frozenset()
+
+    async def adicionar(self, documentos: List[Any]) -> bool:
+        """
+        Acrescenta os objetos de uma página e recalcula a shortlist.
+
+        Returns:
+            bool: True se a página alterou a shortlist
+        """
+        validos = _objetos_validos(documentos)
+
+        async with self._lock:
+            mudou = False
+            if validos:
+                self._objetos.extend(doc.objeto.strip() for doc in validos)
+                self.documentos_avaliados += len(validos)
+                pontuacoes = await executar_cpu(pontuar_bm25, self.texto_similaridade, list(self._objetos))
+                shortlist = frozenset(int(i) for i in np.argsort(-pontuacoes, kind="stable")[:self.k])
+                mudou = shortlist != self._shortlist
+                self._shortlist = shortlist
+
+            self._registrar_pagina(mudou, len(self._objetos) >= self.k)
+            return mudou
+
+
+class TelemetriaRanking:
+    """Agregado das buscas com ranking incremental deste worker (embeddings ou shortlist do híbrido)"""
+
+    def __init__(self):
+        self.buscas = 0
+        self.encerradas_antecipadamente = 0
+        self.paginas_buscadas = 0
+        self.paginas_economizadas = 0
+        self.ultima: Dict[str, Any] = {}
+
+    def registrar(self, ranking: RankingPorPaginas):
+        telemetria = ranking.telemetria()
+        self.buscas += 1
+        self.encerradas_antecipadamente += int(ranking.encerrado)
+        self.paginas_buscadas += ranking.paginas_buscadas
+        self.paginas_economizadas += ranking.paginas_economizadas
+        self.ultima = telemetria
+        logger.info(
+            f"📉 Ranking incremental: {ranking.paginas_buscadas} páginas buscadas, "
+            f"{ranking.paginas_economizadas} economizadas ({ranking.documentos_avaliados} documentos avaliados)"
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "buscas": self.buscas,
+            "encerradas_antecipadamente": self.encerradas_antecipadamente,
+            "paginas_buscadas": self.paginas_buscadas,
+            "paginas_economizadas": self.paginas_economizadas,
+            "ultima_busca": self.ultima,
+        }
+
+
+telemetria_ranking = TelemetriaRanking()
@@ -0,0 +1,65 @@
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import SELECAO_MMR_LAMBDA, SELECAO_LIMIAR_REDUNDANCIA
+
+
+def selecionar_mmr(relevancias: np.ndarray, embeddings: Optional[np.ndarray], orcamento: int,
+                   grupos: Optional[List[str]] = None, lambda_: float = SELECAO_MMR_LAMBDA,
+                   penalidade_grupo: float = 0.15,
+                   limiar_redundancia: float = SELECAO_LIMIAR_REDUNDANCIA) -> List[int]:
+    """
+    Maximal marginal relevance sobre os candidatos do ranking.
+
+    A cada passo escolhe o candidato que maximiza
+        lambda * relevância - (1 - lambda) * max(similaridade com os já escolhidos)
+    menos 'penalidade_grupo' se o seu grupo (órgão) já foi escolhido. A relevância
+    é normalizada para [0, 1], pois vem de rankings diferentes (cosseno, RRF, BM25).
+
+    'orcamento' é o máximo de documentos. Quase duplicatas de um documento já
+    escolhido (similaridade >= limiar_redundancia) são descartadas, então a
+    seleção termina antes do orçamento quando os candidatos não acrescentam
+    cobertura, trocando quantidade por diversidade.
+
+    Returns:
+        Índices dos candidatos escolhidos, na ordem de escolha
+    """
+    n = len(relevancias)
+    if n == 0 or orcamento <= 0:
+        return []
+
+    relevancias = np.asarray(relevancias, dtype=np.float64)
+    amplitude = relevancias.max() - relevancias.min()
+    relevancia = (relevancias - relevancias.min()) / amplitude if amplitude > 0 else np.ones(n)
+
+    if embeddings is not None and len(embeddings) == n:
+        vetores = np.asarray(embeddings, dtype=np.float32)
+        vetores = vetores / np.clip(np.linalg.norm(vetores, axis=1, keepdims=True), 1e-12, None)
+        similaridades = vetores @ vetores.T
+    else:
+        similaridades = np.zeros((n, n), dtype=np.float32)
+
+    escolhidos: List[int] = []
+    grupos_escolhidos = set()
+    redundancia = np.full(n, -np.inf)
+    disponiveis = np.ones(n, dtype=bool)
+
+    while len(escolhidos) < min(orcamento, n):
+        penalidade = np.where(np.isfinite(redundancia), redundancia, 0.0)
+        pontuacao = lambda_ * relevancia - (1 - lambda_) * penalidade
+        if grupos:
+            pontuacao -= penalidade_grupo * np.array([g in grupos_escolhidos for g in grupos])
+        disponiveis &= redundancia < limiar_redundancia
+        if not disponiveis.any():
+            break
+        pontuacao[~disponiveis] = -np.inf
+
+        melhor = int(np.argmax(pontuacao))
+        escolhidos.append(melhor)
+        disponiveis[melhor] = False
+        if grupos:
+            grupos_escolhidos.add(grupos[melhor])
+        redundancia = np.maximum(redundancia, similaridades[melhor])
+
+    return escolhidos
@@ -0,0 +1,77 @@
+import time
+import logging
+from collections import deque
+from typing import Any, Dict
+
+from sqlalchemy import event
+
+from app.database import engine
+from app.services.progresso import HistogramaEtapas, contexto_atual
+from app.config import POOL_ALERTA_RETENCAO, POOL_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetriaPool:
+    """
+    Tempo em que cada conexão do pool fica emprestada (checkout -> checkin),
+    por origem: o tipo do job em execução no worker ou, fora de job, 'web' na
+    API e 'worker' no worker (fila, heartbeat, métricas). Serve para
+    conferir que as gerações não seguram conexões durante as chamadas ao
+    PNCP e ao Gemini.
+    """
+
+    def __init__(self):
+        self.histogramas = HistogramaEtapas(POOL_BUCKETS)
+        self.origem_sem_job = "web"
+        self.emprestadas = 0
+        self.alertas = 0
+        self.mais_longas: deque = deque(maxlen=20)
+
+    def instrumentar(self, engine_async):
+        alvo = engine_async.sync_engine
+        event.listen(alvo, "checkout", self._checkout)
+        event.listen(alvo, "checkin", self._checkin)
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        contexto = contexto_atual()
+        connection_record.info["telemetria_checkout"] = (time.perf_counter(), contexto)
+        self.emprestadas += 1
+
+    def _checkin(self, dbapi_connection, connection_record):
+        dados = connection_record.info.pop("telemetria_checkout", None)
+        if dados is None:
+            return
+        self.emprestadas -= 1
+        inicio, contexto = dados
+        retencao = time.perf_counter() - inicio
+        origem = f"job_{contexto['tipo']}" if contexto else self.origem_sem_job
+        self.histogramas.registrar(origem, retencao)
+        if retencao >= POOL_ALERTA_RETENCAO:
+            self.alertas += 1
+            self.mais_longas.append({
+                "origem": origem,
+                "job_id": contexto["job_id"] if contexto else None,
+                "retencao_s": round(retencao, 3),
+                "ts": time.time(),
+            })
+            logger.warning(f"🐢 Conexão do pool retida por {retencao:.1f}s ({origem})")
+
+    def metrics(self) -> Dict[str, Any]:
+        pool = engine.sync_engine.pool
+        return {
+            "pool": {
+                "tamanho": pool.size(),
+                "emprestadas": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "ociosas": pool.checkedin(),
+            },
+            "retencao_por_origem": self.histogramas.metrics(),
+            "alerta_retencao_s": POOL_ALERTA_RETENCAO,
+            "retencoes_acima_do_alerta": self.alertas,
+            "mais_longas": list(self.mais_longas),
+        }
+
+
+telemetria_pool = TelemetriaPool()
+telemetria_pool.instrumentar(engine)
@@ -0,0 +1,359 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+import threading
+from typing import List, Optional, Tuple, Dict, Any
+
+import numpy as np
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models.pncp_models import DocumentoPNCP
+from app.config import (
+    INDICE_VETORIAL_DIR, INDICE_VETORIAL_DTYPE, INDICE_VETORIAL_NLIST, INDICE_VETORIAL_NPROBE
+)
+
+logger = logging.getLogger(__name__)
+
+# Códigos compactos (uint8) dos filtros; 0 = não informado
+UFS = [
+    'AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA',
+    'MT', 'MS', 'MG', 'PA', 'PB', 'PR', 'PE', 'PI', 'RJ', 'RN',
+    'RS', 'RO', 'RR', 'SC', 'SP', 'SE', 'TO'
+]
+ESFERAS = ['D', 'E', 'F', 'M']
+
+ARQUIVO_ATUAL = "ATUAL"
+TAMANHO_BLOCO = 65536
+
+
+def codigo_uf(uf: Optional[str]) -> int:
+    return UFS.index(uf.upper()) + 1 if uf and uf.upper() in UFS else 0
+
+
+def codigo_esfera(esfera: Optional[str]) -> int:
+    return ESFERAS.index(esfera.upper()) + 1 if esfera and esfera.upper() in ESFERAS else 0
+
+
+def codigo_modalidade(modalidade: Optional[str]) -> int:
+    try:
+        return int(modalidade) if modalidade else 0
+    except ValueError:
+        return 0
+
+
+def _normalizar(vetores: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return vetores / normas
+
+
+def _kmeans(amostra: np.ndarray, k: int, iteracoes: int = 20, seed: int = 0) -> np.ndarray:
+    """K-means (Lloyd) esférico simples em NumPy para o quantizador grosso"""
+    rng = np.random.default_rng(seed)
+    centroides = amostra[rng.choice(len(amostra), size=k, replace=False)].copy()
+    for _ in range(iteracoes):
+        atribuicao = np.argmax(amostra @ centroides.T, axis=1)
+        for c in range(k):
+            membros = amostra[atribuicao == c]
+            if len(membros):
+                centroides[c] = membros.mean(axis=0)
+            else:
+                centroides[c] = amostra[rng.integers(len(amostra))]
+        centroides = _normalizar(centroides)
+    return centroides.astype(np.float32)
+
+
+class IndiceVetorial:
+    """
+    Índice semântico em disco sobre todos os documentos do espelho do PNCP.
+
+    Os vetores (normalizados) ficam numa matriz float16 ou int8 (com escala
+    por linha) aberta via np.memmap em modo somente leitura: todos os workers
+    do uvicorn compartilham as mesmas páginas do page cache do sistema, sem
+    cópia por processo. Opcionalmente, um quantizador grosso no estilo IVF
+    (k-means) agrupa os vetores em listas para que a consulta visite apenas
+    as 'nprobe' listas mais próximas.
+
+    Cada construção grava uma nova versão em um subdiretório e atualiza o
+    arquivo ATUAL de forma atômica; os leitores recarregam ao perceber a troca.
+    """
+
+    def __init__(self, diretorio: str):
+        self.diretorio = diretorio
+        self.versao: Optional[str] = None
+        self.meta: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._arrays: Dict[str, np.ndarray] = {}
+        self.consultas = 0
+        self.tempo_total_consultas = 0.0
+        self._incompatibilidade_avisada = None
+
+    # ------------------------------------------------------------------ leitura
+
+    def _versao_atual(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.diretorio, ARQUIVO_ATUAL)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _abrir(self, versao: str):
+        base = os.path.join(self.diretorio, versao)
+        with open(os.path.join(base, "meta.json")) as f:
+            meta = json.load(f)
+        n, d = meta["n"], meta["dimensao"]
+
+        def mapear(nome, dtype, shape):
+            return np.memmap(os.path.join(base, nome), dtype=dtype, mode="r", shape=shape)
+
+        arrays = {
+            "vetores": mapear("vetores.bin", meta["dtype"], (n, d)),
+            "ids": mapear("ids.bin", np.int64, (n,)),
+            "uf": mapear("uf.bin", np.uint8, (n,)),
+            "esfera": mapear("esfera.bin", np.uint8, (n,)),
+            "modalidade": mapear("modalidade.bin", np.uint8, (n,)),
+        }
+        if meta["dtype"] == "int8":
+            arrays["escalas"] = mapear("escalas.bin", np.float32, (n,))
+        if meta.get("nlist"):
+            arrays["centroides"] = mapear("centroides.bin", np.float32, (meta["nlist"], d))
+            arrays["listas"] = mapear("listas.bin", np.int64, (n,))
+            arrays["offsets"] = mapear("offsets.bin", np.int64, (meta["nlist"] + 1,))
+
+        self._arrays, self.meta, self.versao = arrays, meta, versao
+        logger.info(f"📚 Índice vetorial carregado: versão {versao} ({n} vetores, {meta['dtype']}, nlist={meta.get('nlist', 0)})")
+
+    def carregar(self) -> bool:
+        """Abre (ou reabre, se houver versão nova) o índice. Retorna se está disponível"""
+        versao = self._versao_atual()
+        if versao is None:
+            return False
+        if versao != self.versao:
+            with self._lock:
+                if versao != self.versao:
+                    try:
+                        self._abrir(versao)
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.error(f"Erro ao abrir índice vetorial {versao}: {e}")
+                        return self.versao is not None
+        return True
+
+    @property
+    def disponivel(self) -> bool:
+        return self.carregar()
+
+    def compativel(self, modelo: Optional[str], dimensao: Optional[int]) -> bool:
+        """
+        Indica se o índice foi construído com o modelo em uso (mesmo nome, que
+        inclui o backend, e mesma dimensão); vetores de outro modelo estão em
+        outro espaço de embeddings.
+        """
+        if not self.carregar():
+            return False
+        ok = self.meta.get("modelo") == modelo and self.meta.get("dimensao") == dimensao
+        if not ok and self._incompatibilidade_avisada != (self.versao, modelo):
+            self._incompatibilidade_avisada = (self.versao, modelo)
+            logger.warning(
+                f"⚠️ Índice vetorial {self.versao} construído com {self.meta.get('modelo')} "
+                f"(dimensão {self.meta.get('dimensao')}), mas o modelo em uso é {modelo} "
+                f"(dimensão {dimensao}); o índice será ignorado até ser reconstruído"
+            )
+        return ok
+
+    def _pontuar(self, posicoes: np.ndarray, consulta: np.ndarray) -> np.ndarray:
+        vetores = np.asarray(self._arrays["vetores"][posicoes], dtype=np.float32)
+        pontuacoes = vetores @ consulta
+        if self.meta["dtype"] == "int8":
+            pontuacoes *= self._arrays["escalas"][posicoes]
+        return pontuacoes
+
+    def buscar(self, consulta: np.ndarray, k: int,
+               ufs: Optional[List[str]] = None, esferas: Optional[List[str]] = None,
+               modalidades: Optional[List[str]] = None,
+               nprobe: int = INDICE_VETORIAL_NPROBE) -> List[Tuple[int, float]]:
+        """
+        Retorna até k pares (id do documento no espelho, similaridade cosseno),
+        em ordem decrescente, restritos aos filtros informados (códigos da API).
+        """
+        if not self.carregar():
+            return []
+        inicio = time.perf_counter()
+        arrays = self._arrays
+        consulta = _normalizar(np.asarray(consulta, dtype=np.float32).reshape(1, -1))[0]
+
+        if "centroides" in arrays:
+            proximas = np.argsort(-(arrays["centroides"] @ consulta))[:max(1, nprobe)]
+            offsets = arrays["offsets"]
+            candidatos = np.concatenate([
+                np.asarray(arrays["listas"][offsets[c]:offsets[c + 1]]) for c in proximas
+            ])
+        else:
+            candidatos = np.arange(self.meta["n"], dtype=np.int64)
+
+        filtros = [
+            ("uf", [codigo_uf(u) for u in ufs or []]),
+            ("esfera", [codigo_esfera(e) for e in esferas or []]),
+            ("modalidade", [codigo_modalidade(m) for m in modalidades or []]),
+        ]
+
+        melhores_pos = np.empty(0, dtype=np.int64)
+        melhores_pont = np.empty(0, dtype=np.float32)
+        for i in range(0, len(candidatos), TAMANHO_BLOCO):
+            bloco = np.sort(candidatos[i:i + TAMANHO_BLOCO])
+            for campo, codigos in filtros:
+                if codigos:
+                    bloco = bloco[np.isin(arrays[campo][bloco], codigos)]
+            if not len(bloco):
+                continue
+            pontuacoes = self._pontuar(bloco, consulta)
+            melhores_pos = np.concatenate([melhores_pos, bloco])
+            melhores_pont = np.concatenate([melhores_pont, pontuacoes])
+            if len(melhores_pos) > k:
+                topo = np.argpartition(-melhores_pont, k)[:k]
+                melhores_pos, melhores_pont = melhores_pos[topo], melhores_pont[topo]
+
+        ordem = np.argsort(-melhores_pont)[:k]
+        self.consultas += 1
+        self.tempo_total_consultas += time.perf_counter() - inicio
+        return [(int(arrays["ids"][melhores_pos[j]]), float(melhores_pont[j])) for j in ordem]
+
+    def metrics(self) -> Dict[str, Any]:
+        disponivel = self.disponivel
+        return {
+            "disponivel": disponivel,
+            "versao": self.versao,
+            "vetores": self.meta.get("n") if disponivel else 0,
+            "dtype": self.meta.get("dtype"),
+            "nlist": self.meta.get("nlist", 0),
+            "modelo": self.meta.get("modelo"),
+            "consultas": self.consultas,
+            "tempo_medio_consulta_ms": (self.tempo_total_consultas / self.consultas * 1000) if self.consultas else None,
+        }
+
+
+# ---------------------------------------------------------------------- construção
+
+def _gravar(base: str, nome: str, array: np.ndarray):
+    mm = np.memmap(os.path.join(base, nome), dtype=array.dtype, mode="w+", shape=array.shape)
+    mm[:] = array
+    mm.flush()
+    del mm
+
+
+def gravar_indice(diretorio: str, ids: np.ndarray, vetores: np.ndarray, ufs: np.ndarray,
+                  esferas: np.ndarray, modalidades: np.ndarray, modelo: str,
+                  dtype: str = INDICE_VETORIAL_DTYPE, nlist: int = INDICE_VETORIAL_NLIST) -> str:
+    """Grava uma nova versão do índice e a publica atomicamente. Retorna a versão"""
+    vetores = _normalizar(np.asarray(vetores, dtype=np.float32))
+    n, d = vetores.shape
+    versao = f"v{time.time_ns()}"
+    base = os.path.join(diretorio, versao)
+    os.makedirs(base, exist_ok=True)
+
+    if dtype == "int8":
+        escalas = np.abs(vetores).max(axis=1) / 127.0
+        escalas[escalas == 0] = 1.0
+        _gravar(base, "vetores.bin", np.round(vetores / escalas[:, None]).astype(np.int8))
+        _gravar(base, "escalas.bin", escalas.astype(np.float32))
+    else:
+        dtype = "float16"
+        _gravar(base, "vetores.bin", vetores.astype(np.float16))
+
+    _gravar(base, "ids.bin", ids.astype(np.int64))
+    _gravar(base, "uf.bin", ufs.astype(np.uint8))
+    _gravar(base, "esfera.bin", esferas.astype(np.uint8))
+    _gravar(base, "modalidade.bin", modalidades.astype(np.uint8))
+
+    nlist = min(nlist, n)
+    if nlist > 1:
+        rng = np.random.default_rng(0)
+        amostra = vetores[rng.choice(n, size=min(n, nlist * 256), replace=False)]
+        centroides = _kmeans(amostra, nlist)
+        atribuicao = np.concatenate([
+            np.argmax(vetores[i:i + TAMANHO_BLOCO] @ centroides.T, axis=1)
+            for i in range(0, n, TAMANHO_BLOCO)
+        ])
+        listas = np.argsort(atribuicao, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(atribuicao, minlength=nlist))]).astype(np.int64)
+        _gravar(base, "centroides.bin", centroides)
+        _gravar(base, "listas.bin", listas)
+        _gravar(base, "offsets.bin", offsets)
+    else:
+        nlist = 0
+
+    with open(os.path.join(base, "meta.json"), "w") as f:
+        json.dump({"n": n, "dimensao": d, "dtype": dtype, "nlist": nlist, "modelo": modelo,
+                   "criado_em": time.time()}, f)
+
+    # Publica a nova versão de forma atômica e remove as anteriores
+    temporario = os.path.join(diretorio, ARQUIVO_ATUAL + ".tmp")
+    with open(temporario, "w") as f:
+        f.write(versao)
+    os.replace(temporario, os.path.join(diretorio, ARQUIVO_ATUAL))
+    for antiga in os.listdir(diretorio):
+        caminho = os.path.join(diretorio, antiga)
+        if antiga.startswith("v") and antiga != versao and os.path.isdir(caminho):
+            shutil.rmtree(caminho, ignore_errors=True)
+
+    logger.info(f"✅ Índice vetorial {versao} gravado: {n} vetores ({dtype}, nlist={nlist})")
+    return versao
+
+
+async def construir_indice(diretorio: str = INDICE_VETORIAL_DIR, lote: int = 5000) -> Optional[str]:
+    """
+    Constrói o índice a partir de todos os documentos do espelho local,
+    reaproveitando o cache de embeddings (só objetos inéditos são calculados).
+    """
+    from app.services.embedding_registry import model_registry
+    from app.services.embedding_cache_services import embedding_cache
+
+    model = await asyncio.to_thread(model_registry.get_model)
+    model_name = model_registry.model_name
+
+    ids, vetores, ufs, esferas, modalidades = [], [], [], [], []
+    ultimo_id = 0
+    while True:
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(DocumentoPNCP.id, DocumentoPNCP.objeto, DocumentoPNCP.uf,
+                       DocumentoPNCP.esfera, DocumentoPNCP.modalidade)
+                .where(DocumentoPNCP.id > ultimo_id)
+                .order_by(DocumentoPNCP.id)
+                .limit(lote)
+            )
+            linhas = [l for l in result.all()]
+        if not linhas:
+            break
+        ultimo_id = linhas[-1].id
+        linhas = [l for l in linhas if l.objeto and l.objeto.strip() and l.objeto != "Não informado"]
+        if not linhas:
+            continue
+
+        vetores.append(await embedding_cache.encode(model, model_name, [l.objeto.strip() for l in linhas]))
+        ids.extend(l.id for l in linhas)
+        ufs.extend(codigo_uf(l.uf) for l in linhas)
+        esferas.extend(codigo_esfera(l.esfera) for l in linhas)
+        modalidades.extend(codigo_modalidade(l.modalidade) for l in linhas)
+        logger.info(f"  {len(ids)} documentos vetorizados...")
+
+    if not ids:
+        logger.warning("Espelho local vazio: índice vetorial não construído")
+        return None
+
+    return await asyncio.to_thread(
+        gravar_indice, diretorio, np.asarray(ids), np.concatenate(vetores),
+        np.asarray(ufs), np.asarray(esferas), np.asarray(modalidades), model_name
+    )
+
+
+indice_vetorial = IndiceVetorial(INDICE_VETORIAL_DIR)
+
+
+if __name__ == "__main__":
+    # Reconstrução offline: python -m app.services.vector_index
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(construir_indice())
@@ -0,0 +1,76 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+from typing import Optional
+
+from app.config import WORKSPACES_DIR, WORKSPACES_MAX_IDADE
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorkspace:
+    """
+    Diretório de trabalho isolado de uma geração de PDP.
+
+    Cada execução de pesquisa de mercado recebe os seus próprios diretórios de
+    downloads e de similares, passados explicitamente para busca, download,
+    cópia e upload ao Gemini. O diretório é removido ao sair do contexto, de
+    modo que várias gerações podem rodar ao mesmo tempo no mesmo nó.
+
+        async with JobWorkspace() as workspace:
+            searcher = PNCPSearcher(workspace.downloads_dir, workspace.similares_dir)
+    """
+
+    def __init__(self, base_dir: str = WORKSPACES_DIR, prefixo: str = "pdp_"):
+        self.base_dir = base_dir
+        self.prefixo = prefixo
+        self.raiz: Optional[str] = None
+
+    @property
+    def job_id(self) -> Optional[str]:
+        return os.path.basename(self.raiz) if self.raiz else None
+
+    @property
+    def downloads_dir(self) -> str:
+        return os.path.join(self.raiz, "downloads")
+
+    @property
+    def similares_dir(self) -> str:
+        return os.path.join(self.raiz, "similares")
+
+    def criar(self) -> "JobWorkspace":
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.raiz = tempfile.mkdtemp(prefix=self.prefixo, dir=self.base_dir)
+        for directory in [self.downloads_dir, self.similares_dir]:
+            os.makedirs(directory, exist_ok=True)
+        logger.info(f"📂 Workspace criado: {self.raiz}")
+        return self
+
+    def remover(self):
+        if self.raiz and os.path.exists(self.raiz):
+            shutil.rmtree(self.raiz, ignore_errors=True)
+            logger.info(f"🧹 Workspace removido: {self.raiz}")
+
+    async def __aenter__(self) -> "JobWorkspace":
+        return self.criar()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.remover()
+
+
+def limpar_workspaces_orfaos(base_dir: str = WORKSPACES_DIR, max_idade: int = WORKSPACES_MAX_IDADE) -> int:
+    """Remove workspaces deixados por processos interrompidos (mais antigos que max_idade segundos)"""
+    if not os.path.isdir(base_dir):
+        return 0
+    limite = time.time() - max_idade
+    removidos = 0
+    for nome in os.listdir(base_dir):
+        caminho = os.path.join(base_dir, nome)
+        if os.path.isdir(caminho) and os.path.getmtime(caminho) < limite:
+            shutil.rmtree(caminho, ignore_errors=True)
+            removidos += 1
+    if removidos:
+        logger.info(f"🧹 {removidos} workspaces órfãos removidos")
+    return removidos
@@ -0,0 +1,69 @@
+"""
+Worker das gerações de artefatos: python -m app.worker
+
+Roda fora do uvicorn e executa os jobs enfileirados pelos endpoints
+create_* (tabela core.job_geracao), então gerações lentas não ocupam os
+workers da API.
+As métricas em memória do worker são publicadas em core.metrica_worker
+e aparecem nos /metrics/* da API.
+"""
+import signal
+import asyncio
+import logging
+
+from app.database import init_async_db
+from app.client import close_pncp_http_client
+from app.config import EMBEDDING_PRELOAD, GEMINI_VARREDURA_ATIVA
+from app.services.embedding_registry import model_registry
+from app.services.workspace import limpar_workspaces_orfaos
+from app.services.executor import cpu_executor, monitor_loop
+from app.services.gemini_files import gemini_arquivos
+from app.services.gemini_context_cache import caches_contexto
+from app.services.jobs import WorkerJobs
+from app.services.metricas_worker import PublicadorMetricas
+from app.services.progresso import publicador_progresso
+from app.services.telemetria_pool import telemetria_pool
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    telemetria_pool.origem_sem_job = "worker"
+    await init_async_db()
+    monitor = asyncio.create_task(monitor_loop.loop())
+    limpar_workspaces_orfaos()
+    if EMBEDDING_PRELOAD:
+        try:
+            await asyncio.to_thread(model_registry.load)
+        except Exception as e:
+            logger.error(f"Modelo de embedding não carregado no startup: {e}")
+    varredura_gemini = asyncio.create_task(gemini_arquivos.loop()) if GEMINI_VARREDURA_ATIVA else None
+
+    worker_jobs = WorkerJobs()
+    publicador_metricas = PublicadorMetricas(worker_jobs.nome)
+    metricas = asyncio.create_task(publicador_metricas.loop())
+    worker = asyncio.create_task(worker_jobs.loop())
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sinal, worker.cancel)
+
+    try:
+        await worker
+    except asyncio.CancelledError:
+        logger.info("Worker encerrado")
+    finally:
+        if varredura_gemini:
+            varredura_gemini.cancel()
+        monitor.cancel()
+        metricas.cancel()
+        await publicador_metricas.remover()
+        logger.info(f"Retenção das conexões do pool neste worker: {telemetria_pool.metrics()['retencao_por_origem']}")
+        await publicador_progresso.encerrar()
+        await caches_contexto.encerrar()
+        await close_pncp_http_client()
+        cpu_executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
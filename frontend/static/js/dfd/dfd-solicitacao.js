@@ -93,20 +93,13 @@ async function handleFormSubmit(event) {
 
     const requestBody = {
         descricao: descricao,
-        item: item
+        item: item,
+        forcar_regeneracao: document.getElementById('forcar-regeneracao').checked
     };
 
     // Mostra a sobreposição de carregamento
     loadingOverlay.classList.remove('hidden');
 
-    // Simulação de progresso
-    let progress = 0;
-    const progressInterval = setInterval(() => {
-        progress += 3;
-        progressBar.style.width = `${progress}%`;
-        if (progress >= 95) clearInterval(progressInterval);
-    }, 100);
-
     try {
         const response = await fetch(URL + '/projetos/'+ idProjeto +'/create_dfd', {
             method: 'POST',
@@ -125,7 +118,7 @@ async function handleFormSubmit(event) {
             throw new Error(`Erro ${response.status}: ${errorMsg}`);
         }
 
-        const result = await response.json();
+        const result = await aguardarJob(response, progressoNaBarra(progressBar));
         
         // Garantindo que o item seja salvo junto com o resultado no localStorage
         const draftWithItem = {
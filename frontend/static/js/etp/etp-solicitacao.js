@@ -155,20 +155,13 @@ async function handleFormSubmit(event) {
             incluir_sustentabilidade: true,
             detalhar_riscos: true,
             incluir_mercado: true
-        }
+        },
+        forcar_regeneracao: document.getElementById('forcar-regeneracao').checked
     };
 
     // Mostra a sobreposição de carregamento
     loadingOverlay.classList.remove('hidden');
 
-    // Simulação de progresso
-    let progress = 0;
-    const progressInterval = setInterval(() => {
-        progress += 2;
-        progressBar.style.width = `${progress}%`;
-        if (progress >= 95) clearInterval(progressInterval);
-    }, 200);
-
     try {
         const response = await fetch(`${URL}/projetos/${idProjeto}/create_etp`, {
             method: 'POST',
@@ -201,7 +194,7 @@ async function handleFormSubmit(event) {
             throw new Error(`Erro ${response.status}: ${errorMsg}`);
         }
 
-        const result = await response.json();
+        const result = await aguardarJob(response, progressoNaBarra(progressBar));
         console.log('ETP criado com sucesso:', result);
         
         // Finalizar barra de progresso
@@ -219,7 +212,7 @@ async function handleFormSubmit(event) {
         console.error('Falha ao gerar ETP:', error);
         
         // Limpar progresso
-        clearInterval(progressInterval);
+        progressBar.style.width = '0%';
         loadingOverlay.classList.add('hidden');
         
         // Mostrar erro detalhado
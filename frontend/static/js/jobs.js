@@ -0,0 +1,125 @@
+// Acompanhamento das gerações em segundo plano.
+// Os endpoints create_dfd/create_pdp/create_pgr/create_etp respondem 202 com o id do job;
+// aguardarJob acompanha a geração até o fim e devolve o resultado.
+const CABECALHOS_JOB = {
+    'accept': 'application/json',
+    'remote-user': 'user.test', // REMOVER HARDCODING
+    'remote-groups': 'TI,OUTROS' // REMOVER HARDCODING
+};
+
+// Lê o stream SSE de progresso (GET /jobs/{id}/eventos) e chama aoEvento a cada evento.
+// Usa fetch em vez de EventSource para poder enviar os cabeçalhos de autenticação.
+async function acompanharEventos(url, aoEvento) {
+    const resp = await fetch(window.location.origin + url, {
+        headers: { ...CABECALHOS_JOB, 'accept': 'text/event-stream' }
+    });
+    if (!resp.ok || !resp.body) {
+        throw new Error(`Erro ${resp.status} ao acompanhar a geração`);
+    }
+
+    const leitor = resp.body.getReader();
+    const decodificador = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await leitor.read();
+        if (done) return;
+        buffer += decodificador.decode(value, { stream: true });
+
+        let fimBloco;
+        while ((fimBloco = buffer.indexOf('\n\n')) >= 0) {
+            const bloco = buffer.slice(0, fimBloco);
+            buffer = buffer.slice(fimBloco + 2);
+
+            let nome = 'message';
+            let dados = '';
+            for (const linha of bloco.split('\n')) {
+                if (linha.startsWith('event: ')) nome = linha.slice(7);
+                else if (linha.startsWith('data: ')) dados += linha.slice(6);
+            }
+            if (!dados) continue; // keepalive
+            aoEvento(nome, JSON.parse(dados));
+            if (nome === 'fim') {
+                leitor.cancel();
+                return;
+            }
+        }
+    }
+}
+
+// Percentual aproximado da geração a partir da etapa corrente
+function percentualDoEvento(evento) {
+    const fracao = evento.total ? Math.min(1, (evento.atual || 0) / evento.total) : 0;
+    if (evento.status === 'concluido') return 100;
+    if (evento.etapa === 'job') return 2;
+    if (evento.etapa === 'contexto') return 10;
+    if (evento.etapa === 'pncp_paginas') return 5 + 25 * fracao;
+    if (evento.etapa === 'pesquisa_pncp') return evento.fase === 'fim' ? 30 : 5;
+    if (evento.etapa === 'ranking') return 35;
+    if (evento.etapa === 'documentos') return 40 + 30 * fracao;
+    if (evento.etapa.startsWith('geracao_')) return evento.fase === 'fim' ? 92 : 75;
+    if (evento.etapa === 'gravacao') return 95;
+    return null;
+}
+
+// Callback para aguardarJob que move a barra de progresso (só para frente) e mostra a etapa
+function progressoNaBarra(progressBar, legenda = null) {
+    let atual = 0;
+    return (evento) => {
+        const percentual = percentualDoEvento(evento);
+        if (percentual !== null && percentual > atual) {
+            atual = percentual;
+            if (progressBar) progressBar.style.width = `${atual}%`;
+        }
+        if (legenda && evento.mensagem) legenda.textContent = evento.mensagem;
+    };
+}
+
+async function consultarJob(urlStatus) {
+    const resp = await fetch(window.location.origin + urlStatus, { headers: CABECALHOS_JOB });
+    if (!resp.ok) {
+        throw new Error(`Erro ${resp.status} ao consultar a geração`);
+    }
+    return resp.json();
+}
+
+function resultadoDoJob(job) {
+    if (job.status === 'concluido') {
+        return { pronto: true, resultado: job.resultado };
+    }
+    if (job.status === 'erro') {
+        const erro = new Error(job.erro || 'Erro na geração');
+        erro.status = job.codigo_erro;
+        throw erro;
+    }
+    return { pronto: false };
+}
+
+// aoProgresso (opcional) recebe os eventos de progresso da geração em tempo real.
+// Se o stream de eventos cair, o acompanhamento continua por polling.
+async function aguardarJob(response, aoProgresso = null, intervaloMs = 2000) {
+    const aceito = await response.json();
+    if (response.status !== 202 || !aceito.job_id) {
+        return aceito;
+    }
+
+    console.log('⏳ Geração enfileirada:', aceito.job_id);
+
+    if (aceito.url_eventos) {
+        try {
+            await acompanharEventos(aceito.url_eventos, (nome, evento) => {
+                if (nome === 'progresso' && aoProgresso) aoProgresso(evento);
+            });
+            const { pronto, resultado } = resultadoDoJob(await consultarJob(aceito.url_status));
+            if (pronto) return resultado;
+        } catch (erro) {
+            if (erro.status !== undefined) throw erro;
+            console.warn('Stream de progresso indisponível, seguindo por polling:', erro);
+        }
+    }
+
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, intervaloMs));
+        const { pronto, resultado } = resultadoDoJob(await consultarJob(aceito.url_status));
+        if (pronto) return resultado;
+    }
+}
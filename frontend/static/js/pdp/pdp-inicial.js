@@ -528,6 +528,7 @@ if (formPesquisa) {
             "ufs": coletarFiltrosSelecionados('uf'),
             "esferas": coletarFiltrosSelecionados('esfera'), 
             "modalidades": coletarFiltrosSelecionados('modalidade'),
+            "forcar_regeneracao": document.getElementById('forcar-regeneracao').checked,
             
             // ALTERNATIVA: Caso o schema use nomes diferentes, teste com:
             // "description": palavrasChave,
@@ -568,7 +569,7 @@ async function enviarPesquisaPDP(dados) {
         console.log('📡 Response ok:', response.ok);
         
         if (response.ok) {
-            const resultado = await response.json();
+            const resultado = await aguardarJob(response, progressoNaBarra(document.getElementById('progress-bar')));
             console.log('✅ Resultado da pesquisa:', resultado);
             
             mostrarToast('Pesquisa concluída com sucesso!', 'success');
@@ -614,23 +615,6 @@ function testarDadosSimplificados() {
     function mostrarLoading() {
         if (loadingOverlay) {
             loadingOverlay.classList.remove('hidden');
-            
-            // Simula progresso
-            let progresso = 0;
-            const progressBar = document.getElementById('progress-bar');
-            const intervalo = setInterval(() => {
-                progresso += 1;
-                if (progresso > 90) progresso = 90;
-                
-                if (progressBar) {
-                    progressBar.style.width = progresso + '%';
-                }
-            }, 900);
-            
-            // Para o progresso após aproximadamente 3 minutos
-            setTimeout(() => {
-                clearInterval(intervalo);
-            }, 180000);
         }
     }
     
@@ -663,7 +647,7 @@ function testarDadosSimplificados() {
             });
             
             if (response.ok) {
-                const resultado = await response.json();
+                const resultado = await aguardarJob(response, progressoNaBarra(document.getElementById('progress-bar')));
                 console.log('✅ Resultado da pesquisa:', resultado);
                 
                 mostrarToast('Pesquisa concluída com sucesso!', 'success');
@@ -294,7 +294,8 @@ Priorize riscos que possam afetar o cronograma, qualidade ou aderência aos requ
                 parametros_analise: {
                     categorias_risco: categoriasSelecionadas,
                     nivel_detalhamento: nivelDetalhamento
-                }
+                },
+                forcar_regeneracao: document.getElementById('forcar-regeneracao').checked
             };
             
             console.log('📋 Dados da análise PGR:', formData);
@@ -328,7 +329,7 @@ Priorize riscos que possam afetar o cronograma, qualidade ou aderência aos requ
             console.log('📡 Response ok:', response.ok);
             
             if (response.ok) {
-                const resultado = await response.json();
+                const resultado = await aguardarJob(response, progressoNaBarra(document.getElementById('progress-bar')));
                 console.log('✅ Resultado da análise:', resultado);
                 
                 mostrarToast('Plano de Gerenciamento de Riscos gerado com sucesso!', 'success');
@@ -400,23 +401,6 @@ Priorize riscos que possam afetar o cronograma, qualidade ou aderência aos requ
     function mostrarLoading() {
         if (loadingOverlay) {
             loadingOverlay.classList.remove('hidden');
-            
-            // Simula progresso
-            let progresso = 0;
-            const progressBar = document.getElementById('progress-bar');
-            const intervalo = setInterval(() => {
-                progresso += Math.random() * 15;
-                if (progresso > 90) progresso = 90;
-                
-                if (progressBar) {
-                    progressBar.style.width = progresso + '%';
-                }
-            }, 500);
-            
-            // Para o progresso após 30 segundos
-            setTimeout(() => {
-                clearInterval(intervalo);
-            }, 30000);
         }
     }
     